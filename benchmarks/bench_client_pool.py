@@ -0,0 +1,65 @@
+"""
+Benchmark: a new OpenAI client per request versus the shared pooled client.
+
+Runs sequential chat completions against a local stub server and reports
+latency and the number of TCP connections the server accepted.
+
+    python -m benchmarks.bench_client_pool --requests 200 --latency 0.01
+"""
+
+import argparse
+import os
+import statistics
+import time
+
+from openai import OpenAI
+
+from benchmarks.stub_llm import StubLLMServer
+from src.ai.client_pool import close_clients, get_client
+
+MESSAGES = [{"role": "user", "content": "Review this diff:\n+print('hello')\n"}]
+
+
+def fresh_client() -> OpenAI:
+    """Client construction as ask_openai_router did it before pooling"""
+    return OpenAI(base_url=os.getenv('OPENROUTER_API_URL'), api_key=os.getenv('OPENROUTER_API_KEY'))
+
+
+def run(name: str, make_client, server: StubLLMServer, requests: int) -> None:
+    connections_before = server.connections
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(requests):
+        request_started = time.perf_counter()
+        make_client().chat.completions.create(model="stub/model", messages=MESSAGES)
+        latencies.append(time.perf_counter() - request_started)
+    total = time.perf_counter() - started
+
+    latencies.sort()
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<8} total {total:7.3f}s  mean {statistics.mean(latencies) * 1000:7.2f}ms  "
+          f"p50 {statistics.median(latencies) * 1000:7.2f}ms  p95 {p95 * 1000:7.2f}ms  "
+          f"connections {server.connections - connections_before}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0, help="Stub server latency in seconds")
+    args = parser.parse_args()
+
+    with StubLLMServer(latency=args.latency) as server:
+        os.environ['OPENROUTER_API_URL'] = server.url
+        os.environ.setdefault('OPENROUTER_API_KEY', 'stub')
+
+        # Warm up imports and the server thread
+        get_client().chat.completions.create(model="stub/model", messages=MESSAGES)
+        close_clients()
+
+        run("fresh", fresh_client, server, args.requests)
+        run("pooled", get_client, server, args.requests)
+        close_clients()
+
+
+if __name__ == "__main__":
+    main()
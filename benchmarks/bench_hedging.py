@@ -0,0 +1,70 @@
+"""
+Benchmark: tail latency with and without hedged requests.
+
+Every --stall-every-th request to the stub server stalls for --stall-seconds,
+like an occasional provider stall. The same requests are sent with a single
+model and with a fallback model that gets a hedged duplicate once the primary
+is slower than its recent p95 latency.
+
+    python -m benchmarks.bench_hedging --requests 200 --latency 0.05 --stall-every 25 --stall-seconds 2
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import src.ai.hedging as hedging
+from benchmarks.stub_llm import StubLLMServer
+from src.ai.ai_chat import ask_openai_router
+from src.ai.client_pool import close_clients
+from src.utils.logger import logger
+
+
+def percentile(values, percent: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def run(name: str, server: StubLLMServer, requests: int, concurrency: int, fallbacks: str) -> None:
+    os.environ['MODEL_FALLBACKS'] = fallbacks
+    hedging.latency_tracker = hedging.LatencyTracker()
+    requests_before = server.requests
+
+    def review(index: int) -> float:
+        started = time.perf_counter()
+        ask_openai_router(f"Review change {index}:\n+print({index})\n")
+        return time.perf_counter() - started
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(review, range(requests)))
+    sent = server.requests - requests_before
+    p50, p95, p99 = (percentile(latencies, percent) * 1000 for percent in (50, 95, 99))
+    print(f"{name:<8} p50 {p50:7.1f}ms  p95 {p95:7.1f}ms  p99 {p99:7.1f}ms  "
+          f"max {max(latencies) * 1000:7.1f}ms  requests sent {sent} for {requests}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=4)
+    parser.add_argument('--latency', type=float, default=0.05, help="Stub server latency in seconds")
+    parser.add_argument('--stall-every', type=int, default=25)
+    parser.add_argument('--stall-seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    logger.set_gui_callback(lambda message: None)
+    os.environ['HEDGE_MIN_DELAY_SECONDS'] = '0.01'
+    os.environ['HEDGE_DEFAULT_DELAY_SECONDS'] = str(args.latency * 4)
+    with StubLLMServer(latency=args.latency, stall_every=args.stall_every,
+                       stall_seconds=args.stall_seconds) as server:
+        os.environ['OPENROUTER_API_URL'] = server.url
+        os.environ.setdefault('OPENROUTER_API_KEY', 'stub')
+
+        run("single", server, args.requests, args.concurrency, '')
+        run("hedged", server, args.requests, args.concurrency, 'stub/fallback')
+        close_clients()
+
+
+if __name__ == "__main__":
+    main()
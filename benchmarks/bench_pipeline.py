@@ -0,0 +1,224 @@
+"""
+Benchmark: the whole review pipeline on a synthetic repository.
+
+Builds a deterministic repository (see benchmarks.synthetic_repo), then runs
+review_commit -> save_review_to_html for its newest commits against the stub
+LLM server, with the review cache off. Reports wall time per stage, git
+subprocesses started, the Python memory peak and the token volume sent.
+--json writes the results; --compare checks them against an earlier run and
+exits with 1 if a stage got slower than --tolerance allows.
+
+    python -m benchmarks.bench_pipeline --commits 200 --files 100 --merge-every 10 --reviews 30
+    python -m benchmarks.bench_pipeline --json baseline.json
+    python -m benchmarks.bench_pipeline --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from typing import Dict, List
+
+import src.review_logic as review_logic
+from benchmarks.stub_llm import StubLLMServer
+from benchmarks.synthetic_repo import add_arguments, build_from_args
+from src.ai.client_pool import close_clients
+from src.ai.tokens import usage_tracker
+from src.git.diff import list_commits
+from src.git.repository import close_repositories
+from src.html_writer import save_review_to_html
+from src.utils.logger import logger
+
+# Stage of every function wrapped in review_logic
+STAGE_FUNCTIONS = {
+    'load_commit': 'git',
+    'triage_commit': 'triage',
+    'build_review_context': 'context',
+    'plan_prompt_budget': 'prompt',
+    'chunk_diff': 'prompt',
+    'ask_openai_router': 'llm',
+}
+STAGES = ('git', 'triage', 'context', 'prompt', 'llm', 'render')
+
+
+class PipelineProbe:
+    """
+    Times the stages of review_commit and counts the subprocesses each stage starts
+
+    Stage functions are wrapped where review_logic looks them up. Time of a
+    stage called from another one (the map-reduce requests inside llm) is
+    counted once, for the outer stage.
+    """
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = defaultdict(float)
+        self.subprocesses: Dict[str, int] = defaultdict(int)
+        self.stage = 'other'
+        self._originals = {}
+        # Audit hooks cannot be removed, so the hook checks whether the probe is active
+        self.active = False
+        sys.addaudithook(self._audit)
+
+    def _audit(self, event: str, args) -> None:
+        if event == 'subprocess.Popen' and self.active:
+            self.subprocesses[self.stage] += 1
+
+    def measure(self, stage: str, function, *args, **kwargs):
+        if self.stage != 'other':
+            return function(*args, **kwargs)
+        self.stage = stage
+        started = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.seconds[stage] += time.perf_counter() - started
+            self.stage = 'other'
+
+    def __enter__(self) -> 'PipelineProbe':
+        for name, stage in STAGE_FUNCTIONS.items():
+            original = self._originals[name] = getattr(review_logic, name)
+            setattr(review_logic, name,
+                    lambda *args, _stage=stage, _original=original, **kwargs:
+                    self.measure(_stage, _original, *args, **kwargs))
+        self.active = True
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.active = False
+        for name, original in self._originals.items():
+            setattr(review_logic, name, original)
+
+
+def review_and_render(repo_path: str, commits: List[str], results_dir: str, probe: PipelineProbe) -> float:
+    """Review and save every commit once; returns the wall time"""
+    started = time.perf_counter()
+    for commit in commits:
+        review = review_logic.review_commit(repo_path, commit, use_cache=False)
+        if review.startswith("Error:"):
+            raise RuntimeError(review)
+        probe.measure('render', save_review_to_html, review, results_dir)
+    return time.perf_counter() - started
+
+
+def run(repo_path: str, commits: List[str], results_dir: str) -> dict:
+    """
+    Run the pipeline twice: once for timings and subprocesses, once under tracemalloc
+
+    Returns:
+        dict: Benchmark results
+    """
+    usage_tracker.totals = {}
+    with PipelineProbe() as probe:
+        total = review_and_render(repo_path, commits, results_dir, probe)
+    tokens = {key: sum(totals[key] for totals in usage_tracker.totals.values())
+              for key in ('requests', 'prompt_tokens', 'completion_tokens')}
+
+    # tracemalloc slows allocation down, so memory is measured in a separate pass
+    close_repositories()
+    tracemalloc.start()
+    with PipelineProbe() as memory_probe:
+        review_and_render(repo_path, commits, results_dir, memory_probe)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'reviews': len(commits),
+        'total_seconds': total,
+        'stage_seconds': {stage: probe.seconds.get(stage, 0.0) for stage in STAGES},
+        'other_seconds': total - sum(probe.seconds.values()),
+        'subprocesses': {stage: count for stage, count in probe.subprocesses.items() if count},
+        'peak_memory_bytes': peak,
+        'tokens': tokens,
+    }
+
+
+def print_results(results: dict) -> None:
+    reviews = results['reviews']
+    print(f"{reviews} reviews in {results['total_seconds']:.3f}s")
+    for stage in STAGES:
+        seconds = results['stage_seconds'][stage]
+        print(f"  {stage:<8} {seconds:8.3f}s  {seconds / reviews * 1000:8.2f}ms/review  "
+              f"subprocesses {results['subprocesses'].get(stage, 0)}")
+    print(f"  {'other':<8} {results['other_seconds']:8.3f}s")
+    print(f"subprocesses {sum(results['subprocesses'].values())}, "
+          f"peak memory {results['peak_memory_bytes'] / 1024 / 1024:.1f} MB")
+    tokens = results['tokens']
+    print(f"requests {tokens['requests']}, prompt {tokens['prompt_tokens']} tokens, "
+          f"completion {tokens['completion_tokens']} tokens")
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """
+    Print the change against a baseline run
+
+    Returns:
+        bool: True if no stage, subprocess count, memory peak or token volume grew beyond tolerance
+    """
+    ok = True
+
+    def check(name: str, value: float, before: float, minimum: float = 0.0) -> None:
+        nonlocal ok
+        change = (value - before) / before * 100 if before else 0.0
+        regressed = value > before * (1 + tolerance / 100) and value - before > minimum
+        ok = ok and not regressed
+        marker = '  REGRESSION' if regressed else ''
+        print(f"  {name:<20} {before:12.3f} -> {value:12.3f}  {change:+7.1f}%{marker}")
+
+    print(f"Compared with the baseline (tolerance {tolerance:.0f}%):")
+    for stage in STAGES:
+        # Differences of a few milliseconds are noise
+        check(f"{stage} seconds", results['stage_seconds'][stage],
+              baseline['stage_seconds'].get(stage, 0.0), 0.01)
+    check("subprocesses", sum(results['subprocesses'].values()), sum(baseline['subprocesses'].values()))
+    check("peak memory MB", results['peak_memory_bytes'] / 1024 / 1024,
+          baseline['peak_memory_bytes'] / 1024 / 1024)
+    check("prompt tokens", results['tokens']['prompt_tokens'], baseline['tokens']['prompt_tokens'])
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    add_arguments(parser)
+    parser.add_argument('--reviews', type=int, default=20, help="Newest commits to review")
+    parser.add_argument('--latency', type=float, default=0.0, help="Stub server latency in seconds")
+    parser.add_argument('--repo', help="Keep the synthetic repository in this directory")
+    parser.add_argument('--json', dest='json_path', help="Write the results to this file")
+    parser.add_argument('--compare', help="Results file of an earlier run to compare with")
+    parser.add_argument('--tolerance', type=float, default=20.0, help="Allowed slowdown in percent")
+    args = parser.parse_args()
+
+    logger.set_gui_callback(lambda message: None)
+    with tempfile.TemporaryDirectory(prefix='bench_pipeline_') as work_dir:
+        repo_path = args.repo or os.path.join(work_dir, 'repo')
+        started = time.perf_counter()
+        build_from_args(repo_path, args)
+        print(f"Built {repo_path} in {time.perf_counter() - started:.2f}s")
+        commits = list_commits(repo_path, ['HEAD'], args.reviews)
+
+        os.environ['REVIEW_CACHE_DISABLED'] = '1'
+        with StubLLMServer(latency=args.latency) as server:
+            os.environ['OPENROUTER_API_URL'] = server.url
+            os.environ.setdefault('OPENROUTER_API_KEY', 'stub')
+            try:
+                results = run(repo_path, commits, os.path.join(work_dir, 'results'))
+            finally:
+                close_repositories()
+                close_clients()
+
+    print_results(results)
+    if args.json_path:
+        with open(args.json_path, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""
+Benchmark: parallel review requests against a provider rate limit.
+
+A stub server answers 429 with Retry-After once more than --rate-limit
+requests arrive per second. The same burst of parallel requests is sent
+without retries, with retries only and with the scheduler throttling to the
+provider's rate.
+Reports wall time, failed requests and how many 429 answers were provoked.
+
+    python -m benchmarks.bench_rate_limits --requests 60 --concurrency 16 --rate-limit 20
+"""
+
+import argparse
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import src.ai.scheduler as scheduler
+from benchmarks.stub_llm import StubLLMServer
+from src.ai.ai_chat import ask_openai_router
+from src.ai.client_pool import close_clients
+from src.utils.logger import logger
+
+
+def run(name: str, server: StubLLMServer, requests: int, concurrency: int,
+        requests_per_minute: float, max_retries: int = 8) -> None:
+    scheduler._scheduler = scheduler.RequestScheduler(
+        max_retries=max_retries, base_delay=0.05, max_delay=2.0,
+        requests_per_minute=requests_per_minute, burst_seconds=0.2
+    )
+    rejected_before = server.rejected
+
+    def review(index: int) -> bool:
+        try:
+            ask_openai_router(f"Review change {index}:\n+print({index})\n")
+            return True
+        except scheduler.RequestFailure:
+            return False
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        failed = sum(1 for ok in pool.map(review, range(requests)) if not ok)
+    total = time.perf_counter() - started
+    rejected = server.rejected - rejected_before
+    print(f"{name:<10} total {total:6.2f}s  failed {failed:3d}  429 answers {rejected:4d}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=60)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--rate-limit', type=int, default=20, help="Requests per second the stub accepts")
+    parser.add_argument('--latency', type=float, default=0.05, help="Stub server latency in seconds")
+    args = parser.parse_args()
+
+    # Keep retry messages out of the results
+    logger.set_gui_callback(lambda message: None)
+    with StubLLMServer(latency=args.latency, rate_limit=args.rate_limit, rate_window=1.0) as server:
+        os.environ['OPENROUTER_API_URL'] = server.url
+        os.environ.setdefault('OPENROUTER_API_KEY', 'stub')
+
+        # Every request sent at once and failures returned, as before the scheduler
+        run("no retry", server, args.requests, args.concurrency, 0, max_retries=0)
+        time.sleep(1.0)
+        run("retries", server, args.requests, args.concurrency, 0)
+        time.sleep(1.0)
+        # Slightly below the provider limit, as configured through API_REQUESTS_PER_MINUTE
+        run("throttled", server, args.requests, args.concurrency, args.rate_limit * 60 * 0.9)
+        close_clients()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,234 @@
+"""
+Deterministic stub of an OpenAI-compatible chat completions endpoint.
+
+Used by the benchmarks and for local testing: point OPENROUTER_API_URL at
+StubLLMServer.url and every review gets an instant, reproducible answer after
+a configurable latency.
+
+Run standalone:
+    python -m benchmarks.stub_llm --port 8765 --latency 0.5
+"""
+
+import argparse
+import collections
+import json
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count used for the usage block of stub responses"""
+    return max(1, len(text) // 4)
+
+
+class StubLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        # Keep benchmark output clean
+        pass
+
+    def setup(self):
+        super().setup()
+        # Headers and body are separate writes; avoid Nagle + delayed ACK stalls
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.server.stub.count_connection()
+
+    def do_POST(self):
+        stub = self.server.stub
+        length = int(self.headers.get('Content-Length', 0))
+        request = json.loads(self.rfile.read(length) or b'{}')
+
+        if not self.path.endswith('/chat/completions'):
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+            return
+
+        number = stub.count_request()
+        retry_after = stub.check_rate_limit()
+        if retry_after is not None:
+            body = json.dumps({"error": {"message": "Rate limit exceeded", "code": 429}}).encode('utf-8')
+            self.send_response(429)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.send_header('Retry-After', f"{retry_after:.3f}")
+            self.end_headers()
+            self.wfile.write(body)
+            return
+        time.sleep(stub.request_delay(number))
+
+        messages = request.get('messages', [])
+        prompt = ''.join(str(message.get('content', '')) for message in messages)
+        content = stub.make_reply(request.get('model', ''), prompt)
+        usage = {
+            "prompt_tokens": estimate_tokens(prompt),
+            "completion_tokens": estimate_tokens(content),
+            "total_tokens": estimate_tokens(prompt) + estimate_tokens(content),
+        }
+
+        if request.get('stream'):
+            self._send_stream(request.get('model', ''), content, usage)
+        else:
+            self._send_json(200, {
+                "id": "stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": request.get('model', ''),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop",
+                }],
+                "usage": usage,
+            })
+
+    def _send_json(self, status: int, payload: dict):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_stream(self, model: str, content: str, usage: dict):
+        stub = self.server.stub
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        def send_event(payload):
+            self.wfile.write(f"data: {json.dumps(payload)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        for word in content.split(' '):
+            send_event({
+                "id": "stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": {"content": word + ' '}, "finish_reason": None}],
+            })
+            time.sleep(stub.token_delay)
+        send_event({
+            "id": "stub",
+            "object": "chat.completion.chunk",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [],
+            "usage": usage,
+        })
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+class StubLLMServer:
+    """
+    Local OpenAI-compatible server answering every chat completion with a fixed review
+    """
+
+    def __init__(self, latency: float = 0.0, token_delay: float = 0.0,
+                 host: str = '127.0.0.1', port: int = 0, reply_words: int = 50,
+                 rate_limit: int = 0, rate_window: float = 60.0,
+                 stall_every: int = 0, stall_seconds: float = 0.0):
+        self.latency = latency
+        self.token_delay = token_delay
+        self.reply_words = reply_words
+        # More than rate_limit requests per rate_window seconds get 429 with Retry-After,
+        # like a provider limit (0: unlimited)
+        self.rate_limit = rate_limit
+        self.rate_window = rate_window
+        # Every stall_every-th request waits stall_seconds longer, like a provider stall
+        self.stall_every = stall_every
+        self.stall_seconds = stall_seconds
+        self.connections = 0
+        self.requests = 0
+        self.rejected = 0
+        self._accepted_times = collections.deque()
+        self._counter_lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), StubLLMHandler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def count_connection(self):
+        with self._counter_lock:
+            self.connections += 1
+
+    def count_request(self) -> int:
+        with self._counter_lock:
+            self.requests += 1
+            return self.requests
+
+    def request_delay(self, number: int) -> float:
+        """Latency of the number-th request, including injected stalls"""
+        if self.stall_every and number % self.stall_every == 0:
+            return self.latency + self.stall_seconds
+        return self.latency
+
+    def check_rate_limit(self):
+        """Seconds the client has to wait if the request exceeds the rate limit, else None"""
+        if not self.rate_limit:
+            return None
+        with self._counter_lock:
+            now = time.monotonic()
+            while self._accepted_times and now - self._accepted_times[0] >= self.rate_window:
+                self._accepted_times.popleft()
+            if len(self._accepted_times) >= self.rate_limit:
+                self.rejected += 1
+                return self.rate_window - (now - self._accepted_times[0])
+            self._accepted_times.append(now)
+            return None
+
+    def make_reply(self, model: str, prompt: str) -> str:
+        """Deterministic review text for a prompt"""
+        words = ' '.join(f"note{i}" for i in range(self.reply_words))
+        return f"<h3>Stub review ({model})</h3><p>Prompt size: {len(prompt)} chars. {words}</p>"
+
+    def start(self) -> 'StubLLMServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a stub OpenAI-compatible LLM server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--latency', type=float, default=0.0, help="Seconds before each response")
+    parser.add_argument('--token-delay', type=float, default=0.0, help="Seconds between streamed words")
+    parser.add_argument('--rate-limit', type=int, default=0, help="Requests per window before answering 429")
+    parser.add_argument('--rate-window', type=float, default=60.0, help="Rate limit window in seconds")
+    parser.add_argument('--stall-every', type=int, default=0, help="Stall every N-th request")
+    parser.add_argument('--stall-seconds', type=float, default=0.0, help="Extra latency of a stalled request")
+    args = parser.parse_args()
+
+    server = StubLLMServer(args.latency, args.token_delay, args.host, args.port,
+                           rate_limit=args.rate_limit, rate_window=args.rate_window,
+                           stall_every=args.stall_every, stall_seconds=args.stall_seconds)
+    print(f"Stub LLM listening on {server.url}")
+    try:
+        server.start()._thread.join()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+"""
+Deterministic synthetic git repositories for the benchmarks.
+
+The whole history is generated in memory and written with a single
+`git fast-import`, so even thousands of commits take a few seconds. Files are
+Python modules with functions and classes, so the review context builder has
+real definitions to find. The same arguments always produce the same SHAs.
+
+Build one by hand:
+    python -m benchmarks.synthetic_repo /tmp/bench_repo --commits 500 --files 200 --merge-every 20
+"""
+
+import argparse
+import os
+import random
+import subprocess
+from typing import Dict, List
+
+AUTHOR = "Bench Author <bench@example.com>"
+START_TIMESTAMP = 1_700_000_000
+MAIN_BRANCH = "main"
+SIDE_BRANCH = "feature"
+
+
+def _function(rng: random.Random, index: int, body_lines: int) -> List[str]:
+    lines = [f"def function_{index}(value, factor={rng.randint(1, 9)}):",
+             f'    """Compute step {index} of the pipeline"""',
+             "    result = value"]
+    for step in range(body_lines):
+        lines.append(f"    result = result * factor + {rng.randint(0, 999)}  # step {step}")
+    lines.append("    return result")
+    lines.append("")
+    return lines
+
+
+def _class(rng: random.Random, index: int, methods: int) -> List[str]:
+    lines = [f"class Service{index}:", f'    """Service {index}"""', ""]
+    for method in range(methods):
+        lines += [f"    def method_{method}(self, value):",
+                  f"        return value + {rng.randint(0, 999)}",
+                  ""]
+    return lines
+
+
+def make_module(rng: random.Random, index: int, size: int) -> List[str]:
+    """Lines of a synthetic module with about size lines"""
+    lines = [f'"""Module {index}"""', "", "import os", ""]
+    number = 0
+    while len(lines) < size:
+        if number % 4 == 3:
+            lines += _class(rng, number, 3)
+        else:
+            lines += _function(rng, number, rng.randint(3, 12))
+        number += 1
+    return lines
+
+
+def change_module(rng: random.Random, lines: List[str], changed_lines: int) -> None:
+    """Rewrite, insert and delete about changed_lines lines of a module in place"""
+    for _ in range(changed_lines):
+        statements = [i for i, line in enumerate(lines) if line.startswith("    result = result")]
+        if not statements:
+            lines.append(f"CONSTANT_{len(lines)} = {rng.randint(0, 999)}")
+            continue
+        position = rng.choice(statements)
+        action = rng.random()
+        if action < 0.6:
+            lines[position] = f"    result = result - {rng.randint(0, 999)}  # changed"
+        elif action < 0.85:
+            lines.insert(position, f"    result = abs(result) + {rng.randint(0, 999)}  # added")
+        elif len(statements) > 1:
+            del lines[position]
+
+
+class _FastImportStream:
+    """Writer of a git fast-import command stream"""
+
+    def __init__(self):
+        self.parts: List[bytes] = []
+        self.next_mark = 1
+
+    def _mark(self) -> int:
+        mark = self.next_mark
+        self.next_mark += 1
+        return mark
+
+    def _data(self, data: bytes) -> None:
+        self.parts.append(b"data %d\n" % len(data))
+        self.parts.append(data)
+        self.parts.append(b"\n")
+
+    def blob(self, text: str) -> int:
+        mark = self._mark()
+        self.parts.append(b"blob\nmark :%d\n" % mark)
+        self._data(text.encode('utf-8'))
+        return mark
+
+    def commit(self, branch: str, timestamp: int, message: str, files: Dict[str, int],
+               parent: int = 0, merge: int = 0) -> int:
+        mark = self._mark()
+        signature = f"{AUTHOR} {timestamp} +0000".encode('utf-8')
+        self.parts.append(b"commit refs/heads/%s\nmark :%d\n" % (branch.encode('utf-8'), mark))
+        self.parts.append(b"author " + signature + b"\ncommitter " + signature + b"\n")
+        self._data(message.encode('utf-8'))
+        if parent:
+            self.parts.append(b"from :%d\n" % parent)
+        if merge:
+            self.parts.append(b"merge :%d\n" % merge)
+        for path, blob in sorted(files.items()):
+            self.parts.append(b"M 100644 :%d %s\n" % (blob, path.encode('utf-8')))
+        self.parts.append(b"\n")
+        return mark
+
+    def getvalue(self) -> bytes:
+        return b"".join(self.parts)
+
+
+def build_repo(
+    path: str,
+    commits: int = 100,
+    files: int = 50,
+    file_lines: int = 200,
+    files_per_commit: int = 3,
+    changed_lines: int = 10,
+    merge_every: int = 0,
+    seed: int = 1
+) -> str:
+    """
+    Create a synthetic repository
+
+    Args:
+        path: Directory of the new repository; must not exist or be empty
+        commits: Change commits after the initial one; every merge adds a feature and a merge commit
+        files: Number of Python modules
+        file_lines: Approximate size of every module in lines
+        files_per_commit: Modules changed by every commit
+        changed_lines: Lines changed per module and commit
+        merge_every: Merge a feature branch after every merge_every-th change (0: linear history)
+        seed: Random seed; the same arguments give the same history
+
+    Returns:
+        str: Full SHA of HEAD
+    """
+    rng = random.Random(seed)
+    modules = {f"pkg/module_{index:04d}.py": make_module(rng, index, file_lines) for index in range(files)}
+    paths = sorted(modules)
+    stream = _FastImportStream()
+    timestamp = START_TIMESTAMP
+
+    def write(changed: List[str]) -> Dict[str, int]:
+        return {name: stream.blob('\n'.join(modules[name]) + '\n') for name in changed}
+
+    head = stream.commit(MAIN_BRANCH, timestamp, "Initial commit\n", write(paths))
+    for number in range(1, commits + 1):
+        timestamp += 60
+        changed = rng.sample(paths, min(files_per_commit, len(paths)))
+        if merge_every and number % merge_every == 0:
+            # The feature branch changes other modules than the main branch commit it is merged into
+            side_paths = [name for name in paths if name not in changed][:files_per_commit]
+            for name in side_paths:
+                change_module(rng, modules[name], changed_lines)
+            side_blobs = write(side_paths)
+            side = stream.commit(SIDE_BRANCH, timestamp, f"Feature work {number}\n", side_blobs, head)
+            for name in changed:
+                change_module(rng, modules[name], changed_lines)
+            head = stream.commit(MAIN_BRANCH, timestamp, f"Change {number}\n", write(changed), head)
+            timestamp += 60
+            # The merge takes the main branch tree plus the feature branch modules
+            head = stream.commit(MAIN_BRANCH, timestamp, f"Merge feature {number}\n", side_blobs, head, side)
+        else:
+            for name in changed:
+                change_module(rng, modules[name], changed_lines)
+            head = stream.commit(MAIN_BRANCH, timestamp, f"Change {number}\n", write(changed), head)
+
+    os.makedirs(path, exist_ok=True)
+    subprocess.run(["git", "init", "-q", path], check=True)
+    subprocess.run(["git", "fast-import", "--quiet"], cwd=path, input=stream.getvalue(), check=True)
+    subprocess.run(["git", "symbolic-ref", "HEAD", f"refs/heads/{MAIN_BRANCH}"], cwd=path, check=True)
+    subprocess.run(["git", "reset", "-q", "--hard"], cwd=path, check=True)
+    return subprocess.run(["git", "rev-parse", "HEAD"], cwd=path, check=True,
+                          capture_output=True, text=True).stdout.strip()
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    """Add the repository shape options to a benchmark's argument parser"""
+    parser.add_argument('--commits', type=int, default=100, help="Commits after the initial one")
+    parser.add_argument('--files', type=int, default=50, help="Python modules in the repository")
+    parser.add_argument('--file-lines', type=int, default=200, help="Lines per module")
+    parser.add_argument('--files-per-commit', type=int, default=3, help="Modules changed by every commit")
+    parser.add_argument('--changed-lines', type=int, default=10, help="Lines changed per module and commit")
+    parser.add_argument('--merge-every', type=int, default=0, help="Merge a feature branch every N commits")
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def build_from_args(path: str, args: argparse.Namespace) -> str:
+    """Build a repository from the options added by add_arguments"""
+    return build_repo(path, args.commits, args.files, args.file_lines, args.files_per_commit,
+                      args.changed_lines, args.merge_every, args.seed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('path', help="Directory of the new repository")
+    add_arguments(parser)
+    args = parser.parse_args()
+    print(build_from_args(args.path, args))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,15 @@
-import tkinter as tk
-from src.gui import App
+import sys
 
 
 def main():
+    # Any arguments select the headless command line, which never loads tkinter
+    if len(sys.argv) > 1:
+        from src.cli import main as cli_main
+        sys.exit(cli_main())
+
+    import tkinter as tk
+    from src.gui import App
+
     root = tk.Tk()
     app = App(root)
     root.mainloop()
@@ -1,81 +1,163 @@
 import os
-from openai import OpenAI
-from openai import (
-    APIError,
-    APIConnectionError,
-    RateLimitError,
-    APIStatusError,
-    BadRequestError,
-    AuthenticationError,
-    PermissionDeniedError,
-    NotFoundError
-)
-
-
-from src.utils.logger import logger
-
-def ask_openai_router(question, file_path=None):
+import time
+
+from src.ai.client_pool import get_client
+from src.ai.hedging import hedged_call, parse_model_chain
+from src.ai.scheduler import RequestCancelled, RequestFailure, get_scheduler
+from src.ai.tokens import estimate_messages_tokens, usage_tracker
+from src.utils.metrics import metrics
+
+DEFAULT_MODEL_NAME = 'openai/gpt-4-mini'
+
+def build_messages(question, context=None):
     """
-    Send a question and optionally a Python file to API using OpenAI SDK through OpenRouter
+    Build chat messages from a question and optional prepared context
     """
-    client = OpenAI(
-        base_url=os.getenv('OPENROUTER_API_URL'),
-        api_key=os.getenv('OPENROUTER_API_KEY'),
-    )
+    messages = []
 
-    try:
-        messages = []
-
-        # If we have a file, read it and add as system message
-        if file_path and os.path.exists(file_path) and file_path.endswith('.py'):
-            with open(file_path, 'r', encoding='utf-8') as file:
-                file_content = file.read()
-                messages.append({
-                    "role": "system",
-                    "content": (
-                        f"This is the previous version of the code from file "
-                        f"'{file_path}' for context and comparison:\n\n{file_content}"
-                    )
-                })
-
-        # Add user question
+    if context:
         messages.append({
-            "role": "user",
-            "content": question
+            "role": "system",
+            "content": (
+                "This is the code around the changes (enclosing functions, classes and imports "
+                f"of the changed files) for context:\n\n{context}"
+            )
         })
 
-        completion = client.chat.completions.create(
-            model=os.getenv('MODEL_NAME', 'openai/gpt-4-mini'),  # Use default if not set
-            messages=messages
+    # Add user question
+    messages.append({
+        "role": "user",
+        "content": question
+    })
+    return messages
+
+def ask_openai_router(question, on_token=None, context=None, model=None, cancel_event=None, on_model=None):
+    """
+    Send a question and optionally prepared context to API using OpenAI SDK through OpenRouter
+
+    If on_token is given the completion is streamed and on_token is called with
+    each piece of text as it arrives; the full text is still returned at the end.
+    Estimated and reported token usage is recorded in usage_tracker.
+
+    The request goes to model (default: MODEL_NAME) first. If it is slow or fails, the same
+    request is sent to the next model of MODEL_FALLBACKS and the first answer
+    wins; the whole call is limited to REQUEST_DEADLINE_SECONDS. Each request
+    goes through the request scheduler, which throttles it per model and
+    retries transient failures. Once streamed text has been passed to
+    on_token, only that model's answer is used and it is not retried.
+
+    When cancel_event is set, no further request is sent and a running stream
+    is stopped at its next piece of text. on_model is called with the model
+    that answered.
+
+    Raises:
+        RequestFailure: Every model failed or the deadline passed
+        RequestCancelled: cancel_event was set before an answer arrived
+    """
+    messages = build_messages(question, context)
+    chain = parse_model_chain(model or os.getenv('MODEL_NAME', DEFAULT_MODEL_NAME),
+                              os.getenv('MODEL_FALLBACKS', ''))
+    estimated_tokens = estimate_messages_tokens(messages)
+
+    def attempt(endpoint, hedge):
+        client = get_client(endpoint.base_url)
+        started = time.monotonic()
+        first_token_at = []
+
+        def on_attempt_token(text):
+            if not first_token_at:
+                if not hedge.claim(endpoint):
+                    raise RequestCancelled(f"{endpoint!r} answered after another model")
+                first_token_at.append(time.monotonic())
+            if hedge.cancelled.is_set():
+                # The deadline passed while streaming
+                raise RequestCancelled(f"Stream from {endpoint!r} took too long")
+            if cancel_event is not None and cancel_event.is_set():
+                raise RequestCancelled(f"Stream from {endpoint!r} was cancelled")
+            on_token(text)
+
+        def request():
+            if hedge.cancelled.is_set():
+                raise RequestCancelled(f"Request to {endpoint!r} is no longer needed")
+            if cancel_event is not None and cancel_event.is_set():
+                raise RequestCancelled(f"Request to {endpoint!r} was cancelled")
+            if on_token is not None:
+                return _stream_completion(
+                    client, endpoint.model, messages, on_attempt_token, hedge.remaining()
+                )
+            completion = client.chat.completions.create(
+                model=endpoint.model,
+                messages=messages,
+                timeout=hedge.remaining()
+            )
+            return completion.choices[0].message.content, completion.usage
+
+        try:
+            content, usage = get_scheduler().run(
+                endpoint.model, estimated_tokens, request,
+                can_retry=lambda: not first_token_at and not hedge.cancelled.is_set(),
+                deadline=hedge.deadline
+            )
+        except RequestFailure as failure:
+            metrics.increment('api_failures_total', model=endpoint.model, kind=failure.kind)
+            raise
+        finished_at = time.monotonic()
+        usage_tracker.record(endpoint.model, estimated_tokens, usage)
+        first_token_seconds = first_token_at[0] - started if first_token_at else None
+        # Streams are hedged on the time to the first token
+        latency = first_token_seconds if first_token_seconds is not None else finished_at - started
+        return (content, usage, first_token_seconds, finished_at - started), latency
+
+    try:
+        endpoint, (content, usage, first_token_seconds, total_seconds) = hedged_call(
+            chain, attempt, hedge_key=lambda endpoint: f"{endpoint!r}:{'stream' if on_token else 'full'}"
         )
+    except RequestFailure:
+        # Every attempt gave up because of the cancel event, which is not a model failure
+        if cancel_event is not None and cancel_event.is_set():
+            raise RequestCancelled("The request was cancelled") from None
+        raise
+    if on_model is not None:
+        on_model(endpoint.model)
+    # Recorded here rather than in attempt, so the metrics carry the caller's context labels
+    metrics.observe('api_request_seconds', total_seconds, model=endpoint.model)
+    if first_token_seconds is not None:
+        metrics.observe('api_time_to_first_token_seconds', first_token_seconds, model=endpoint.model)
+    metrics.increment('api_tokens_total', estimated_tokens, model=endpoint.model, kind='estimated_prompt')
+    metrics.increment('api_tokens_total', getattr(usage, 'prompt_tokens', None) or 0,
+                      model=endpoint.model, kind='prompt')
+    metrics.increment('api_tokens_total', getattr(usage, 'completion_tokens', None) or 0,
+                      model=endpoint.model, kind='completion')
+    return content
+
+def _stream_completion(client, model, messages, on_token, timeout=None):
+    """
+    Stream a chat completion, passing each text delta to on_token
+
+    Returns the full text and the usage reported in the last chunk (or None).
+    The stream is closed if on_token raises.
+    """
+    stream = client.chat.completions.create(
+        model=model,
+        messages=messages,
+        stream=True,
+        stream_options={"include_usage": True},
+        timeout=timeout
+    )
+
+    parts = []
+    usage = None
+    try:
+        for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content
+            if text:
+                parts.append(text)
+                on_token(text)
+    finally:
+        stream.close()
 
-        return completion.choices[0].message.content
-
-    except APIConnectionError as connection_error:
-        logger.log(f"Error connecting to API: {connection_error.__cause__}")
-        error_message = "Sorry, there was an error connecting to the API."
-    except RateLimitError as rate_error:
-        logger.log(f"Rate limit exceeded: {rate_error}")
-        error_message = "Sorry, the API rate limit has been exceeded. Please try again later."
-    except AuthenticationError as auth_error:
-        logger.log(f"Authentication error: {auth_error}")
-        error_message = "Sorry, there was an authentication error. Please check your API key."
-    except BadRequestError as request_error:
-        logger.log(f"Bad request error: {request_error}")
-        error_message = "Sorry, there was an error with the request format."
-    except PermissionDeniedError as perm_error:
-        logger.log(f"Permission denied: {perm_error}")
-        error_message = "Sorry, you don't have permission to perform this action."
-    except NotFoundError as not_found_error:
-        logger.log(f"Resource not found: {not_found_error}")
-        error_message = "Sorry, the requested resource was not found."
-    except APIStatusError as status_error:
-        logger.log(f"API error (status {status_error.status_code}): {status_error.response}")
-        error_message = "Sorry, there was an error processing your request."
-    except APIError as api_error:
-        logger.log(f"API error: {api_error}")
-        error_message = "Sorry, there was an unexpected API error."
-    else:
-        return completion.choices[0].message.content
-
-    return error_message
+    return ''.join(parts), usage
@@ -0,0 +1,111 @@
+"""
+Process-wide OpenAI clients with pooled keep-alive HTTP connections.
+
+Creating an OpenAI client per request also creates a new connection pool, so
+every review paid for DNS, TCP and TLS setup again. Clients are created once
+per (base URL, API key) and shared by all review paths and threads.
+"""
+
+import importlib.util
+import os
+import threading
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+
+from src.utils.settings import env_float, env_int
+
+if TYPE_CHECKING:
+    # httpx and openai are imported on first use, so git-only and CLI paths start fast
+    import httpx
+    from openai import OpenAI
+
+DEFAULT_TIMEOUT_SECONDS = 120.0
+DEFAULT_CONNECT_TIMEOUT_SECONDS = 10.0
+DEFAULT_MAX_CONNECTIONS = 20
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 10
+DEFAULT_KEEPALIVE_EXPIRY_SECONDS = 90.0
+
+_clients: Dict[Tuple[Optional[str], Optional[str]], 'OpenAI'] = {}
+_lock = threading.Lock()
+
+
+def is_http2_enabled() -> bool:
+    """
+    Check whether HTTP/2 should be used (OPENROUTER_HTTP2: auto, 1 or 0)
+
+    In auto mode HTTP/2 is used when the optional h2 package is installed.
+    """
+    setting = os.getenv('OPENROUTER_HTTP2', 'auto').lower()
+    if setting in ('0', 'false', 'no'):
+        return False
+    if setting in ('1', 'true', 'yes'):
+        return True
+    return importlib.util.find_spec('h2') is not None
+
+
+def build_http_client() -> 'httpx.Client':
+    """
+    Build the pooled HTTP client configured from OPENROUTER_* environment variables
+
+    Returns:
+        httpx.Client: Client with keep-alive pooling and timeouts
+    """
+    import httpx
+
+    timeout = httpx.Timeout(
+        env_float('OPENROUTER_TIMEOUT', DEFAULT_TIMEOUT_SECONDS),
+        connect=env_float('OPENROUTER_CONNECT_TIMEOUT', DEFAULT_CONNECT_TIMEOUT_SECONDS)
+    )
+    limits = httpx.Limits(
+        max_connections=env_int('OPENROUTER_MAX_CONNECTIONS', DEFAULT_MAX_CONNECTIONS),
+        max_keepalive_connections=env_int(
+            'OPENROUTER_MAX_KEEPALIVE_CONNECTIONS', DEFAULT_MAX_KEEPALIVE_CONNECTIONS
+        ),
+        keepalive_expiry=env_float('OPENROUTER_KEEPALIVE_EXPIRY', DEFAULT_KEEPALIVE_EXPIRY_SECONDS)
+    )
+    return httpx.Client(timeout=timeout, limits=limits, http2=is_http2_enabled())
+
+
+def get_client(base_url: Optional[str] = None, api_key: Optional[str] = None) -> 'OpenAI':
+    """
+    Get the shared client for an endpoint
+
+    Args:
+        base_url: API base URL (default: OPENROUTER_API_URL)
+        api_key: API key (default: OPENROUTER_API_KEY)
+
+    Returns:
+        OpenAI: Client reused by every caller with the same endpoint and key
+    """
+    base_url = base_url or os.getenv('OPENROUTER_API_URL')
+    api_key = api_key or os.getenv('OPENROUTER_API_KEY')
+    key = (base_url, api_key)
+
+    client = _clients.get(key)
+    if client is not None:
+        return client
+
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            from openai import OpenAI
+
+            http_client = build_http_client()
+            client = OpenAI(
+                base_url=base_url,
+                api_key=api_key,
+                timeout=http_client.timeout,
+                http_client=http_client,
+                # Retries are done by the request scheduler, which knows about all requests
+                max_retries=0,
+            )
+            _clients[key] = client
+    return client
+
+
+def close_clients() -> None:
+    """Close all shared clients and their connection pools"""
+    with _lock:
+        clients = list(_clients.values())
+        _clients.clear()
+    for client in clients:
+        client.close()
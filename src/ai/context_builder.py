@@ -0,0 +1,234 @@
+"""
+Review context built from the code around each change.
+
+Instead of attaching one whole file, the builder looks up the functions and
+classes that enclose every changed hunk in all changed Python files, plus each
+file's imports, and packs them into a token budget. Symbol indexes are cached
+by blob SHA, so a file version is parsed at most once per process.
+"""
+
+import ast
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from src.ai.tokens import estimate_tokens
+from src.git.diff_model import Diff, FileDiff
+from src.git.path_filter import get_max_context_file_bytes, is_binary
+from src.git.repository import Repository
+from src.utils.logger import logger
+
+# Symbols longer than this are shown as their header plus the lines around the change
+MAX_SYMBOL_LINES = 120
+SYMBOL_WINDOW_LINES = 20
+
+# Lines shown around a change when the file cannot be parsed
+FALLBACK_WINDOW_LINES = 15
+
+INDEX_CACHE_SIZE = 1024
+
+
+class Symbol:
+    """A function or class definition in a source file"""
+
+    __slots__ = ('start', 'end', 'body_start', 'kind', 'name', 'depth')
+
+    def __init__(self, start: int, end: int, body_start: int, kind: str, name: str, depth: int):
+        self.start = start
+        self.end = end
+        self.body_start = body_start
+        self.kind = kind
+        self.name = name
+        self.depth = depth
+
+
+class SymbolIndex:
+    """Imports and definitions of one version of a Python file"""
+
+    __slots__ = ('lines', 'import_lines', 'symbols', 'parsed')
+
+    def __init__(self, source: str):
+        self.lines = source.splitlines()
+        self.import_lines: List[int] = []
+        self.symbols: List[Symbol] = []
+        self.parsed = False
+        try:
+            tree = ast.parse(source)
+        except (SyntaxError, ValueError):
+            return
+        self.parsed = True
+
+        for node in tree.body:
+            if isinstance(node, (ast.Import, ast.ImportFrom)):
+                self.import_lines.extend(range(node.lineno, (node.end_lineno or node.lineno) + 1))
+        self._collect(tree.body, '', 0)
+
+    def _collect(self, nodes, prefix: str, depth: int) -> None:
+        for node in nodes:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                start = min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+                kind = 'class' if isinstance(node, ast.ClassDef) else 'def'
+                name = f"{prefix}{node.name}"
+                self.symbols.append(Symbol(
+                    start, node.end_lineno or node.lineno, node.body[0].lineno, kind, name, depth
+                ))
+                self._collect(node.body, f"{name}.", depth + 1)
+
+    def innermost(self, line: int) -> Optional[Symbol]:
+        """Deepest definition that contains the line"""
+        best = None
+        for symbol in self.symbols:
+            if symbol.start <= line <= symbol.end and (best is None or symbol.depth > best.depth):
+                best = symbol
+        return best
+
+    def text(self, start: int, end: int) -> str:
+        """Source lines start..end (1-based, inclusive)"""
+        return '\n'.join(self.lines[max(start, 1) - 1:end])
+
+
+class SymbolIndexCache:
+    """Bounded LRU of symbol indexes keyed by blob SHA"""
+
+    def __init__(self, max_size: int = INDEX_CACHE_SIZE):
+        self.max_size = max_size
+        self._indexes: 'OrderedDict[str, SymbolIndex]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.parses = 0
+
+    def get(self, blob_sha: str, content: bytes) -> SymbolIndex:
+        with self._lock:
+            index = self._indexes.get(blob_sha)
+            if index is not None:
+                self._indexes.move_to_end(blob_sha)
+                return index
+
+        index = SymbolIndex(content.decode('utf-8', 'replace'))
+        with self._lock:
+            self.parses += 1
+            self._indexes[blob_sha] = index
+            while len(self._indexes) > self.max_size:
+                self._indexes.popitem(last=False)
+        return index
+
+
+symbol_index_cache = SymbolIndexCache()
+
+
+def _changed_lines(file_diff: FileDiff) -> List[Tuple[int, int]]:
+    """Line ranges of the new file touched by each hunk"""
+    ranges = []
+    for hunk in file_diff.hunks:
+        added = hunk.added_ranges()
+        if added:
+            ranges.extend(added)
+        else:
+            # Pure deletion: the place where lines disappeared
+            ranges.append((hunk.new_start, hunk.new_start))
+    return ranges
+
+
+def _header(index: SymbolIndex, symbol: Symbol) -> str:
+    """Decorators and signature of a definition"""
+    return index.text(symbol.start, max(symbol.body_start - 1, symbol.start))
+
+
+def _symbol_snippet(index: SymbolIndex, symbol: Symbol, changed: Tuple[int, int]) -> str:
+    """
+    Source of a symbol, cut to its header and the changed area if it is long;
+    methods are shown under the signature of their class
+    """
+    if symbol.end - symbol.start + 1 <= MAX_SYMBOL_LINES:
+        text = index.text(symbol.start, symbol.end)
+    else:
+        window_start = max(changed[0] - SYMBOL_WINDOW_LINES, symbol.body_start)
+        window_end = min(changed[1] + SYMBOL_WINDOW_LINES, symbol.end)
+        text = f"{_header(index, symbol)}\n    ...\n{index.text(window_start, window_end)}\n    ..."
+
+    parents = [
+        parent for parent in index.symbols
+        if parent.depth < symbol.depth and parent.start <= symbol.start and parent.end >= symbol.end
+    ]
+    for parent in sorted(parents, key=lambda parent: parent.depth, reverse=True):
+        text = f"{_header(index, parent)}\n    ...\n{text}"
+    return text
+
+
+def file_context(index: SymbolIndex, path: str, file_diff: FileDiff) -> List[str]:
+    """
+    Context snippets for one changed file
+
+    Args:
+        index: Symbol index of the new version of the file
+        path: File path
+        file_diff: Changes of the file
+
+    Returns:
+        List[str]: Imports first, then enclosing definitions in file order
+    """
+    snippets = []
+    if index.import_lines:
+        imports = '\n'.join(index.lines[line - 1] for line in index.import_lines if line <= len(index.lines))
+        snippets.append(f"# {path}: imports\n{imports}")
+
+    seen = set()
+    definitions = []
+    for changed in _changed_lines(file_diff):
+        if not index.parsed:
+            start = max(changed[0] - FALLBACK_WINDOW_LINES, 1)
+            end = changed[1] + FALLBACK_WINDOW_LINES
+            if (start, end) not in seen:
+                seen.add((start, end))
+                definitions.append((start, f"# {path}:{start}-{end}\n{index.text(start, end)}"))
+            continue
+
+        for line in {changed[0], changed[1]}:
+            symbol = index.innermost(line)
+            if symbol is None or symbol.name in seen:
+                continue
+            seen.add(symbol.name)
+            title = f"# {path}:{symbol.start}-{symbol.end} ({symbol.kind} {symbol.name})"
+            definitions.append((symbol.start, f"{title}\n{_symbol_snippet(index, symbol, changed)}"))
+
+    snippets.extend(text for _, text in sorted(definitions))
+    return snippets
+
+
+def build_review_context(repository: Repository, commit: str, diff: Diff, max_tokens: int) -> str:
+    """
+    Collect the code around every change of a commit within a token budget
+
+    Args:
+        repository: Repository the commit belongs to
+        commit: Commit SHA; files are read as of this commit
+        diff: Structured diff of the commit
+        max_tokens: Token budget for the whole context
+
+    Returns:
+        str: Context text, empty if nothing fits or no Python file changed
+    """
+    max_file_bytes = get_max_context_file_bytes()
+    parts = []
+    used = 0
+    skipped = 0
+    for file_diff in diff:
+        if not file_diff.new_path or not file_diff.new_path.endswith('.py') or not file_diff.hunks:
+            continue
+        # Larger files are skipped after reading only the size from git
+        blob = repository.read_file(commit, file_diff.new_path, max_bytes=max_file_bytes)
+        if blob is None or is_binary(blob[1]):
+            continue
+        blob_sha, content = blob
+        index = symbol_index_cache.get(blob_sha, content)
+
+        for snippet in file_context(index, file_diff.new_path, file_diff):
+            snippet_tokens = estimate_tokens(snippet)
+            if used + snippet_tokens > max_tokens:
+                skipped += 1
+                continue
+            parts.append(snippet)
+            used += snippet_tokens
+
+    if skipped:
+        logger.log(f"Context budget of {max_tokens} tokens reached, {skipped} snippets left out")
+    return '\n\n'.join(parts)
@@ -11,3 +11,25 @@ REVIEW_PROMPT = '''
 Изменения в коде:
 {changes}
 '''
+
+CHUNK_REVIEW_PROMPT = '''
+Проведи code review для части изменений одного коммита (часть {index} из {total}).
+Коммит слишком большой, поэтому остальные части проверяются отдельно.
+В первую очередь напиши об ошибках если они есть.
+Ответ дай в виде HTML.
+Ответ дай на языке: {language}.
+
+Изменения в коде:
+{changes}
+'''
+
+MERGE_REVIEW_PROMPT = '''
+Ниже приведены результаты code review отдельных частей одного коммита.
+Объедини их в один итоговый отчет: убери повторы, сгруппируй замечания по файлам.
+В первую очередь напиши об ошибках если они есть.
+Ответ дай в виде HTML.
+Ответ дай на языке: {language}.
+
+Результаты по частям:
+{reviews}
+'''
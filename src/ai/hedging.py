@@ -0,0 +1,252 @@
+"""
+Hedged requests over an ordered chain of models.
+
+The primary model gets the request first. If it has not answered within a
+high percentile of its recent latency, the same request also goes to the next
+model in the chain, and the first good answer wins. A model that fails hands
+over to the next one immediately. Every call has an overall deadline.
+
+Slow answers are usually provider stalls rather than long reviews, so a
+duplicate request after the p95 latency cuts the tail at the cost of a few
+percent more requests.
+"""
+
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Tuple, TypeVar
+
+from src.ai.scheduler import RequestCancelled, RequestFailure
+from src.utils.logger import logger
+from src.utils.settings import env_float
+
+T = TypeVar('T')
+
+DEFAULT_HEDGE_PERCENTILE = 95.0
+DEFAULT_HEDGE_MIN_DELAY_SECONDS = 2.0
+# Used until a model has enough latency samples
+DEFAULT_HEDGE_DELAY_SECONDS = 30.0
+DEFAULT_REQUEST_DEADLINE_SECONDS = 300.0
+
+LATENCY_WINDOW = 200
+MIN_LATENCY_SAMPLES = 10
+
+
+class ModelEndpoint:
+    """A model and the API endpoint that serves it"""
+
+    __slots__ = ('model', 'base_url')
+
+    def __init__(self, model: str, base_url: Optional[str] = None):
+        self.model = model
+        self.base_url = base_url
+
+    def __repr__(self) -> str:
+        return f"{self.model}@{self.base_url}" if self.base_url else self.model
+
+
+def parse_model_chain(primary: str, fallbacks: str) -> List[ModelEndpoint]:
+    """
+    Build the ordered model chain
+
+    Args:
+        primary: Primary model name
+        fallbacks: Comma separated fallback models; "model@https://host/v1" selects another
+            endpoint for that model
+
+    Returns:
+        List[ModelEndpoint]: Primary first, then the fallbacks in order
+    """
+    chain = [ModelEndpoint(primary)]
+    for entry in fallbacks.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        model, separator, base_url = entry.partition('@')
+        chain.append(ModelEndpoint(model.strip(), base_url.strip() if separator else None))
+    return chain
+
+
+class LatencyTracker:
+    """Recent answer latencies per model, for percentile based hedging"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float) -> None:
+        with self._lock:
+            samples = self._samples.get(key)
+            if samples is None:
+                samples = self._samples[key] = deque(maxlen=self.window)
+            samples.append(seconds)
+
+    def percentile(self, key: str, percent: float) -> Optional[float]:
+        """
+        Get a latency percentile
+
+        Args:
+            key: Model key
+            percent: Percentile between 0 and 100
+
+        Returns:
+            Optional[float]: Seconds, or None while there are fewer than MIN_LATENCY_SAMPLES samples
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < MIN_LATENCY_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(len(samples) * percent / 100))
+        return samples[index]
+
+
+latency_tracker = LatencyTracker()
+
+
+def get_request_deadline() -> float:
+    """Get the overall time limit of one API call in seconds (REQUEST_DEADLINE_SECONDS)"""
+    return env_float('REQUEST_DEADLINE_SECONDS', DEFAULT_REQUEST_DEADLINE_SECONDS)
+
+
+def is_hedging_enabled() -> bool:
+    """Check whether slow requests are duplicated to the next model (HEDGE_ENABLED)"""
+    return os.getenv('HEDGE_ENABLED', '1').lower() in ('1', 'true', 'yes')
+
+
+def get_hedge_delay(key: str) -> float:
+    """
+    Get how long to wait for a model before sending a hedged duplicate
+
+    The HEDGE_PERCENTILE of the model's recent latency, at least
+    HEDGE_MIN_DELAY_SECONDS; HEDGE_DEFAULT_DELAY_SECONDS until enough samples exist.
+    """
+    observed = latency_tracker.percentile(key, env_float('HEDGE_PERCENTILE', DEFAULT_HEDGE_PERCENTILE))
+    if observed is None:
+        return env_float('HEDGE_DEFAULT_DELAY_SECONDS', DEFAULT_HEDGE_DELAY_SECONDS)
+    return max(observed, env_float('HEDGE_MIN_DELAY_SECONDS', DEFAULT_HEDGE_MIN_DELAY_SECONDS))
+
+
+class Hedge:
+    """
+    Shared state of one hedged call
+
+    Attempts check cancelled to stop early. A streaming attempt claims the
+    call with its first token: from then on only its output is used and no
+    further duplicates are sent.
+    """
+
+    def __init__(self, deadline: float):
+        self.deadline = deadline
+        self.cancelled = threading.Event()
+        self.winner: Optional[ModelEndpoint] = None
+        self._lock = threading.Lock()
+
+    def claim(self, endpoint: ModelEndpoint) -> bool:
+        """Make endpoint the winner unless another attempt already is; True if endpoint wins"""
+        with self._lock:
+            if self.winner is None:
+                self.winner = endpoint
+            return self.winner is endpoint
+
+    def remaining(self) -> float:
+        return max(0.0, self.deadline - time.monotonic())
+
+
+def hedged_call(
+    chain: List[ModelEndpoint],
+    attempt: Callable[[ModelEndpoint, Hedge], Tuple[T, float]],
+    deadline_seconds: Optional[float] = None,
+    hedge_key: Callable[[ModelEndpoint], str] = repr
+) -> Tuple[ModelEndpoint, T]:
+    """
+    Run a request over a model chain with hedging and fallback
+
+    Args:
+        chain: Models in order of preference
+        attempt: Sends the request to one model and returns (result, latency to record); it
+            should give up when hedge.cancelled is set and must call hedge.claim before
+            showing any output
+        deadline_seconds: Overall time limit (default: REQUEST_DEADLINE_SECONDS)
+        hedge_key: Latency tracker key of a model
+
+    Returns:
+        Tuple[ModelEndpoint, T]: The model that answered first and its result
+
+    Raises:
+        RequestFailure: Every model failed, or the deadline passed without an answer
+    """
+    if deadline_seconds is None:
+        deadline_seconds = get_request_deadline()
+    hedge = Hedge(time.monotonic() + deadline_seconds)
+    results: 'queue.Queue[Tuple[ModelEndpoint, bool, object, float]]' = queue.Queue()
+    hedging = is_hedging_enabled()
+
+    def run(endpoint: ModelEndpoint) -> None:
+        started = time.monotonic()
+        try:
+            value, latency = attempt(endpoint, hedge)
+            results.put((endpoint, True, value, latency))
+        except Exception as e:
+            results.put((endpoint, False, e, time.monotonic() - started))
+
+    launched = 0
+    running = 0
+    failures: List[Exception] = []
+    next_hedge_at = 0.0
+
+    def launch() -> None:
+        nonlocal launched, running, next_hedge_at
+        endpoint = chain[launched]
+        launched += 1
+        running += 1
+        next_hedge_at = time.monotonic() + get_hedge_delay(hedge_key(endpoint))
+        threading.Thread(target=run, args=(endpoint,), name=f"hedge-{endpoint.model}", daemon=True).start()
+
+    launch()
+    while True:
+        can_hedge = hedging and launched < len(chain) and hedge.winner is None
+        wait_until = min(next_hedge_at, hedge.deadline) if can_hedge else hedge.deadline
+        try:
+            endpoint, ok, value, latency = results.get(timeout=max(0.0, wait_until - time.monotonic()))
+        except queue.Empty:
+            if time.monotonic() >= hedge.deadline:
+                hedge.cancelled.set()
+                tried = ', '.join(map(repr, chain[:launched]))
+                logger.log(f"No answer from {tried} within {deadline_seconds:.0f}s")
+                raise RequestFailure(RequestFailure.DEADLINE, model=chain[0].model, attempts=launched)
+            logger.log(
+                f"No answer from {chain[launched - 1]!r} yet, sending a hedged request to {chain[launched]!r}"
+            )
+            launch()
+            continue
+
+        running -= 1
+        if not ok and not isinstance(value, (RequestFailure, RequestCancelled)):
+            # A bug, not a model failure: no fallback model would do better
+            hedge.cancelled.set()
+            raise value
+        if ok and hedge.claim(endpoint):
+            hedge.cancelled.set()
+            latency_tracker.record(hedge_key(endpoint), latency)
+            if endpoint is not chain[0]:
+                logger.log(f"Answer came from {endpoint!r} instead of {chain[0]!r}")
+            return endpoint, value
+
+        if not ok:
+            failures.append(value)
+            if not isinstance(value, RequestCancelled):
+                logger.log(f"Request to {endpoint!r} failed: {value}")
+        if hedge.winner is endpoint or (hedge.winner is None and launched >= len(chain) and not running):
+            # The streaming winner failed after showing output, or every model failed
+            hedge.cancelled.set()
+            last = failures[-1]
+            if isinstance(last, RequestCancelled):
+                raise RequestFailure(RequestFailure.DEADLINE, str(last), model=endpoint.model,
+                                     attempts=launched)
+            raise last
+        if hedge.winner is None and launched < len(chain):
+            # Fall back to the next model right away
+            launch()
@@ -0,0 +1,387 @@
+"""
+Rate-limit-aware scheduling of API requests.
+
+Every request passes through per-model token buckets for requests and tokens
+per minute, so parallel reviews are spread out instead of failing in bursts.
+Transient failures (rate limits, timeouts, connection and server errors) are
+retried with exponential backoff and full jitter. A Retry-After header from
+the provider takes precedence and pauses the whole model, not only the request
+that received it. A request that still fails raises RequestFailure, which
+says what went wrong.
+"""
+
+import email.utils
+import json
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+from src.utils.logger import logger
+from src.utils.settings import env_float, env_int
+
+T = TypeVar('T')
+
+DEFAULT_MAX_RETRIES = 5
+DEFAULT_BASE_DELAY_SECONDS = 1.0
+DEFAULT_MAX_DELAY_SECONDS = 60.0
+
+
+class RequestFailure(Exception):
+    """
+    An API request that failed for good
+
+    kind is one of the constants below. retryable tells whether the same
+    request may succeed later; such failures were retried until attempts ran out.
+    """
+
+    RATE_LIMITED = 'rate_limited'
+    TIMEOUT = 'timeout'
+    CONNECTION = 'connection'
+    SERVER = 'server_error'
+    AUTHENTICATION = 'authentication'
+    PERMISSION = 'permission_denied'
+    BAD_REQUEST = 'bad_request'
+    NOT_FOUND = 'not_found'
+    DEADLINE = 'deadline_exceeded'
+    API = 'api_error'
+
+    RETRYABLE_KINDS = (RATE_LIMITED, TIMEOUT, CONNECTION, SERVER)
+
+    MESSAGES = {
+        RATE_LIMITED: "API rate limit exceeded",
+        TIMEOUT: "API request timed out",
+        CONNECTION: "Could not connect to the API",
+        SERVER: "API server error",
+        AUTHENTICATION: "API authentication failed, check the API key",
+        PERMISSION: "No permission for this API request",
+        BAD_REQUEST: "API rejected the request format",
+        NOT_FOUND: "API resource or model not found",
+        DEADLINE: "No API answer before the request deadline",
+        API: "Unexpected API error",
+    }
+
+    def __init__(self, kind: str, detail: str = '', status_code: Optional[int] = None,
+                 retry_after: Optional[float] = None, model: Optional[str] = None, attempts: int = 1):
+        self.kind = kind
+        self.detail = detail
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.model = model
+        self.attempts = attempts
+        super().__init__(str(self))
+
+    @property
+    def retryable(self) -> bool:
+        return self.kind in self.RETRYABLE_KINDS
+
+    def __str__(self) -> str:
+        message = self.MESSAGES.get(self.kind, self.MESSAGES[self.API])
+        if self.status_code is not None:
+            message += f" (HTTP {self.status_code})"
+        if self.model:
+            message += f", model {self.model}"
+        if self.attempts > 1:
+            message += f", after {self.attempts} attempts"
+        return message
+
+
+class RequestCancelled(Exception):
+    """A request its caller gave up on, e.g. the slower side of a hedged call; never retried"""
+
+
+def parse_retry_after(headers) -> Optional[float]:
+    """
+    Read the delay a provider asks for from response headers
+
+    Args:
+        headers: Response headers (retry-after-ms, retry-after in seconds or as an HTTP date)
+
+    Returns:
+        Optional[float]: Seconds to wait, or None if the headers do not say
+    """
+    if not headers:
+        return None
+    value = headers.get('retry-after-ms')
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get('retry-after')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def classify_error(error: Exception, model: Optional[str] = None,
+                   attempts: int = 1) -> Optional[RequestFailure]:
+    """
+    Turn an exception from the OpenAI SDK or its HTTP transport into a RequestFailure
+
+    Args:
+        error: Exception raised by a request
+        model: Model of the request
+        attempts: Attempts made so far
+
+    Returns:
+        Optional[RequestFailure]: Typed failure, None if the exception is not an API or HTTP
+            error, such as a bug in the calling code
+    """
+    if isinstance(error, RequestFailure):
+        return error
+
+    import httpx
+    import openai
+
+    status_code = getattr(error, 'status_code', None)
+    response = getattr(error, 'response', None)
+    retry_after = parse_retry_after(getattr(response, 'headers', None))
+
+    if isinstance(error, openai.APITimeoutError):
+        kind = RequestFailure.TIMEOUT
+    elif isinstance(error, openai.APIConnectionError):
+        kind = RequestFailure.CONNECTION
+    elif isinstance(error, openai.RateLimitError):
+        kind = RequestFailure.RATE_LIMITED
+    elif isinstance(error, openai.AuthenticationError):
+        kind = RequestFailure.AUTHENTICATION
+    elif isinstance(error, openai.PermissionDeniedError):
+        kind = RequestFailure.PERMISSION
+    elif isinstance(error, openai.NotFoundError):
+        kind = RequestFailure.NOT_FOUND
+    elif isinstance(error, (openai.BadRequestError, openai.UnprocessableEntityError)):
+        kind = RequestFailure.BAD_REQUEST
+    elif isinstance(error, openai.APIStatusError) and (status_code >= 500 or status_code in (408, 409)):
+        kind = RequestFailure.TIMEOUT if status_code == 408 else RequestFailure.SERVER
+    elif isinstance(error, openai.APIError):
+        kind = RequestFailure.API
+    # Errors while a stream is read come from httpx directly, the SDK does not wrap them
+    elif isinstance(error, httpx.TimeoutException):
+        kind = RequestFailure.TIMEOUT
+    elif isinstance(error, httpx.TransportError):
+        kind = RequestFailure.CONNECTION
+    elif isinstance(error, httpx.HTTPError):
+        kind = RequestFailure.API
+    else:
+        return None
+
+    return RequestFailure(kind, str(error), status_code, retry_after, model, attempts)
+
+
+class TokenBucket:
+    """
+    Classic token bucket; callers reserve capacity and sleep until it is theirs
+
+    Reserving first and sleeping afterwards keeps waiting callers in arrival
+    order without a polling loop.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 60.0):
+        self.rate = per_minute / 60.0
+        # At most burst_seconds worth of units can be used at once
+        self.capacity = max(1.0, self.rate * burst_seconds)
+        self._available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """
+        Take amount from the bucket
+
+        Args:
+            amount: Units to take; more than the capacity is treated as the capacity
+
+        Returns:
+            float: Seconds to wait before the reserved units may be used
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+            self._updated = now
+            self._available -= min(amount, self.capacity)
+            return max(0.0, -self._available / self.rate)
+
+
+class ModelLimiter:
+    """Request and token buckets of one model plus a shared pause after rate limit errors"""
+
+    def __init__(self, model: str, requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 burst_seconds: float = 60.0):
+        self.model = model
+        self.requests = TokenBucket(requests_per_minute, burst_seconds) if requests_per_minute > 0 else None
+        self.tokens = TokenBucket(tokens_per_minute, burst_seconds) if tokens_per_minute > 0 else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every request of this model for the given time"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def acquire(self, tokens: int) -> float:
+        """
+        Wait until a request with the given number of tokens may be sent
+
+        Args:
+            tokens: Estimated prompt tokens of the request
+
+        Returns:
+            float: Seconds waited
+        """
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None:
+            wait = max(wait, self.tokens.reserve(tokens))
+        with self._lock:
+            wait = max(wait, self._paused_until - time.monotonic())
+        if wait > 0:
+            time.sleep(wait)
+        return max(wait, 0.0)
+
+
+class RequestScheduler:
+    """
+    Runs API requests through per-model limiters and retries transient failures
+    """
+
+    def __init__(self, max_retries: int = DEFAULT_MAX_RETRIES,
+                 base_delay: float = DEFAULT_BASE_DELAY_SECONDS,
+                 max_delay: float = DEFAULT_MAX_DELAY_SECONDS,
+                 requests_per_minute: float = 0, tokens_per_minute: float = 0,
+                 burst_seconds: float = 60.0,
+                 model_limits: Optional[Dict[str, Dict[str, float]]] = None):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.burst_seconds = burst_seconds
+        self.model_limits = model_limits or {}
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> 'RequestScheduler':
+        """
+        Create a scheduler configured from environment variables
+
+        API_MAX_RETRIES, API_RETRY_BASE_DELAY and API_RETRY_MAX_DELAY control
+        retries. API_REQUESTS_PER_MINUTE and API_TOKENS_PER_MINUTE limit every
+        model (0 means unlimited); API_BURST_SECONDS is how many seconds worth of
+        that rate may be sent at once. API_MODEL_LIMITS sets limits per model as JSON,
+        e.g. {"openai/gpt-4o": {"requests_per_minute": 60, "tokens_per_minute": 150000}}.
+        """
+        model_limits = {}
+        raw_limits = os.getenv('API_MODEL_LIMITS', '').strip()
+        if raw_limits:
+            try:
+                model_limits = json.loads(raw_limits)
+            except ValueError as e:
+                logger.log(f"Ignoring invalid API_MODEL_LIMITS: {e}")
+        return cls(
+            max_retries=env_int('API_MAX_RETRIES', DEFAULT_MAX_RETRIES),
+            base_delay=env_float('API_RETRY_BASE_DELAY', DEFAULT_BASE_DELAY_SECONDS),
+            max_delay=env_float('API_RETRY_MAX_DELAY', DEFAULT_MAX_DELAY_SECONDS),
+            requests_per_minute=env_float('API_REQUESTS_PER_MINUTE', 0),
+            tokens_per_minute=env_float('API_TOKENS_PER_MINUTE', 0),
+            burst_seconds=env_float('API_BURST_SECONDS', 60.0),
+            model_limits=model_limits,
+        )
+
+    def limiter(self, model: str) -> ModelLimiter:
+        """Get the limiter of a model"""
+        with self._lock:
+            limiter = self._limiters.get(model)
+            if limiter is None:
+                limits = self.model_limits.get(model, {})
+                limiter = ModelLimiter(
+                    model,
+                    float(limits.get('requests_per_minute', self.requests_per_minute)),
+                    float(limits.get('tokens_per_minute', self.tokens_per_minute)),
+                    self.burst_seconds
+                )
+                self._limiters[model] = limiter
+            return limiter
+
+    def backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter for the given retry (1-based)"""
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+
+    def run(self, model: str, tokens: int, request: Callable[[], T],
+            can_retry: Optional[Callable[[], bool]] = None, deadline: Optional[float] = None) -> T:
+        """
+        Send a request when the model's limits allow it, retrying transient failures
+
+        Args:
+            model: Model the request goes to
+            tokens: Estimated prompt tokens of the request
+            request: Performs the request; called again for every retry
+            can_retry: Checked before a retry, e.g. False once streamed text was shown
+            deadline: time.monotonic() value after which no retry is started
+
+        Returns:
+            T: Result of request
+
+        Raises:
+            RequestFailure: The request failed and was not or no longer retried
+        """
+        limiter = self.limiter(model)
+        attempt = 0
+        while True:
+            attempt += 1
+            waited = limiter.acquire(tokens)
+            if waited >= 1:
+                logger.log(f"Waited {waited:.1f}s for the {model} rate limit")
+            try:
+                return request()
+            except RequestCancelled:
+                raise
+            except Exception as e:
+                failure = classify_error(e, model, attempt)
+                if failure is None:
+                    raise
+                if (not failure.retryable or attempt > self.max_retries
+                        or (can_retry is not None and not can_retry())):
+                    logger.log(f"API request failed: {failure}: {failure.detail}")
+                    raise failure from e
+
+                if failure.retry_after is not None:
+                    delay = min(failure.retry_after, self.max_delay)
+                else:
+                    delay = self.backoff_delay(attempt)
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    logger.log(f"API request failed: {failure}, no time left for a retry")
+                    raise failure from e
+                if failure.kind == RequestFailure.RATE_LIMITED:
+                    # Other requests to this model would hit the same limit
+                    limiter.pause(delay)
+                logger.log(
+                    f"{RequestFailure.MESSAGES[failure.kind]} for {model}, "
+                    f"retry {attempt} of {self.max_retries} in {delay:.1f}s"
+                )
+                if failure.kind != RequestFailure.RATE_LIMITED:
+                    time.sleep(delay)
+
+
+_scheduler: Optional[RequestScheduler] = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> RequestScheduler:
+    """Get the process-wide request scheduler"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = RequestScheduler.from_env()
+    return _scheduler
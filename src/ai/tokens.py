@@ -0,0 +1,250 @@
+"""
+Token estimation, prompt budget planning and usage accounting.
+
+The default estimator is an offline heuristic that needs no model files.
+Set TOKEN_ESTIMATOR=tiktoken to count with the tiktoken tokenizer when it is
+installed. Estimates are compared against the usage the API reports, so the
+heuristic can be checked against reality.
+"""
+
+import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from src.utils.logger import logger
+from src.utils.settings import env_int
+
+# Average characters per token: ASCII code and English text vs. other scripts
+# (Cyrillic and most other non-Latin text tokenizes much denser)
+ASCII_CHARS_PER_TOKEN = 4.0
+NON_ASCII_CHARS_PER_TOKEN = 2.0
+
+# Extra tokens per chat message for role and formatting
+MESSAGE_OVERHEAD_TOKENS = 4
+
+DEFAULT_CONTEXT_WINDOW = 32000
+DEFAULT_OUTPUT_TOKENS = 4000
+
+MODEL_CONTEXT_WINDOWS = {
+    'openai/gpt-4o': 128000,
+    'openai/gpt-4o-mini': 128000,
+    'openai/gpt-4-mini': 128000,
+    'openai/gpt-4-turbo': 128000,
+    'openai/gpt-4.1': 1000000,
+    'openai/gpt-4.1-mini': 1000000,
+    'anthropic/claude-3.5-sonnet': 200000,
+    'anthropic/claude-3-haiku': 200000,
+    'google/gemini-flash-1.5': 1000000,
+    'deepseek/deepseek-chat': 64000,
+}
+
+# Share of the prompt budget that file context may use at most
+MAX_CONTEXT_SHARE = 0.4
+
+_tiktoken_encoding = None
+_tiktoken_lock = threading.Lock()
+
+
+def _get_tiktoken_encoding():
+    """Load the tiktoken encoding once; None if tiktoken is not available"""
+    global _tiktoken_encoding
+    if _tiktoken_encoding is None:
+        with _tiktoken_lock:
+            if _tiktoken_encoding is None:
+                try:
+                    import tiktoken
+                    _tiktoken_encoding = tiktoken.get_encoding(os.getenv('TIKTOKEN_ENCODING', 'o200k_base'))
+                except Exception as e:
+                    logger.log(f"tiktoken is not available, using heuristic token estimates: {e}")
+                    _tiktoken_encoding = False
+    return _tiktoken_encoding or None
+
+
+def heuristic_tokens(text: str) -> int:
+    """
+    Estimate tokens from character classes without a tokenizer
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    if not text:
+        return 0
+    non_ascii = len(text) - len(text.encode('ascii', 'ignore'))
+    ascii_chars = len(text) - non_ascii
+    return int(ascii_chars / ASCII_CHARS_PER_TOKEN + non_ascii / NON_ASCII_CHARS_PER_TOKEN) + 1
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Estimate the number of tokens in text with the configured backend (TOKEN_ESTIMATOR)
+
+    Args:
+        text: Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    if os.getenv('TOKEN_ESTIMATOR', 'heuristic').lower() == 'tiktoken':
+        encoding = _get_tiktoken_encoding()
+        if encoding is not None:
+            return len(encoding.encode(text, disallowed_special=()))
+    return heuristic_tokens(text)
+
+
+def estimate_messages_tokens(messages) -> int:
+    """Estimate prompt tokens of a list of chat messages"""
+    return sum(estimate_tokens(message['content']) + MESSAGE_OVERHEAD_TOKENS for message in messages)
+
+
+def get_context_window(model: str) -> int:
+    """
+    Get the context window of a model (MODEL_CONTEXT_TOKENS overrides the table)
+
+    Args:
+        model: Model name
+
+    Returns:
+        int: Context window in tokens
+    """
+    return env_int('MODEL_CONTEXT_TOKENS', MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW))
+
+
+def get_output_tokens() -> int:
+    """Get the tokens kept free for the model's answer (REVIEW_OUTPUT_TOKENS)"""
+    return env_int('REVIEW_OUTPUT_TOKENS', DEFAULT_OUTPUT_TOKENS, minimum=0)
+
+
+@dataclass
+class PromptBudget:
+    """How a model's context window is split between the parts of a review prompt"""
+
+    context_window: int
+    output_tokens: int
+    instructions_tokens: int
+    diff_tokens: int
+    context_tokens: int
+    diff_budget: int
+    context_budget: int
+
+    @property
+    def diff_fits(self) -> bool:
+        """Whether the whole diff fits into one request"""
+        return self.diff_tokens <= self.diff_budget
+
+    @property
+    def prompt_tokens(self) -> int:
+        """Estimated prompt size after applying the budget"""
+        return (self.instructions_tokens + min(self.diff_tokens, self.diff_budget)
+                + min(self.context_tokens, self.context_budget))
+
+
+def plan_prompt_budget(model: str, instructions: str, diff: str, context: str = '',
+                       max_diff_tokens: Optional[int] = None) -> PromptBudget:
+    """
+    Decide how much diff and file context fit into one request to a model
+
+    The diff has priority: it gets everything left after the instructions and
+    the reserved output, up to max_diff_tokens. File context gets what the diff
+    leaves, and never more than MAX_CONTEXT_SHARE of the prompt budget.
+
+    Args:
+        model: Model name
+        instructions: Prompt text without the diff
+        diff: Diff to review
+        context: File context to attach
+        max_diff_tokens: Upper bound of diff tokens per request
+
+    Returns:
+        PromptBudget: Token counts and budgets
+    """
+    context_window = get_context_window(model)
+    output_tokens = min(get_output_tokens(), context_window // 4)
+    instructions_tokens = estimate_tokens(instructions) + MESSAGE_OVERHEAD_TOKENS
+    diff_tokens = estimate_tokens(diff)
+    context_tokens = estimate_tokens(context) + MESSAGE_OVERHEAD_TOKENS if context else 0
+
+    prompt_budget = max(context_window - output_tokens - instructions_tokens, 0)
+    diff_budget = prompt_budget if max_diff_tokens is None else min(prompt_budget, max_diff_tokens)
+    context_budget = min(
+        max(prompt_budget - min(diff_tokens, diff_budget), 0),
+        int(prompt_budget * MAX_CONTEXT_SHARE)
+    )
+
+    return PromptBudget(
+        context_window=context_window,
+        output_tokens=output_tokens,
+        instructions_tokens=instructions_tokens,
+        diff_tokens=diff_tokens,
+        context_tokens=context_tokens,
+        diff_budget=diff_budget,
+        context_budget=context_budget
+    )
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """
+    Cut text to about max_tokens estimated tokens, on a line boundary
+
+    Args:
+        text: Text to cut
+        max_tokens: Token limit
+
+    Returns:
+        str: The text itself if it fits, otherwise its beginning
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    kept = []
+    used = 0
+    for line in text.splitlines(keepends=True):
+        line_tokens = estimate_tokens(line)
+        if used + line_tokens > max_tokens:
+            break
+        kept.append(line)
+        used += line_tokens
+    return ''.join(kept)
+
+
+class UsageTracker:
+    """
+    Accumulates estimated and reported token usage per model
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.totals: Dict[str, Dict[str, int]] = {}
+
+    def record(self, model: str, estimated_prompt_tokens: int, usage) -> None:
+        """
+        Record one request
+
+        Args:
+            model: Model name
+            estimated_prompt_tokens: Prompt size estimated before sending
+            usage: Usage object from the API response, or None if it was not reported
+        """
+        prompt_tokens = getattr(usage, 'prompt_tokens', None) or 0
+        completion_tokens = getattr(usage, 'completion_tokens', None) or 0
+
+        with self._lock:
+            totals = self.totals.setdefault(model, {
+                'requests': 0, 'estimated_prompt_tokens': 0, 'prompt_tokens': 0, 'completion_tokens': 0
+            })
+            totals['requests'] += 1
+            totals['estimated_prompt_tokens'] += estimated_prompt_tokens
+            totals['prompt_tokens'] += prompt_tokens
+            totals['completion_tokens'] += completion_tokens
+
+        if usage is None:
+            logger.log(f"Tokens ({model}): estimated prompt {estimated_prompt_tokens}, usage not reported")
+        else:
+            logger.log(f"Tokens ({model}): estimated prompt {estimated_prompt_tokens}, "
+                       f"actual prompt {prompt_tokens}, completion {completion_tokens}")
+
+
+usage_tracker = UsageTracker()
@@ -0,0 +1,208 @@
+"""
+Local triage of a commit before it is sent for review.
+
+Files left out by the path filter (generated, vendored, excluded or binary;
+see src.git.path_filter) keep its reason as their kind. Every other changed
+file is classified from the diff alone, plus an AST comparison of the old and
+new version for Python files:
+
+- lockfile: generated dependency lock files
+- rename: moved without content changes
+- whitespace: only indentation, trailing whitespace or blank lines changed,
+  in files where indentation has no meaning
+- format: Python file whose syntax tree is unchanged (formatting, comments)
+- meta: no text changes at all (mode changes, binary files)
+- code: everything else
+
+Only "code" files are reviewed, however large; overlong lines are shortened.
+A commit without any is skipped, a small one goes to MODEL_NAME_FAST when it
+is set, everything else to MODEL_NAME.
+"""
+
+import ast
+import os
+import re
+import warnings
+from collections import Counter
+from typing import Dict, List, Optional
+
+from src.ai.ai_chat import DEFAULT_MODEL_NAME
+from src.git.diff_model import Diff, FileDiff
+from src.git.path_filter import get_path_filter
+from src.git.repository import CommitData, Repository
+from src.utils.settings import env_int
+
+KIND_LOCKFILE = 'lockfile'
+KIND_RENAME = 'rename'
+KIND_WHITESPACE = 'whitespace'
+KIND_FORMAT = 'format'
+KIND_META = 'meta'
+KIND_CODE = 'code'
+
+DECISION_SKIP = 'skip'
+DECISION_FAST = 'fast'
+DECISION_FULL = 'full'
+
+# Start of the review text of skipped commits
+SKIPPED_REVIEW_PREFIX = "Skipped by triage:"
+
+# Changed code lines up to which a commit counts as small
+DEFAULT_SMALL_DIFF_LINES = 40
+
+# Python files larger than this are not parsed for the AST comparison
+MAX_AST_BYTES = 512 * 1024
+
+WORD_RE = re.compile(r'\w+')
+
+# Files whose indentation is syntax, so whitespace changes are not trivial there
+INDENTATION_SENSITIVE_SUFFIXES = (
+    '.py', '.pyi', '.yaml', '.yml', '.haml', '.pug', '.coffee', 'Makefile', '.mk',
+)
+
+LOCKFILE_NAMES = frozenset({
+    'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock', 'pnpm-lock.yaml', 'bun.lockb',
+    'poetry.lock', 'Pipfile.lock', 'pdm.lock', 'uv.lock', 'Cargo.lock', 'Gemfile.lock',
+    'composer.lock', 'go.sum', 'packages.lock.json', 'flake.lock', 'mix.lock', 'pubspec.lock',
+})
+
+
+class TriageResult:
+    """How a commit is reviewed and why"""
+
+    __slots__ = ('decision', 'model', 'kinds', 'code_lines', 'diff')
+
+    def __init__(self, decision: str, model: Optional[str], kinds: Dict[str, str], code_lines: int,
+                 diff: Diff):
+        self.decision = decision
+        # None when the commit is skipped
+        self.model = model
+        # Kind of every changed file by path
+        self.kinds = kinds
+        self.code_lines = code_lines
+        # Only the files that need a review
+        self.diff = diff
+
+    def describe(self) -> str:
+        """Number of files per kind and of changed code lines"""
+        counts: Dict[str, int] = {}
+        for kind in self.kinds.values():
+            counts[kind] = counts.get(kind, 0) + 1
+        files = ', '.join(f"{kind} {count}" for kind, count in sorted(counts.items()))
+        return f"files: {files}; {self.code_lines} changed code lines"
+
+
+def is_triage_enabled() -> bool:
+    """Check whether commits are triaged before review (TRIAGE_ENABLED)"""
+    return os.getenv('TRIAGE_ENABLED', '1').lower() in ('1', 'true', 'yes')
+
+
+def get_small_diff_lines() -> int:
+    """Get the size limit of commits reviewed by the fast model (TRIAGE_SMALL_DIFF_LINES)"""
+    return env_int('TRIAGE_SMALL_DIFF_LINES', DEFAULT_SMALL_DIFF_LINES, minimum=0)
+
+
+def _normalized_lines(lines) -> List[str]:
+    """
+    Non-blank lines without leading and trailing whitespace
+
+    Spacing inside a line is kept, since it can be part of a string literal.
+    """
+    return [text.strip() for _, text in lines if text.strip()]
+
+
+def _word_counts(lines) -> Counter:
+    """Words and numbers of Python lines, without what follows a #"""
+    return Counter(word for _, text in lines for word in WORD_RE.findall(text.split('#', 1)[0]))
+
+
+def _python_ast(repository: Repository, revision: str, path: str) -> Optional[str]:
+    """Dump of the syntax tree of a Python file, None if it cannot be read or parsed"""
+    blob = repository.read_file(revision, path)
+    if blob is None or len(blob[1]) > MAX_AST_BYTES:
+        return None
+    try:
+        with warnings.catch_warnings():
+            # Invalid escape sequences in old code must not end up in the log
+            warnings.simplefilter('ignore')
+            return ast.dump(ast.parse(blob[1]))
+    except (SyntaxError, ValueError):
+        return None
+
+
+def classify_file(file_diff: FileDiff, repository: Repository, commit: CommitData) -> str:
+    """
+    Classify the changes of one file
+
+    Args:
+        file_diff: Changes of the file
+        repository: Repository, to read both versions of Python files
+        commit: Commit of the changes
+
+    Returns:
+        str: One of the KIND_* constants
+    """
+    if os.path.basename(file_diff.path) in LOCKFILE_NAMES:
+        return KIND_LOCKFILE
+    if not file_diff.hunks:
+        if file_diff.is_rename:
+            return KIND_RENAME
+        if file_diff.status in ('A', 'D', 'C') and not file_diff.is_binary:
+            # Added or deleted empty files still change what the code base contains
+            return KIND_CODE
+        return KIND_META
+    if file_diff.status in ('A', 'D'):
+        return KIND_CODE
+
+    removed = [line for hunk in file_diff.hunks for line in hunk.removed_lines()]
+    added = [line for hunk in file_diff.hunks for line in hunk.added_lines()]
+    if (not file_diff.path.endswith(INDENTATION_SENSITIVE_SUFFIXES)
+            and _normalized_lines(removed) == _normalized_lines(added)):
+        return KIND_WHITESPACE
+
+    # Formatting never changes the words of the code, so most edits are told apart without parsing
+    if (file_diff.path.endswith('.py') and file_diff.old_path and file_diff.new_path
+            and commit.parents and _word_counts(removed) == _word_counts(added)):
+        old_tree = _python_ast(repository, commit.parents[0], file_diff.old_path)
+        if old_tree is not None and old_tree == _python_ast(repository, commit.sha, file_diff.new_path):
+            return KIND_FORMAT
+    return KIND_CODE
+
+
+def triage_commit(repository: Repository, commit: CommitData, diff: Diff) -> TriageResult:
+    """
+    Decide whether and with which model a commit is reviewed
+
+    Args:
+        repository: Repository of the commit
+        commit: Loaded commit
+        diff: Its parsed diff
+
+    Returns:
+        TriageResult: Decision, model and the part of the diff to review
+    """
+    model = os.getenv('MODEL_NAME', DEFAULT_MODEL_NAME)
+    enabled = is_triage_enabled()
+    # The path filter applies even when triage is off
+    kept, reasons = get_path_filter(repository, commit.sha).filter_diff(diff)
+    kinds = {}
+    for file_diff in diff:
+        # Classified before shortening, so a change past the cut still counts
+        kinds[file_diff.path] = reasons.get(file_diff.path) or (
+            classify_file(file_diff, repository, commit) if enabled else KIND_CODE
+        )
+    code_diff = Diff([file_diff for file_diff in kept if kinds[file_diff.path] == KIND_CODE])
+    code_lines = code_diff.added + code_diff.removed
+    if not len(code_diff):
+        return TriageResult(DECISION_SKIP, None, kinds, code_lines, code_diff)
+
+    fast_model = os.getenv('MODEL_NAME_FAST', '').strip()
+    if enabled and fast_model and code_lines <= get_small_diff_lines():
+        return TriageResult(DECISION_FAST, fast_model, kinds, code_lines, code_diff)
+    return TriageResult(DECISION_FULL, model, kinds, code_lines, code_diff)
+
+
+def skipped_review(commit: str, result: TriageResult) -> str:
+    """Review text for a commit that triage skipped"""
+    lines = [f"{SKIPPED_REVIEW_PREFIX} commit {commit} has no code changes that need a review."]
+    lines += [f"- {path}: {kind}" for path, kind in result.kinds.items()]
+    return '\n'.join(lines)
@@ -0,0 +1,346 @@
+"""
+Headless command line interface for CI and batch reviews.
+
+    python -m src.cli review --repo PATH [REVISION ...] [--range A..B | --new]
+        [--concurrency N] [--output-dir DIR] [--format html json] [--no-cache]
+    python -m src.cli commits --repo PATH [--author NAME] [--message TEXT] [--path PATH]
+        [--since DATE] [--until DATE] [--limit N] [--sha-only]
+    python -m src.cli serve [--host HOST] [--port PORT] [--workers N]
+
+`commits` searches the commit index, so its output can select review
+candidates: python -m src.cli review $(python -m src.cli commits --path src/ --sha-only)
+
+tkinter is never imported and the OpenAI SDK is only loaded when the first
+review request is sent, so the command starts quickly. The exit code is 0 when
+every review succeeded, 1 when at least one failed, 2 for invalid arguments or
+repositories and 130 when interrupted.
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from src.ai.client_pool import close_clients
+from src.commit_index import DEFAULT_SEARCH_LIMIT, get_commit_index
+from src.git.diff import list_commits
+from src.git.repository import get_repository, close_repositories
+from src.html_writer import combine_reviews, write_review_file
+from src.review_ledger import get_review_ledger
+from src.review_logic import (
+    find_new_commits, log_metrics_summary, record_reviewed, review_commits, review_outcome
+)
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+
+EXIT_OK = 0
+EXIT_REVIEW_FAILED = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+STATUS_OK = 'ok'
+STATUS_EMPTY = 'empty'
+STATUS_ERROR = 'error'
+# Triage found nothing worth sending to the model
+STATUS_SKIPPED = 'skipped'
+
+OUTPUT_FORMATS = ('html', 'json')
+
+RANGE_SEPARATOR_RE = re.compile(r'\.{2,3}')
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Build the argument parser of all subcommands"""
+    parser = argparse.ArgumentParser(prog='python -m src.cli', description='AI code review without the GUI')
+    parser.add_argument('--env-file', help='Load settings from this .env file before running')
+    parser.add_argument('--quiet', action='store_true', help='Do not print progress messages')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    review = subparsers.add_parser('review', help='Review commits and write the results to a directory')
+    review.add_argument('revisions', nargs='*', metavar='REVISION', help='Commits to review (default: HEAD)')
+    review.add_argument('--repo', default=None,
+                        help='Path to git repository (default: REPO_PATH or the current directory)')
+    selection = review.add_mutually_exclusive_group()
+    selection.add_argument('--range', dest='revision_range', metavar='A..B',
+                           help='Review every commit of a revision range, oldest first')
+    selection.add_argument('--new', action='store_true',
+                           help='Review the commits added since the last review of the current branch')
+    review.add_argument('--max-commits', type=int, default=None,
+                        help='Review at most this many of the newest commits of --range')
+    review.add_argument('--concurrency', type=int, default=None,
+                        help='Commits reviewed in parallel (default: REVIEW_CONCURRENCY)')
+    review.add_argument('--output-dir', default='results',
+                        help='Directory for the results (default: results)')
+    review.add_argument('--format', nargs='+', choices=OUTPUT_FORMATS, default=list(OUTPUT_FORMATS),
+                        help='Output formats (default: html json)')
+    review.add_argument('--no-cache', action='store_true', help='Do not use the review cache')
+
+    commits = subparsers.add_parser('commits', help='Search commits by author, message, path and date')
+    commits.add_argument('--repo', default=None,
+                         help='Path to git repository (default: REPO_PATH or the current directory)')
+    commits.add_argument('--revision', default='HEAD',
+                         help='History to index before searching (default: HEAD)')
+    commits.add_argument('--author', help='Author name or email contains this')
+    commits.add_argument('--message', help='Subject contains this')
+    commits.add_argument('--path', help='A touched file or directory, or a glob of touched paths')
+    commits.add_argument('--since', metavar='DATE', help='Committed on or after this date (YYYY-MM-DD)')
+    commits.add_argument('--until', metavar='DATE', help='Committed on or before this date (YYYY-MM-DD)')
+    commits.add_argument('--limit', type=int, default=DEFAULT_SEARCH_LIMIT,
+                         help=f'Maximum number of commits (default: {DEFAULT_SEARCH_LIMIT})')
+    commits.add_argument('--sha-only', action='store_true', help='Print only the commit hashes')
+
+    serve = subparsers.add_parser('serve', help='Run the local review server')
+    serve.add_argument('--host', default=None, help='Interface to listen on (default: REVIEW_SERVER_HOST)')
+    serve.add_argument('--port', type=int, default=None,
+                       help='Port to listen on (default: REVIEW_SERVER_PORT)')
+    serve.add_argument('--workers', type=int, default=None,
+                       help='Reviews run in parallel (default: REVIEW_SERVER_WORKERS)')
+    return parser
+
+
+def review_status(review: str) -> str:
+    """
+    Classify a review returned by review_commit
+
+    Args:
+        review: Review text
+
+    Returns:
+        str: STATUS_OK, STATUS_EMPTY, STATUS_SKIPPED or STATUS_ERROR
+    """
+    return review_outcome(review)
+
+
+def select_commits(args: argparse.Namespace) -> Optional[List[str]]:
+    """
+    Resolve the commits selected on the command line
+
+    Args:
+        args: Parsed arguments of the review command
+
+    Returns:
+        Optional[List[str]]: Full SHAs oldest first, or None if a revision is invalid
+    """
+    if args.new:
+        _, head, commits = find_new_commits(args.repo)
+        return commits if head is not None else None
+
+    if args.revision_range:
+        endpoints = [part for part in RANGE_SEPARATOR_RE.split(args.revision_range) if part]
+        if None in get_repository(args.repo).resolve_commits(endpoints):
+            logger.log(f"Error: {args.revision_range} is not a valid revision range")
+            return None
+        return list_commits(args.repo, [args.revision_range], args.max_commits)
+
+    revisions = args.revisions or ["HEAD"]
+    shas = get_repository(args.repo).resolve_commits(revisions)
+    for revision, sha in zip(revisions, shas):
+        if sha is None:
+            logger.log(f"Error: {revision} is not a commit")
+            return None
+    # Keep the given order, drop duplicates
+    return list(dict.fromkeys(shas))
+
+
+def write_results(
+    repo_path: str,
+    reviews: List[Tuple[str, str]],
+    output_dir: str,
+    formats: List[str],
+    models: Dict[str, str]
+) -> str:
+    """
+    Write one file per commit and format, a combined report and summary.json
+
+    Args:
+        repo_path: Path to git repository
+        reviews: (commit SHA, review) pairs
+        output_dir: Directory for the results; created if missing
+        formats: Output formats from OUTPUT_FORMATS
+        models: Model that answered, by commit
+
+    Returns:
+        str: Path of summary.json
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    commits = get_repository(repo_path).load_commits([commit for commit, _ in reviews])
+    entries = []
+    for commit, review in reviews:
+        commit_data = commits.get(commit)
+        entry = {
+            'commit': commit,
+            'status': review_status(review),
+            'subject': commit_data.subject if commit_data else None,
+            'author': commit_data.author if commit_data else None,
+            'date': commit_data.date if commit_data else None,
+            'model': models.get(commit),
+            'files': {},
+        }
+        name = commit[:12]
+        if 'html' in formats:
+            entry['files']['html'] = write_review_file(combine_reviews([(commit, review)]),
+                                                       os.path.join(output_dir, f"{name}.html"))
+        if 'json' in formats:
+            json_path = os.path.join(output_dir, f"{name}.json")
+            with open(json_path, 'w', encoding='utf-8') as f:
+                json.dump(dict(entry, review=review), f, ensure_ascii=False, indent=2)
+            entry['files']['json'] = json_path
+        entries.append(entry)
+
+    if 'html' in formats and len(reviews) > 1:
+        write_review_file(combine_reviews(reviews), os.path.join(output_dir, 'report.html'))
+
+    summary_path = os.path.join(output_dir, 'summary.json')
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump({
+            'repository': os.path.abspath(repo_path),
+            'reviewed': sum(1 for entry in entries if entry['status'] not in (STATUS_ERROR, STATUS_SKIPPED)),
+            'skipped': sum(1 for entry in entries if entry['status'] == STATUS_SKIPPED),
+            'failed': sum(1 for entry in entries if entry['status'] == STATUS_ERROR),
+            'commits': entries,
+        }, f, ensure_ascii=False, indent=2)
+    return summary_path
+
+
+def run_review(args: argparse.Namespace) -> int:
+    """
+    Run the review command
+
+    Args:
+        args: Parsed arguments
+
+    Returns:
+        int: Exit code
+    """
+    if not os.path.isdir(args.repo) or not get_repository(args.repo).is_valid():
+        logger.log(f"Error: {args.repo} is not a git repository")
+        return EXIT_USAGE
+
+    commits = select_commits(args)
+    if commits is None:
+        logger.log("Error: Could not resolve the commits to review")
+        return EXIT_USAGE
+    if not commits:
+        logger.log("Nothing to review")
+        return EXIT_OK
+
+    logger.log(f"Reviewing {len(commits)} commits of {args.repo}...")
+    cancel_event = threading.Event()
+    result: List[List[Tuple[str, str]]] = []
+    models: Dict[str, str] = {}
+    worker = threading.Thread(
+        target=lambda: result.append(review_commits(
+            args.repo, commits, max_workers=args.concurrency,
+            use_cache=not args.no_cache, cancel_event=cancel_event, on_model=models.__setitem__
+        )),
+        name="cli-review",
+        daemon=True
+    )
+    with metrics.collect() as run_metrics:
+        worker.start()
+        try:
+            # Joining in steps keeps the main thread responsive to Ctrl+C
+            while worker.is_alive():
+                worker.join(0.2)
+        except KeyboardInterrupt:
+            logger.log("Interrupted, waiting for running reviews to stop...")
+            cancel_event.set()
+            worker.join()
+            return EXIT_INTERRUPTED
+    log_metrics_summary(run_metrics)
+    if not result:
+        logger.log("Error: Review failed")
+        return EXIT_REVIEW_FAILED
+    reviews = result[0]
+
+    summary_path = write_results(args.repo, reviews, args.output_dir, args.format, models)
+    succeeded = [commit for commit, review in reviews if review_status(review) != STATUS_ERROR]
+    record_reviewed(args.repo, succeeded)
+    if args.new and len(succeeded) == len(reviews):
+        branch, head, _ = find_new_commits(args.repo)
+        if head is not None:
+            get_review_ledger(args.repo).record(branch, [], head=head)
+
+    # Skipped commits count as done: there is nothing in them to review again
+    skipped = sum(1 for _, review in reviews if review_status(review) == STATUS_SKIPPED)
+    logger.log(f"Reviewed {len(succeeded) - skipped} of {len(reviews)} commits, skipped {skipped}")
+    print(summary_path)
+    return EXIT_OK if len(succeeded) == len(reviews) else EXIT_REVIEW_FAILED
+
+
+def run_commits(args: argparse.Namespace) -> int:
+    """
+    Run the commits command: update the commit index and print the matching commits, newest first
+
+    Args:
+        args: Parsed arguments
+
+    Returns:
+        int: Exit code
+    """
+    if not os.path.isdir(args.repo) or not get_repository(args.repo).is_valid():
+        logger.log(f"Error: {args.repo} is not a git repository")
+        return EXIT_USAGE
+
+    index = get_commit_index(args.repo)
+    index.update(args.revision)
+    found = index.search(author=args.author, message=args.message, path=args.path,
+                         since=args.since, until=args.until, limit=args.limit)
+    for commit in found:
+        print(commit.sha if args.sha_only else
+              '\t'.join((commit.sha, commit.date, commit.author, commit.subject)))
+    logger.log(f"{len(found)} commits found")
+    return EXIT_OK
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """
+    Command line entry point
+
+    Args:
+        argv: Arguments without the program name (default: sys.argv[1:])
+
+    Returns:
+        int: Exit code
+    """
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if args.env_file:
+        from dotenv import load_dotenv
+        load_dotenv(args.env_file, override=True)
+        logger.configure()
+    if hasattr(args, 'repo') and args.repo is None:
+        # Resolved after --env-file, which may set REPO_PATH
+        args.repo = os.getenv('REPO_PATH', '.')
+    if getattr(args, 'max_commits', None) is not None and not args.revision_range:
+        parser.error("--max-commits applies to --range only")
+    # Progress goes to stderr, so stdout stays free for the summary path
+    logger.set_gui_callback((lambda message: None) if args.quiet else
+                            (lambda message: print(message, file=sys.stderr, flush=True)))
+
+    try:
+        if args.command == 'review':
+            exit_code = run_review(args)
+        elif args.command == 'commits':
+            exit_code = run_commits(args)
+        elif args.command == 'serve':
+            # Imported here so review runs do not load the HTTP server
+            from src.server import serve
+            serve(args.host, args.port, args.workers)
+            exit_code = EXIT_OK
+        else:
+            parser.error(f"Unknown command {args.command}")
+            exit_code = EXIT_USAGE
+    finally:
+        close_repositories()
+        close_clients()
+        logger.flush()
+    return exit_code
+
+
+if __name__ == "__main__":
+    sys.exit(main())
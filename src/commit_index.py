@@ -0,0 +1,275 @@
+"""
+Persistent index of commit metadata and changed paths.
+
+There is one SQLite database per repository. It holds author, date, subject
+and parents of every indexed commit and the paths it touched, keyed by SHA.
+update() only walks the commits that are not reachable from a head indexed
+before, so keeping the index current costs one short `git log` per refresh
+and commits can be searched by author, message, path and date without
+reading the history again.
+"""
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.git.git_subprocess import iter_git_lines
+from src.git.repository import COMMIT_FORMAT, CommitData, get_repository, iter_log_commits
+from src.utils.logger import logger
+
+DEFAULT_INDEX_DIR = '.commit_index'
+
+DEFAULT_SEARCH_LIMIT = 500
+
+# Commits parsed before they are written in one transaction
+INSERT_BATCH_SIZE = 1000
+
+# Indexed heads kept as walk boundaries; older ones are only needed after long branch switches
+MAX_INDEXED_HEADS = 100
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS commits (
+    sha TEXT PRIMARY KEY,
+    parents TEXT NOT NULL,
+    author TEXT NOT NULL,
+    email TEXT NOT NULL,
+    date TEXT NOT NULL,
+    subject TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS commit_paths (
+    sha TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (sha, path)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS indexed_heads (
+    sha TEXT PRIMARY KEY,
+    updated REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS commits_date ON commits(date);
+CREATE INDEX IF NOT EXISTS commit_paths_path ON commit_paths(path);
+"""
+
+
+class IndexedCommit:
+    """Metadata of one indexed commit"""
+
+    __slots__ = ('sha', 'parents', 'author', 'email', 'date', 'subject')
+
+    def __init__(self, sha: str, parents: List[str], author: str, email: str, date: str, subject: str):
+        self.sha = sha
+        self.parents = parents
+        self.author = author
+        self.email = email
+        self.date = date
+        self.subject = subject
+
+    def as_tuple(self) -> Tuple[str, str, str, str]:
+        """(time, author, message, hash) as listed by get_last_commits"""
+        return self.date, self.author, self.subject, self.sha
+
+
+class CommitIndex:
+    """
+    Commit metadata and changed paths of one repository
+    """
+
+    def __init__(self, repo_path: str, index_dir: str = DEFAULT_INDEX_DIR):
+        self.repo_path = os.path.abspath(repo_path)
+        repo_key = hashlib.sha256(os.path.normcase(self.repo_path).encode('utf-8')).hexdigest()[:16]
+        self.index_dir = index_dir
+        self.path = os.path.join(index_dir, f"{repo_key}.sqlite3")
+        self._lock = threading.Lock()
+        # Held for a whole update, so two updates never walk the same commits
+        self._update_lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use; called with the lock held"""
+        if self._connection is None:
+            os.makedirs(self.index_dir, exist_ok=True)
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.executescript(SCHEMA)
+            self._connection = connection
+        return self._connection
+
+    def update(self, revision: str = "HEAD") -> int:
+        """
+        Index the commits of a revision that are not indexed yet
+
+        Args:
+            revision: Branch, tag or commit whose history is indexed
+
+        Returns:
+            int: Number of newly indexed commits
+        """
+        repository = get_repository(self.repo_path)
+        with self._update_lock:
+            with self._lock:
+                known = [sha for (sha,) in self._connect().execute(
+                    "SELECT sha FROM indexed_heads ORDER BY updated DESC"
+                )]
+            resolved = repository.resolve_commits([revision] + known)
+            head = resolved[0]
+            if head is None:
+                logger.log(f"Error: {revision} is not a commit")
+                return 0
+            if head in known:
+                return 0
+
+            started = time.perf_counter()
+            # Heads that no longer exist (rewritten and collected) cannot bound the walk
+            boundaries = [sha for sha in resolved[1:] if sha]
+            command = [
+                "git", "-c", "core.quotePath=false", "log", "--stdin", "--raw", "--no-abbrev",
+                "--diff-merges=first-parent", f"--format={COMMIT_FORMAT}", "--date=iso-local"
+            ]
+            lines = iter_git_lines(command, self.repo_path,
+                                   input=''.join([f"{head}\n"] + [f"^{sha}\n" for sha in boundaries]))
+            added = 0
+            batch: List[CommitData] = []
+            for commit in iter_log_commits(lines):
+                batch.append(commit)
+                if len(batch) >= INSERT_BATCH_SIZE:
+                    added += self._insert(batch)
+                    batch = []
+            added += self._insert(batch)
+
+            # Recorded last, so an interrupted update walks the same commits again
+            with self._lock:
+                connection = self._connect()
+                with connection:
+                    connection.execute("INSERT OR REPLACE INTO indexed_heads (sha, updated) VALUES (?, ?)",
+                                       (head, time.time()))
+                    connection.execute(
+                        "DELETE FROM indexed_heads WHERE sha NOT IN "
+                        "(SELECT sha FROM indexed_heads ORDER BY updated DESC LIMIT ?)", (MAX_INDEXED_HEADS,)
+                    )
+            if added:
+                seconds = time.perf_counter() - started
+                logger.log(f"Indexed {added} commits of {self.repo_path} in {seconds:.2f}s")
+            return added
+
+    def _insert(self, commits: List[CommitData]) -> int:
+        """Write parsed commits in one transaction; returns how many were new"""
+        if not commits:
+            return 0
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                before = connection.total_changes
+                connection.executemany(
+                    "INSERT OR IGNORE INTO commits (sha, parents, author, email, date, subject) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(commit.sha, ' '.join(commit.parents), commit.author, commit.email, commit.date,
+                      commit.subject) for commit in commits]
+                )
+                added = connection.total_changes - before
+                connection.executemany(
+                    "INSERT OR IGNORE INTO commit_paths (sha, path) VALUES (?, ?)",
+                    [(commit.sha, path) for commit in commits for path in commit.file_paths]
+                )
+        return added
+
+    def search(
+        self,
+        author: Optional[str] = None,
+        message: Optional[str] = None,
+        path: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = DEFAULT_SEARCH_LIMIT
+    ) -> List[IndexedCommit]:
+        """
+        Find indexed commits, newest first
+
+        Args:
+            author: Author name or email contains this (case-insensitive)
+            message: Subject contains this (case-insensitive)
+            path: Touched path is this or lies in this directory, or matches it if it has * or ?
+                wildcards
+            since: Dated on or after this day or time (YYYY-MM-DD[ HH:MM:SS])
+            until: Dated before the end of this day or time
+            limit: Maximum number of commits
+
+        Returns:
+            List[IndexedCommit]: Matching commits
+        """
+        conditions = []
+        parameters: List[object] = []
+        if author:
+            conditions.append("(author LIKE ? OR email LIKE ?)")
+            parameters += [f"%{author.strip()}%"] * 2
+        if message:
+            conditions.append("subject LIKE ?")
+            parameters.append(f"%{message.strip()}%")
+        if path:
+            path = path.strip().replace('\\', '/')
+            if any(char in path for char in '*?['):
+                conditions.append("sha IN (SELECT sha FROM commit_paths WHERE path GLOB ?)")
+                parameters.append(path)
+            else:
+                # The path itself or anything below it, but not src/app.py.orig for src/app.py
+                path = path.rstrip('/')
+                conditions.append("sha IN (SELECT sha FROM commit_paths WHERE path = ? OR path GLOB ?)")
+                parameters += [path, path + '/*']
+        if since:
+            conditions.append("date >= ?")
+            parameters.append(since.strip())
+        if until:
+            # A date without time covers the whole day
+            conditions.append("date <= ?")
+            parameters.append(until.strip() + '\uffff')
+
+        where = "WHERE " + " AND ".join(conditions) if conditions else ""
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT sha, parents, author, email, date, subject FROM commits {where} "
+                "ORDER BY date DESC LIMIT ?", parameters + [limit]
+            ).fetchall()
+        return [IndexedCommit(sha, parents.split(), author, email, date, subject)
+                for sha, parents, author, email, date, subject in rows]
+
+    def paths(self, sha: str) -> List[str]:
+        """Get the paths a commit touched, empty if it is not indexed"""
+        with self._lock:
+            return [path for (path,) in self._connect().execute(
+                "SELECT path FROM commit_paths WHERE sha = ? ORDER BY path", (sha,)
+            )]
+
+    def count(self) -> int:
+        """Get the number of indexed commits"""
+        with self._lock:
+            return self._connect().execute("SELECT COUNT(*) FROM commits").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_indexes: Dict[Tuple[str, str], CommitIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_commit_index(repo_path: str) -> CommitIndex:
+    """
+    Get the shared commit index of a repository (directory: COMMIT_INDEX_DIR)
+
+    Args:
+        repo_path: Path to git repository
+
+    Returns:
+        CommitIndex: One instance per repository
+    """
+    index_dir = os.getenv('COMMIT_INDEX_DIR', DEFAULT_INDEX_DIR)
+    key = (index_dir, os.path.normcase(os.path.abspath(repo_path)))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = CommitIndex(repo_path, index_dir)
+        return index
@@ -0,0 +1,168 @@
+"""
+Asyncio runner for git commands.
+
+Coroutines await git while LLM requests are in flight on the same event loop.
+Every command has a deadline, at most GIT_MAX_CONCURRENCY commands run at
+once per event loop, and stderr is captured with the result. A command that
+times out or whose task is cancelled is killed.
+
+Git is waited for on a worker thread through run_git_process rather than as
+an asyncio subprocess: on Python 3.11 a task cancelled while its subprocess
+is being started waits forever, which would hang asyncio.run() on shutdown.
+"""
+
+import asyncio
+import subprocess
+import threading
+import time
+import weakref
+from typing import List, Optional
+
+from src.git.git_subprocess import GitCancelled, get_command_timeout, git_subcommand, run_git_process
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.utils.settings import env_int
+
+DEFAULT_MAX_CONCURRENCY = 4
+
+
+class GitResult:
+    """Outcome of one git command"""
+
+    __slots__ = ('command', 'returncode', 'stdout', 'stderr', 'seconds', 'timed_out')
+
+    def __init__(self, command: List[str], returncode: Optional[int], stdout: str, stderr: str,
+                 seconds: float, timed_out: bool = False):
+        self.command = command
+        # None when git could not be started or was killed
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.seconds = seconds
+        self.timed_out = timed_out
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+    def describe_failure(self) -> str:
+        """One log line on why the command failed"""
+        command = ' '.join(self.command)
+        if self.timed_out:
+            return f"Error: Git command timed out after {self.seconds:.0f}s: {command}"
+        return f"Git command failed: {command}\n{self.stderr.strip()}"
+
+
+class AsyncGitRunner:
+    """
+    Runs git commands on the event loop with deadlines and bounded concurrency
+    """
+
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, timeout: Optional[float] = None):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        # A semaphore belongs to one event loop, and callers may run several one after another
+        self._semaphores: 'weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]' = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            semaphore = self._semaphores.get(loop)
+            if semaphore is None:
+                semaphore = self._semaphores[loop] = asyncio.Semaphore(self.max_concurrency)
+            return semaphore
+
+    async def run(
+        self,
+        command: List[str],
+        repo_path: str,
+        input: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> GitResult:
+        """
+        Run a git command to completion
+
+        Args:
+            command: Command and arguments, starting with "git"
+            repo_path: Path to git repository
+            input: Text passed to the command's stdin
+            timeout: Deadline in seconds, waiting for a free slot included
+                (default: the runner's, else GIT_COMMAND_TIMEOUT_SECONDS)
+
+        Returns:
+            GitResult: Exit code, output and duration; timed_out is set if git was killed at the deadline
+
+        Raises:
+            asyncio.CancelledError: The calling task was cancelled; git was killed
+        """
+        timeout = timeout or self.timeout or get_command_timeout()
+        started = time.perf_counter()
+        deadline = time.monotonic() + timeout
+        try:
+            async with self._semaphore():
+                return await self._run(command, repo_path, input, deadline, started)
+        finally:
+            metrics.observe('git_command_seconds', time.perf_counter() - started,
+                            command=git_subcommand(command))
+
+    async def _run(self, command: List[str], repo_path: str, input: Optional[str], deadline: float,
+                   started: float) -> GitResult:
+        cancel_event = threading.Event()
+        try:
+            completed = await asyncio.to_thread(
+                run_git_process, command, repo_path, input, max(deadline - time.monotonic(), 0), cancel_event
+            )
+        except asyncio.CancelledError:
+            # The worker thread kills git on its next check
+            cancel_event.set()
+            raise
+        except subprocess.TimeoutExpired:
+            return GitResult(command, None, '', '', time.perf_counter() - started, timed_out=True)
+        except (GitCancelled, OSError) as e:
+            return GitResult(command, None, '', str(e), time.perf_counter() - started)
+
+        return GitResult(command, completed.returncode, completed.stdout, completed.stderr,
+                         time.perf_counter() - started)
+
+    async def output(
+        self,
+        command: List[str],
+        repo_path: str,
+        input: Optional[str] = None,
+        timeout: Optional[float] = None
+    ) -> str:
+        """
+        Run a git command and return its output, like run_git_command
+
+        Args:
+            command: Command and arguments, starting with "git"
+            repo_path: Path to git repository
+            input: Text passed to the command's stdin
+            timeout: Deadline in seconds
+
+        Returns:
+            str: Command stdout, or an empty string if the command failed or timed out
+        """
+        result = await self.run(command, repo_path, input, timeout)
+        if result.returncode is None and not result.timed_out:
+            logger.log(f"Could not run git: {result.stderr}")
+            return ""
+        if not result.ok:
+            logger.log(result.describe_failure())
+            return ""
+        return result.stdout
+
+
+_runner: Optional[AsyncGitRunner] = None
+_runner_lock = threading.Lock()
+
+
+def get_git_runner() -> AsyncGitRunner:
+    """Get the shared runner (concurrency: GIT_MAX_CONCURRENCY)"""
+    global _runner
+    with _runner_lock:
+        if _runner is None:
+            _runner = AsyncGitRunner(env_int('GIT_MAX_CONCURRENCY', DEFAULT_MAX_CONCURRENCY, minimum=1))
+        return _runner
@@ -0,0 +1,123 @@
+"""
+Split large diffs into chunks that fit a model's token budget.
+
+Chunks follow file boundaries where possible, then hunk boundaries, and only
+split inside a hunk when a single hunk is larger than the budget. Every chunk
+that holds part of a file starts with that file's diff header, so each chunk
+can be reviewed on its own.
+"""
+
+import re
+from typing import Iterable, Iterator, List, Union
+
+from src.ai.tokens import estimate_tokens
+from src.git.diff_model import Diff, FileDiff, Hunk, parse_diff
+
+ANSI_ESCAPE_RE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+
+
+def strip_colors(text: str) -> str:
+    """Remove ANSI color codes from git output"""
+    return ANSI_ESCAPE_RE.sub('', text)
+
+
+def _split_hunk(header: str, hunk: Hunk, max_tokens: int) -> List[str]:
+    """Split an oversized hunk by lines, repeating the file and hunk headers"""
+    prefix = header + hunk.header + '\n'
+    budget = max(max_tokens - estimate_tokens(prefix), 1)
+
+    pieces = []
+    current: List[str] = []
+    current_tokens = 0
+    for line in hunk.lines:
+        line_tokens = estimate_tokens(line) + 1
+        if current and current_tokens + line_tokens > budget:
+            pieces.append(prefix + ''.join(line + '\n' for line in current))
+            current = []
+            current_tokens = 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current or not pieces:
+        pieces.append(prefix + ''.join(line + '\n' for line in current))
+    return pieces
+
+
+def _split_file(file_diff: FileDiff, max_tokens: int) -> List[str]:
+    """Split a file diff that does not fit the budget into hunk-aligned parts"""
+    header = file_diff.render_header()
+    if not file_diff.hunks:
+        # Binary or mode-only change without hunks
+        return [header]
+
+    header_tokens = estimate_tokens(header)
+    parts = []
+    current = header
+    current_tokens = header_tokens
+    for hunk in file_diff.hunks:
+        hunk_text = hunk.render()
+        hunk_tokens = estimate_tokens(hunk_text)
+        if header_tokens + hunk_tokens > max_tokens:
+            if current != header:
+                parts.append(current)
+            parts.extend(_split_hunk(header, hunk, max_tokens))
+            current, current_tokens = header, header_tokens
+        elif current_tokens + hunk_tokens > max_tokens:
+            parts.append(current)
+            current, current_tokens = header + hunk_text, header_tokens + hunk_tokens
+        else:
+            current += hunk_text
+            current_tokens += hunk_tokens
+    if current != header:
+        parts.append(current)
+    return parts
+
+
+def iter_chunks(file_diffs: Iterable[FileDiff], max_tokens: int) -> Iterator[str]:
+    """
+    Pack file diffs into rendered chunks as the files arrive
+
+    Args:
+        file_diffs: Parsed files, e.g. from iter_file_diffs over streamed git output
+        max_tokens: Token budget per chunk
+
+    Yields:
+        str: Diff chunks in original order
+    """
+    current: List[str] = []
+    current_tokens = 0
+    for file_diff in file_diffs:
+        text = file_diff.render()
+        text_tokens = estimate_tokens(text)
+        if text_tokens <= max_tokens:
+            parts = [(text, text_tokens)]
+        else:
+            parts = [(part, estimate_tokens(part)) for part in _split_file(file_diff, max_tokens)]
+        for part, part_tokens in parts:
+            if current and current_tokens + part_tokens > max_tokens:
+                yield ''.join(current)
+                current = []
+                current_tokens = 0
+            current.append(part)
+            current_tokens += part_tokens
+    if current:
+        yield ''.join(current)
+
+
+def chunk_diff(diff: Union[Diff, str], max_tokens: int) -> List[str]:
+    """
+    Pack a diff into chunks of at most max_tokens estimated tokens
+
+    Args:
+        diff: Structured diff, or git diff text (color codes are removed)
+        max_tokens: Token budget per chunk
+
+    Returns:
+        List[str]: Rendered diff chunks in original order; a single chunk if the diff fits
+    """
+    if isinstance(diff, str):
+        diff = parse_diff(strip_colors(diff))
+
+    rendered = diff.render()
+    if estimate_tokens(rendered) <= max_tokens:
+        return [rendered]
+    return list(iter_chunks(diff, max_tokens))
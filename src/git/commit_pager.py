@@ -0,0 +1,79 @@
+"""
+Page-wise reading of a long commit history.
+
+One `git log` process streams the whole history, and pages are taken from
+its output only when they are asked for. While nobody reads, git blocks on
+the full pipe, so a repository with hundreds of thousands of commits costs no
+more than the pages actually shown, and page N does not re-walk the N-1 pages
+before it the way `git log --skip` would.
+"""
+
+import itertools
+import threading
+from typing import List, Optional, Tuple
+
+from src.git.git_subprocess import iter_git_lines
+from src.git.repository import get_repository
+from src.git.stream_parser import COMMIT_TUPLE_FORMAT, iter_commit_tuples
+
+DEFAULT_PAGE_SIZE = 200
+
+
+class CommitPager:
+    """
+    Commits of a revision, newest first, read page by page from one git process
+
+    Pages may be read from any thread, one at a time.
+    """
+
+    def __init__(self, repo_path: str, revision: str = "HEAD", page_size: int = DEFAULT_PAGE_SIZE):
+        if not get_repository(repo_path).is_valid():
+            raise ValueError(f"{repo_path} is not a git repository")
+        self.repo_path = repo_path
+        self.revision = revision
+        self.page_size = page_size
+        self.loaded = 0
+        self.exhausted = False
+        self._lock = threading.Lock()
+        self._lines = None
+        self._commits = None
+
+    def next_page(self, count: Optional[int] = None) -> List[Tuple[str, str, str, str]]:
+        """
+        Read the next commits
+
+        Args:
+            count: Number of commits (default: page_size)
+
+        Returns:
+            List[Tuple[str, str, str, str]]: (time, author, message, hash) per commit; fewer than
+                count at the end of the history, empty once it is exhausted
+        """
+        count = count or self.page_size
+        with self._lock:
+            if self.exhausted:
+                return []
+            if self._commits is None:
+                # Started on the first page, so git runs on the thread that reads it
+                command = ["git", "log", f"--format={COMMIT_TUPLE_FORMAT}", "--date=iso-local",
+                           self.revision, "--"]
+                self._lines = iter_git_lines(command, self.repo_path)
+                self._commits = iter_commit_tuples(self._lines)
+            page = list(itertools.islice(self._commits, count))
+            self.loaded += len(page)
+            if len(page) < count:
+                self._close()
+            return page
+
+    def close(self) -> None:
+        """Stop git; later pages are empty"""
+        with self._lock:
+            self._close()
+
+    def _close(self) -> None:
+        self.exhausted = True
+        if self._lines is not None:
+            # Closing the line generator kills git if it is still running
+            self._lines.close()
+            self._lines = None
+            self._commits = None
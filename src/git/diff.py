@@ -2,54 +2,100 @@
 Pavlov Dima
 """
 
+import asyncio
 import sys
-from typing import List, Tuple
-from git_subprocess import run_git_command, is_git_repo, is_merge_commit
-from logger import logger
-
-def get_changed_files_output(repo_path: str) -> str:
+from typing import Iterable, Iterator, List, Optional, Tuple, Union
+from src.git.async_git import get_git_runner
+from src.git.git_subprocess import iter_git_lines, run_git_command
+from src.git.stream_parser import COMMIT_TUPLE_FORMAT, iter_commit_tuples, iter_name_status
+from src.git.repository import COMMIT_LOG_COMMAND, FULL_SHA_RE, get_repository, parse_log_output, CommitData
+from src.utils.logger import logger
+
+def load_commit(repo_path: str, commit: str = "HEAD") -> CommitData:
     """
-    Get the git diff output for the last commit
+    Load a commit through the shared repository access layer
 
     Args:
         repo_path: Path to git repository
+        commit: Commit to load (default: HEAD)
 
     Returns:
-        str: Git diff output
+        CommitData: Metadata, changed files and patch of the commit
     """
-    if not is_git_repo(repo_path):
+    repository = get_repository(repo_path)
+    if not repository.is_valid():
         logger.log(f"Error: {repo_path} is not a git repository")
         sys.exit(1)
 
-    if is_merge_commit(repo_path):
-        # Get files changed in the merge
-        files_command = ["git", "diff-tree", "--name-status", "-r", "--no-commit-id", "HEAD^1..HEAD"]
-    else:
-        # For regular commits
-        files_command = ["git", "show", "--name-status", "--oneline", "HEAD"]
+    commit_data = repository.get_commit(commit)
+    if commit_data is None:
+        raise ValueError(f"Could not read commit {commit} in {repo_path}")
+    return commit_data
+
+async def _check_repository_async(repo_path: str) -> None:
+    """Raise ValueError if the path is not a git repository; an event loop must not exit the process"""
+    # The answer is remembered, so only the first call per repository starts git
+    if not await asyncio.to_thread(get_repository(repo_path).is_valid):
+        raise ValueError(f"{repo_path} is not a git repository")
+
+async def load_commit_async(repo_path: str, commit: str = "HEAD") -> CommitData:
+    """
+    Load a commit through the async git runner, sharing the repository's commit cache
+
+    Args:
+        repo_path: Path to git repository
+        commit: Commit to load (default: HEAD)
 
-    return run_git_command(files_command, repo_path)
+    Returns:
+        CommitData: Metadata, changed files and patch of the commit
 
-def get_changed_files_list(repo_path: str) -> List[str]:
+    Raises:
+        ValueError: The path is not a git repository or the commit could not be read
     """
-    Returns a list of changed file names from the last commit.
+    await _check_repository_async(repo_path)
+    repository = get_repository(repo_path)
+    if FULL_SHA_RE.match(commit):
+        commit_data = repository.cached_commit(commit)
+        if commit_data is not None:
+            return commit_data
+
+    output = await get_git_runner().output(COMMIT_LOG_COMMAND, repo_path, input=f"{commit}\n")
+    commits = parse_log_output(output)
+    if not commits:
+        raise ValueError(f"Could not read commit {commit} in {repo_path}")
+    repository.remember(commits[0])
+    return commits[0]
+
+def get_changed_files_output(repo_path: str, commit: str = "HEAD") -> str:
+    """
+    Get the git diff output for a commit
 
     Args:
         repo_path: Path to git repository
+        commit: Commit to inspect (default: HEAD)
 
     Returns:
-        List[str]: List of file paths that were changed in the last commit
+        str: Name-status lines ("<status>\t<path>"); merges are compared with their first parent
+    """
+    commit_data = load_commit(repo_path, commit)
+    return '\n'.join(f"{status}\t{path}" for status, path in commit_data.files)
+
+def get_changed_files_list(repo_path: str, commit: str = "HEAD") -> List[str]:
     """
-    output = get_changed_files_output(repo_path)
-    files = []
+    Returns a list of changed file names from a commit.
 
-    for line in output.split('\n'):
-        if line.strip():
-            parts = line.split('\t')
-            if len(parts) >= 2:
-                files.append(parts[-1])
+    Args:
+        repo_path: Path to git repository
+        commit: Commit to inspect (default: HEAD)
+
+    Returns:
+        List[str]: List of file paths that were changed in the commit
+    """
+    return load_commit(repo_path, commit).file_paths
 
-    return files
+async def get_changed_files_list_async(repo_path: str, commit: str = "HEAD") -> List[str]:
+    """Async form of get_changed_files_list"""
+    return (await load_commit_async(repo_path, commit)).file_paths
 
 def get_last_commit_info(repo_path: str) -> str:
     """
@@ -61,7 +107,7 @@ def get_last_commit_info(repo_path: str) -> str:
     Returns:
         str: Formatted commit information
     """
-    if not is_git_repo(repo_path):
+    if not get_repository(repo_path).is_valid():
         logger.log(f"Error: {repo_path} is not a git repository")
         sys.exit(1)
 
@@ -69,75 +115,79 @@ def get_last_commit_info(repo_path: str) -> str:
                      "--format=%C(yellow)commit %H%n%C(auto)%d%nAuthor: %an <%ae>%nDate: %ad%n%n    %s%n"]
     return run_git_command(commit_command, repo_path)
 
-def format_file_status(output: str) -> str:
+def format_file_status(output: Union[str, Iterable[str]]) -> str:
     """
     Format the git status output
 
     Args:
-        output: Git status output to format
+        output: Git name-status output to format, as text or as an iterable of lines
 
     Returns:
         str: Formatted status message
     """
-    # Split output into lines and remove empty lines
-    lines = [line for line in output.split('\n') if line.strip()]
+    lines = output.split('\n') if isinstance(output, str) else output
 
     # Format the output
     result = []
     result.append("\nИзмененные файлы:")
     result.append("-" * 40)
 
-    if not lines:
+    for status, file_path in iter_name_status(lines):
+        status_text = {
+            'M': 'Изменен',
+            'A': 'Добавлен',
+            'D': 'Удален',
+            'R': 'Переименован',
+            'C': 'Скопирован'
+        }.get(status[0], status)
+
+        result.append(f"{status_text}: {file_path}")
+
+    if len(result) == 2:
         result.append("Нет измененных файлов")
-        return '\n'.join(result)
-
-    for line in lines:
-        parts = line.split('\t')
-        if len(parts) >= 2:
-            status, file_path = parts[0], parts[-1]
-            status_text = {
-                'M': 'Изменен',
-                'A': 'Добавлен',
-                'D': 'Удален',
-                'R': 'Переименован',
-                'C': 'Скопирован'
-            }.get(status[0], status)
-
-            result.append(f"{status_text}: {file_path}")
 
     return '\n'.join(result)
 
-def get_commit_changes(repo_path: str) -> str:
+def get_commit_changes(repo_path: str, commit: str = "HEAD") -> str:
     """
-    Get detailed changes (diff) from the last commit showing actual code changes
+    Get detailed changes (diff) from a commit showing actual code changes
 
     Args:
         repo_path: Path to git repository
+        commit: Commit to inspect (default: HEAD)
 
     Returns:
-        str: Formatted diff output showing the actual changed code
+        str: Minimal plain diff with 3 lines of context and no a/ b/ prefixes; merges are
+            compared with their first parent
     """
-    if not is_git_repo(repo_path):
+    return load_commit(repo_path, commit).diff.render()
+
+async def get_commit_changes_async(repo_path: str, commit: str = "HEAD") -> str:
+    """Async form of get_commit_changes"""
+    return (await load_commit_async(repo_path, commit)).diff.render()
+
+def iter_last_commits(repo_path: str, count: int = 10) -> Iterator[Tuple[str, str, str, str]]:
+    """
+    Stream information about the last N commits while git log is running
+
+    Args:
+        repo_path: Path to git repository
+        count: Number of commits to get (default: 10)
+
+    Yields:
+        Tuple[str, str, str, str]: (time, author, message, hash) for each commit
+    """
+    if not get_repository(repo_path).is_valid():
         logger.log(f"Error: {repo_path} is not a git repository")
         sys.exit(1)
 
-    # Base command to get changes
-    if is_merge_commit(repo_path):
-        base_command = ["git", "diff", "HEAD^1..HEAD"]
-    else:
-        base_command = ["git", "diff", "HEAD^..HEAD"]
-
-    # Add options for better diff readability
-    base_command.extend([
-        "--patch",  # Show the actual patch/changes
-        "--unified=3",  # Show 3 lines of context
-        "--color=always",  # Add colors
-        "--no-prefix"  # Remove a/ and b/ prefixes
-    ])
+    yield from iter_commit_tuples(iter_git_lines(_last_commits_command(count), repo_path))
 
-    return run_git_command(base_command, repo_path)
+def _last_commits_command(count: int) -> List[str]:
+    # Format: %ad - author date, %an - author name, %H - commit hash, %s - commit message
+    return ["git", "log", f"-{count}", f"--format={COMMIT_TUPLE_FORMAT}", "--date=iso-local"]
 
-def get_last_commits(repo_path: str, count: int = 10) -> List[Tuple[str, str, str]]:
+def get_last_commits(repo_path: str, count: int = 10) -> List[Tuple[str, str, str, str]]:
     """
     Get information about the last N commits
 
@@ -146,20 +196,48 @@ def get_last_commits(repo_path: str, count: int = 10) -> List[Tuple[str, str, st
         count: Number of commits to get (default: 10)
 
     Returns:
-        List[Tuple[str, str, str]]: List of tuples containing (time, author, message) for each commit
+        List[Tuple[str, str, str, str]]: List of tuples containing (time, author, message, hash)
+            for each commit
     """
-    if not is_git_repo(repo_path):
-        logger.log(f"Error: {repo_path} is not a git repository")
-        sys.exit(1)
+    return list(iter_last_commits(repo_path, count))
 
-    # Format: %ad - author date, %an - author name, %s - commit message
-    commit_command = ["git", "log", f"-{count}", "--format=%ad|%an|%s", "--date=iso-local"]
-    output = run_git_command(commit_command, repo_path)
+async def get_last_commits_async(repo_path: str, count: int = 10) -> List[Tuple[str, str, str, str]]:
+    """
+    Async form of get_last_commits
 
-    commits = []
-    for line in output.split('\n'):
-        if line.strip():
-            time, author, message = line.split('|', 2)
-            commits.append((time, author, message))
+    Raises:
+        ValueError: The path is not a git repository
+    """
+    await _check_repository_async(repo_path)
+    output = await get_git_runner().output(_last_commits_command(count), repo_path)
+    return list(iter_commit_tuples(output.split('\n')))
 
-    return commits
+def list_commits(repo_path: str, revisions: List[str], max_count: Optional[int] = None) -> List[str]:
+    """
+    List commits selected by rev-list arguments
+
+    Args:
+        repo_path: Path to git repository
+        revisions: rev-list arguments, e.g. ["main..feature"] or [head, "--not", base]
+        max_count: Keep only this many of the newest commits
+
+    Returns:
+        List[str]: Full commit SHAs, oldest first; empty if a revision is invalid
+    """
+    lines = iter_git_lines(_rev_list_command(revisions, max_count), repo_path)
+    shas = [line.strip() for line in lines if line.strip()]
+    return shas[::-1]
+
+def _rev_list_command(revisions: List[str], max_count: Optional[int]) -> List[str]:
+    command = ["git", "rev-list"]
+    if max_count is not None:
+        command.append(f"--max-count={max_count}")
+    # "--" keeps revisions from being read as paths
+    return command + revisions + ["--"]
+
+async def list_commits_async(
+    repo_path: str, revisions: List[str], max_count: Optional[int] = None
+) -> List[str]:
+    """Async form of list_commits"""
+    output = await get_git_runner().output(_rev_list_command(revisions, max_count), repo_path)
+    return [line.strip() for line in output.splitlines() if line.strip()][::-1]
@@ -0,0 +1,300 @@
+"""
+Compact structured representation of a git diff.
+
+A patch is parsed once into files and hunks; every later stage (prompt
+building, filtering and chunking) works on these objects and renders only the
+text it needs. Prompts get a minimal plain rendering without color codes.
+"""
+
+import re
+from typing import Callable, Iterable, Iterator, List, Optional, Tuple
+
+HUNK_HEADER_RE = re.compile(r'^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@ ?(.*)$')
+
+
+class Hunk:
+    """One hunk: its position in the old and new file and its body lines"""
+
+    __slots__ = ('old_start', 'old_count', 'new_start', 'new_count', 'section', 'lines')
+
+    def __init__(self, old_start: int, old_count: int, new_start: int, new_count: int, section: str = ''):
+        self.old_start = old_start
+        self.old_count = old_count
+        self.new_start = new_start
+        self.new_count = new_count
+        self.section = section
+        # Body lines without newline, each starting with ' ', '+', '-' or '\\'
+        self.lines: List[str] = []
+
+    @property
+    def header(self) -> str:
+        header = f"@@ -{self.old_start},{self.old_count} +{self.new_start},{self.new_count} @@"
+        return f"{header} {self.section}" if self.section else header
+
+    @property
+    def added(self) -> int:
+        return sum(1 for line in self.lines if line.startswith('+'))
+
+    @property
+    def removed(self) -> int:
+        return sum(1 for line in self.lines if line.startswith('-'))
+
+    def added_lines(self) -> Iterator[Tuple[int, str]]:
+        """(line number in the new file, text) of added lines"""
+        number = self.new_start
+        for line in self.lines:
+            if line.startswith('+'):
+                yield number, line[1:]
+                number += 1
+            elif line.startswith(' '):
+                number += 1
+
+    def removed_lines(self) -> Iterator[Tuple[int, str]]:
+        """(line number in the old file, text) of removed lines"""
+        number = self.old_start
+        for line in self.lines:
+            if line.startswith('-'):
+                yield number, line[1:]
+                number += 1
+            elif line.startswith(' '):
+                number += 1
+
+    def added_ranges(self) -> List[Tuple[int, int]]:
+        """Inclusive line ranges of the new file that were added"""
+        return _ranges(number for number, _ in self.added_lines())
+
+    def removed_ranges(self) -> List[Tuple[int, int]]:
+        """Inclusive line ranges of the old file that were removed"""
+        return _ranges(number for number, _ in self.removed_lines())
+
+    def render(self) -> str:
+        return '\n'.join([self.header] + self.lines) + '\n'
+
+
+class FileDiff:
+    """Changes of one file"""
+
+    __slots__ = ('old_path', 'new_path', 'status', 'is_binary', 'similarity', 'old_mode', 'new_mode', 'hunks')
+
+    def __init__(self, old_path: Optional[str], new_path: Optional[str]):
+        # None for the missing side of added and deleted files
+        self.old_path = old_path
+        self.new_path = new_path
+        self.status = 'M'
+        self.is_binary = False
+        self.similarity: Optional[int] = None
+        self.old_mode: Optional[str] = None
+        self.new_mode: Optional[str] = None
+        self.hunks: List[Hunk] = []
+
+    @property
+    def path(self) -> str:
+        """Current path of the file, or its old path if it was deleted"""
+        return self.new_path or self.old_path or ''
+
+    @property
+    def is_rename(self) -> bool:
+        return self.status == 'R'
+
+    @property
+    def added(self) -> int:
+        return sum(hunk.added for hunk in self.hunks)
+
+    @property
+    def removed(self) -> int:
+        return sum(hunk.removed for hunk in self.hunks)
+
+    def render_header(self, minimal: bool = True) -> str:
+        """
+        Render the file header
+
+        Args:
+            minimal: Only what a reviewer needs: paths and the kind of change
+        """
+        old_path = self.old_path or self.new_path
+        new_path = self.new_path or self.old_path
+        lines = [f"diff --git {old_path} {new_path}"]
+        if self.status == 'A':
+            lines.append("new file" if minimal else f"new file mode {self.new_mode or '100644'}")
+        elif self.status == 'D':
+            lines.append("deleted file" if minimal else f"deleted file mode {self.old_mode or '100644'}")
+        elif self.old_mode and self.new_mode and self.old_mode != self.new_mode:
+            lines.append(f"old mode {self.old_mode}")
+            lines.append(f"new mode {self.new_mode}")
+        if self.status in ('R', 'C'):
+            verb = 'rename' if self.status == 'R' else 'copy'
+            if self.similarity is not None and not minimal:
+                lines.append(f"similarity index {self.similarity}%")
+            lines.append(f"{verb} from {self.old_path}")
+            lines.append(f"{verb} to {self.new_path}")
+        if self.is_binary:
+            lines.append("Binary file changed")
+        elif self.hunks:
+            lines.append(f"--- {self.old_path or '/dev/null'}")
+            lines.append(f"+++ {self.new_path or '/dev/null'}")
+        return '\n'.join(lines) + '\n'
+
+    def render(self, minimal: bool = True) -> str:
+        return self.render_header(minimal) + ''.join(hunk.render() for hunk in self.hunks)
+
+
+class Diff:
+    """All file changes of a commit"""
+
+    __slots__ = ('files',)
+
+    def __init__(self, files: Optional[List[FileDiff]] = None):
+        self.files: List[FileDiff] = files or []
+
+    def __iter__(self) -> Iterator[FileDiff]:
+        return iter(self.files)
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    @property
+    def paths(self) -> List[str]:
+        return [file_diff.path for file_diff in self.files]
+
+    @property
+    def added(self) -> int:
+        return sum(file_diff.added for file_diff in self.files)
+
+    @property
+    def removed(self) -> int:
+        return sum(file_diff.removed for file_diff in self.files)
+
+    def filter(self, predicate: Callable[[FileDiff], bool]) -> 'Diff':
+        """New Diff with the files for which predicate is true"""
+        return Diff([file_diff for file_diff in self.files if predicate(file_diff)])
+
+    def render(self, minimal: bool = True) -> str:
+        """
+        Render the diff as text
+
+        Args:
+            minimal: Drop index, mode and similarity lines that only matter to git
+
+        Returns:
+            str: Diff text
+        """
+        return ''.join(file_diff.render(minimal) for file_diff in self.files)
+
+
+def _ranges(numbers: Iterable[int]) -> List[Tuple[int, int]]:
+    ranges: List[Tuple[int, int]] = []
+    for number in numbers:
+        if ranges and ranges[-1][1] == number - 1:
+            ranges[-1] = (ranges[-1][0], number)
+        else:
+            ranges.append((number, number))
+    return ranges
+
+
+def _strip_prefix(path: str, prefix: str) -> str:
+    return path[len(prefix):] if path.startswith(prefix) else path
+
+
+def _paths_from_git_line(line: str) -> Tuple[str, str]:
+    """Best-effort paths from "diff --git <old> <new>" when ---/+++ lines are absent"""
+    rest = line[len('diff --git '):].rstrip('\n')
+    if rest.startswith('a/') and ' b/' in rest:
+        old_path, new_path = rest.split(' b/', 1)
+        return old_path[2:], new_path
+    # Without prefixes the two paths are equal unless the file was renamed,
+    # in which case "rename from/to" lines follow and override them
+    half = len(rest) // 2
+    if rest[:half] == rest[half + 1:]:
+        return rest[:half], rest[half + 1:]
+    old_path, _, new_path = rest.partition(' ')
+    return old_path, new_path
+
+
+def _parse_file(lines: List[str]) -> FileDiff:
+    old_path, new_path = _paths_from_git_line(lines[0])
+    file_diff = FileDiff(old_path, new_path)
+    hunk: Optional[Hunk] = None
+
+    for line in lines[1:]:
+        line = line.rstrip('\n')
+        if hunk is not None and line[:1] in (' ', '+', '-', '\\'):
+            hunk.lines.append(line)
+            continue
+        match = HUNK_HEADER_RE.match(line)
+        if match:
+            old_start, old_count, new_start, new_count, section = match.groups()
+            hunk = Hunk(
+                int(old_start), int(old_count) if old_count is not None else 1,
+                int(new_start), int(new_count) if new_count is not None else 1,
+                section
+            )
+            file_diff.hunks.append(hunk)
+        elif line.startswith('--- '):
+            path = line[4:]
+            file_diff.old_path = None if path == '/dev/null' else _strip_prefix(path, 'a/')
+        elif line.startswith('+++ '):
+            path = line[4:]
+            file_diff.new_path = None if path == '/dev/null' else _strip_prefix(path, 'b/')
+        elif line.startswith('new file mode '):
+            file_diff.status = 'A'
+            file_diff.new_mode = line[len('new file mode '):]
+            file_diff.old_path = None
+        elif line.startswith('deleted file mode '):
+            file_diff.status = 'D'
+            file_diff.old_mode = line[len('deleted file mode '):]
+            file_diff.new_path = None
+        elif line.startswith('old mode '):
+            file_diff.old_mode = line[len('old mode '):]
+        elif line.startswith('new mode '):
+            file_diff.new_mode = line[len('new mode '):]
+        elif line.startswith('rename from '):
+            file_diff.status = 'R'
+            file_diff.old_path = line[len('rename from '):]
+        elif line.startswith('rename to '):
+            file_diff.new_path = line[len('rename to '):]
+        elif line.startswith('copy from '):
+            file_diff.status = 'C'
+            file_diff.old_path = line[len('copy from '):]
+        elif line.startswith('copy to '):
+            file_diff.new_path = line[len('copy to '):]
+        elif line.startswith('similarity index '):
+            file_diff.similarity = int(line[len('similarity index '):].rstrip('%'))
+        elif line.startswith('Binary files ') or line == 'GIT binary patch':
+            file_diff.is_binary = True
+
+    return file_diff
+
+
+def iter_file_diffs(lines: Iterable[str]) -> Iterator[FileDiff]:
+    """
+    Parse a patch into FileDiff objects as its lines arrive
+
+    Args:
+        lines: Patch lines, e.g. from iter_git_lines
+
+    Yields:
+        FileDiff: Each file once all its lines have been read
+    """
+    current: List[str] = []
+    for line in lines:
+        if line.startswith('diff --git '):
+            if current:
+                yield _parse_file(current)
+            current = [line]
+        elif current:
+            current.append(line)
+    if current:
+        yield _parse_file(current)
+
+
+def parse_diff(patch: str) -> Diff:
+    """
+    Parse a complete patch
+
+    Args:
+        patch: Output of git diff / git show without color codes
+
+    Returns:
+        Diff: Structured diff
+    """
+    return Diff(list(iter_file_diffs(patch.splitlines(keepends=True))))
@@ -0,0 +1,408 @@
+"""
+Thin wrappers around the git command line
+
+Every command has a deadline: GIT_COMMAND_TIMEOUT_SECONDS for local commands
+and GIT_NETWORK_TIMEOUT_SECONDS for pull. Streamed commands may run as long as
+their reader keeps taking output, so they are killed instead when the reader
+has waited GIT_COMMAND_TIMEOUT_SECONDS for the next line. git never asks for
+credentials on the terminal, so a remote that needs them fails instead of
+hanging. Checkout and pull also stop when their cancel event is set.
+
+git runs in its own process group, so stopping it also stops the processes it
+started (hooks, credential helpers, ssh), which would otherwise keep its
+output pipes open.
+"""
+
+import os
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+from typing import IO, Dict, Iterator, List, Optional
+
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.utils.settings import env_float
+
+DEFAULT_COMMAND_TIMEOUT_SECONDS = 120.0
+DEFAULT_NETWORK_TIMEOUT_SECONDS = 300.0
+
+# How often a running command checks its cancel event
+CANCEL_POLL_SECONDS = 0.2
+
+# Longest time a stall watchdog sleeps between checks
+WATCHDOG_POLL_SECONDS = 1.0
+
+
+class GitCancelled(Exception):
+    """Raised when a git command was stopped through its cancel event"""
+
+
+def get_command_timeout() -> float:
+    """Deadline of local git commands in seconds (GIT_COMMAND_TIMEOUT_SECONDS)"""
+    return env_float('GIT_COMMAND_TIMEOUT_SECONDS', DEFAULT_COMMAND_TIMEOUT_SECONDS, minimum=1.0)
+
+
+def get_network_timeout() -> float:
+    """Deadline of git commands that talk to a remote in seconds (GIT_NETWORK_TIMEOUT_SECONDS)"""
+    return env_float('GIT_NETWORK_TIMEOUT_SECONDS', DEFAULT_NETWORK_TIMEOUT_SECONDS, minimum=1.0)
+
+
+def git_environment() -> Dict[str, str]:
+    """Environment of git processes: no credential or editor prompts that would wait for input"""
+    return dict(os.environ, GIT_TERMINAL_PROMPT='0', GIT_EDITOR='true')
+
+
+def process_group_options() -> Dict[str, object]:
+    """Popen arguments that start a process in a new process group, for kill_process_tree"""
+    if os.name == 'nt':
+        return {'creationflags': subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {'start_new_session': True}
+
+
+def kill_process_tree(process: subprocess.Popen) -> None:
+    """
+    Kill a process started with process_group_options and everything it started
+
+    Args:
+        process: Process to kill; nothing happens if it and its children have exited
+    """
+    if os.name == 'nt':
+        try:
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, timeout=10)
+        except (OSError, subprocess.TimeoutExpired):
+            pass
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except OSError:
+            # The whole group has exited already
+            pass
+    if process.poll() is None:
+        process.kill()
+
+
+def run_git_process(
+    command: List[str],
+    repo_path: str,
+    input: Optional[str] = None,
+    timeout: Optional[float] = None,
+    cancel_event: Optional[threading.Event] = None
+) -> subprocess.CompletedProcess:
+    """
+    Run a git command to completion with a deadline
+
+    Args:
+        command: Command and arguments, starting with "git"
+        repo_path: Path to git repository
+        input: Text passed to the command's stdin
+        timeout: Deadline in seconds (default: GIT_COMMAND_TIMEOUT_SECONDS)
+        cancel_event: Stops the command when set
+
+    Returns:
+        subprocess.CompletedProcess: Exit code, stdout and stderr as text
+
+    Raises:
+        subprocess.TimeoutExpired: The deadline passed; git was killed
+        GitCancelled: cancel_event was set; git was killed
+        OSError: git could not be started
+    """
+    if timeout is None:
+        timeout = get_command_timeout()
+    deadline = time.monotonic() + timeout
+    process = subprocess.Popen(
+        command,
+        cwd=repo_path,
+        stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        encoding='utf-8',
+        errors='replace',
+        env=git_environment(),
+        **process_group_options()
+    )
+    with process:
+        try:
+            while True:
+                # Without a cancel event there is nothing to check between waits
+                wait = deadline - time.monotonic()
+                if cancel_event is not None:
+                    wait = min(wait, CANCEL_POLL_SECONDS)
+                try:
+                    stdout, stderr = process.communicate(input, timeout=max(wait, 0))
+                    break
+                except subprocess.TimeoutExpired:
+                    # The input has been written by the first call
+                    input = None
+                    if cancel_event is not None and cancel_event.is_set():
+                        raise GitCancelled(' '.join(command))
+                    if time.monotonic() >= deadline:
+                        raise subprocess.TimeoutExpired(command, timeout)
+        except BaseException:
+            # Not communicate(): a process that left the group could still hold the pipes open.
+            # Leaving the with block closes them and only waits for git itself.
+            kill_process_tree(process)
+            raise
+    return subprocess.CompletedProcess(command, process.returncode, stdout, stderr)
+
+
+class StallWatchdog:
+    """
+    Kills a git process that keeps its reader waiting too long
+
+    The reader sets waiting_since to time.monotonic() before it blocks on the
+    process and back to None once output arrived, so time spent between reads
+    (a consumer working on a line, a pager nobody scrolls) never counts.
+    """
+
+    def __init__(self, process: subprocess.Popen, timeout: float):
+        self.process = process
+        self.timeout = timeout
+        self.waiting_since: Optional[float] = None
+        self.expired = False
+        self._stopped = threading.Event()
+        threading.Thread(target=self._watch, name="git-watchdog", daemon=True).start()
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(min(self.timeout, WATCHDOG_POLL_SECONDS)):
+            since = self.waiting_since
+            if since is not None and time.monotonic() - since > self.timeout:
+                self.expired = True
+                kill_process_tree(self.process)
+                return
+
+    def stop(self) -> None:
+        """End the watch; the process is left alone"""
+        self._stopped.set()
+
+
+def git_subcommand(command: List[str]) -> str:
+    """Name of the git subcommand, used as the command label of git metrics"""
+    for argument in command[1:]:
+        if not argument.startswith('-'):
+            return argument
+    return 'git'
+
+
+def run_git_command(
+    command: List[str],
+    repo_path: str,
+    input: Optional[str] = None,
+    timeout: Optional[float] = None
+) -> str:
+    """
+    Run a git command in the repository and return its output
+
+    Args:
+        command: Command and arguments, starting with "git"
+        repo_path: Path to git repository
+        input: Text passed to the command's stdin
+        timeout: Deadline in seconds (default: GIT_COMMAND_TIMEOUT_SECONDS)
+
+    Returns:
+        str: Command stdout, or an empty string if the command failed or timed out
+    """
+    try:
+        with metrics.span('git_command_seconds', command=git_subcommand(command)):
+            result = run_git_process(command, repo_path, input, timeout)
+    except subprocess.TimeoutExpired as e:
+        logger.log(f"Error: Git command timed out after {e.timeout:.0f}s: {' '.join(command)}")
+        return ""
+    except OSError as e:
+        logger.log(f"Could not run git: {e}")
+        return ""
+
+    if result.returncode != 0:
+        logger.log(f"Git command failed: {' '.join(command)}\n{result.stderr.strip()}")
+        return ""
+    return result.stdout
+
+
+def _close_quietly(pipe: IO[bytes]) -> None:
+    try:
+        pipe.close()
+    except OSError:
+        pass
+
+
+def iter_git_lines(
+    command: List[str],
+    repo_path: str,
+    input: Optional[str] = None,
+    timeout: Optional[float] = None
+) -> Iterator[str]:
+    """
+    Run a git command and yield its stdout line by line while it is still running
+
+    Lines keep their trailing newline. Stopping the iteration early terminates
+    git. A failure is logged after the output has been consumed. The measured
+    git_command_seconds include the time the caller spends per line.
+
+    Args:
+        command: Command and arguments, starting with "git"
+        repo_path: Path to git repository
+        input: Text passed to the command's stdin
+        timeout: Longest wait for the next line before git is killed; time between reads does not
+            count (default: GIT_COMMAND_TIMEOUT_SECONDS)
+
+    Yields:
+        str: Output lines; the output ends early if git was killed
+    """
+    if timeout is None:
+        timeout = get_command_timeout()
+    started = time.perf_counter()
+    # A file instead of a pipe: warnings git writes while stdout is being read must never block it
+    stderr_file = tempfile.TemporaryFile()
+    try:
+        process = subprocess.Popen(
+            command,
+            cwd=repo_path,
+            stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=stderr_file,
+            env=git_environment(),
+            **process_group_options()
+        )
+    except OSError as e:
+        stderr_file.close()
+        logger.log(f"Could not run git: {e}")
+        return
+
+    watchdog = StallWatchdog(process, timeout)
+    try:
+        watchdog.waiting_since = time.monotonic()
+        if input is not None:
+            # git reads all of stdin before it starts writing output
+            try:
+                process.stdin.write(input.encode('utf-8'))
+                process.stdin.close()
+            except BrokenPipeError:
+                # git exited or was killed before reading all of it; wait() tells which
+                _close_quietly(process.stdin)
+        # Binary mode splits on "\n" only, so "\r" inside diffs is preserved
+        for line in process.stdout:
+            watchdog.waiting_since = None
+            yield line.decode('utf-8', 'replace')
+            watchdog.waiting_since = time.monotonic()
+        returncode = process.wait()
+        watchdog.waiting_since = None
+        if watchdog.expired:
+            logger.log(f"Error: Git command sent no output for {timeout:.0f}s and was stopped: "
+                       f"{' '.join(command)}")
+        elif returncode != 0:
+            stderr_file.seek(0)
+            stderr = stderr_file.read().decode('utf-8', 'replace')
+            logger.log(f"Git command failed: {' '.join(command)}\n{stderr.strip()}")
+    finally:
+        watchdog.stop()
+        if process.poll() is None:
+            kill_process_tree(process)
+            process.wait()
+        process.stdout.close()
+        stderr_file.close()
+        metrics.observe('git_command_seconds', time.perf_counter() - started, command=git_subcommand(command))
+
+
+def is_git_repo(repo_path: str) -> bool:
+    """
+    Check if the path is inside a git work tree
+
+    Args:
+        repo_path: Path to check
+
+    Returns:
+        bool: True if the path is a git repository
+    """
+    try:
+        result = run_git_process(["git", "rev-parse", "--is-inside-work-tree"], repo_path)
+    except (subprocess.TimeoutExpired, OSError):
+        return False
+
+    return result.returncode == 0 and result.stdout.strip() == "true"
+
+
+def is_merge_commit(repo_path: str, commit: str = "HEAD") -> bool:
+    """
+    Check if the commit has more than one parent
+
+    Args:
+        repo_path: Path to git repository
+        commit: Commit to check (default: HEAD)
+
+    Returns:
+        bool: True if the commit is a merge commit
+    """
+    output = run_git_command(["git", "rev-list", "--parents", "-n", "1", commit], repo_path)
+    # Output is the commit hash followed by its parents
+    return len(output.split()) > 2
+
+
+def get_current_branch(repo_path: str) -> Optional[str]:
+    """
+    Get the name of the checked out branch
+
+    Args:
+        repo_path: Path to git repository
+
+    Returns:
+        Optional[str]: Branch name, or None for a detached HEAD or if git failed
+    """
+    branch = run_git_command(["git", "rev-parse", "--abbrev-ref", "HEAD"], repo_path).strip()
+    return branch if branch and branch != "HEAD" else None
+
+
+def _run_step(command: List[str], repo_path: str, action: str, timeout: float,
+              cancel_event: Optional[threading.Event]) -> bool:
+    """Run a command that changes the work tree; failures, timeouts and cancellation are logged"""
+    try:
+        with metrics.span('git_command_seconds', command=git_subcommand(command)):
+            result = run_git_process(command, repo_path, timeout=timeout, cancel_event=cancel_event)
+    except GitCancelled:
+        logger.log(f"{action} cancelled")
+        return False
+    except subprocess.TimeoutExpired:
+        logger.log(f"Error: {action} did not finish within {timeout:.0f}s")
+        return False
+    except OSError as e:
+        logger.log(f"Error: {action} failed: {e}")
+        return False
+
+    if result.returncode != 0:
+        logger.log(f"Error: {action} failed: {result.stderr.strip()}")
+        return False
+    return True
+
+
+def checkout_branch(repo_path: str, branch_name: str, cancel_event: Optional[threading.Event] = None) -> bool:
+    """
+    Checkout the given branch
+
+    Args:
+        repo_path: Path to git repository
+        branch_name: Branch to checkout
+        cancel_event: Stops the checkout when set
+
+    Returns:
+        bool: True if checkout succeeded
+    """
+    logger.log(f"Checking out branch {branch_name}...")
+    return _run_step(["git", "checkout", branch_name], repo_path, f"Checkout of branch {branch_name}",
+                     get_command_timeout(), cancel_event)
+
+
+def pull_branch(repo_path: str, cancel_event: Optional[threading.Event] = None) -> bool:
+    """
+    Pull the latest changes for the current branch
+
+    Args:
+        repo_path: Path to git repository
+        cancel_event: Stops the pull when set
+
+    Returns:
+        bool: True if pull succeeded
+    """
+    logger.log("Pulling latest changes...")
+    return _run_step(["git", "pull"], repo_path, "Pull", get_network_timeout(), cancel_event)
@@ -0,0 +1,317 @@
+"""
+Which changed files are worth a place in the prompt.
+
+Files are left out of the diff and the review context when they are
+
+- generated or vendored: marked linguist-generated or linguist-vendored by
+  the built-in rules, the repository's root .gitattributes or the
+  REVIEW_ATTRIBUTES_FILE, in that order, later lines winning as in git
+- excluded: matched by a glob of REVIEW_EXCLUDE_PATHS
+- binary
+
+Size never leaves a file out: large diffs are split into chunks by the
+reviewer, and changed lines longer than REVIEW_MAX_LINE_LENGTH (minified
+code) are cut to that length by shorten_lines.
+
+A glob of REVIEW_INCLUDE_PATHS keeps a file regardless of the path rules.
+Globs follow .gitattributes: without a slash a pattern matches the file name
+at any depth, with one it is relative to the repository root, and a pattern
+that matches a directory covers everything below it.
+"""
+
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Pattern, Tuple
+
+from src.git.diff_model import Diff, FileDiff, Hunk
+from src.git.repository import Repository
+from src.utils.logger import logger
+from src.utils.settings import env_int
+
+REASON_EXCLUDED = 'excluded'
+REASON_GENERATED = 'generated'
+REASON_VENDORED = 'vendored'
+REASON_BINARY = 'binary'
+
+GENERATED_ATTRIBUTE = 'linguist-generated'
+VENDORED_ATTRIBUTE = 'linguist-vendored'
+
+DEFAULT_MAX_LINE_LENGTH = 1000
+DEFAULT_MAX_CONTEXT_FILE_BYTES = 256 * 1024
+
+# Bytes looked at to tell binary from text, as git does
+BINARY_SNIFF_BYTES = 8000
+
+FILTER_CACHE_SIZE = 64
+
+DEFAULT_ATTRIBUTES = """
+*.min.js linguist-generated
+*.min.css linguist-generated
+*.js.map linguist-generated
+*.css.map linguist-generated
+*_pb2.py linguist-generated
+*_pb2_grpc.py linguist-generated
+*.pb.go linguist-generated
+*.pb.cc linguist-generated
+*.pb.h linguist-generated
+*.designer.cs linguist-generated
+*.g.dart linguist-generated
+*.freezed.dart linguist-generated
+__generated__/ linguist-generated
+vendor/ linguist-vendored
+node_modules/ linguist-vendored
+bower_components/ linguist-vendored
+third_party/ linguist-vendored
+third-party/ linguist-vendored
+"""
+
+AttributeRule = Tuple[Pattern, Dict[str, Optional[bool]]]
+
+
+def get_max_context_file_bytes() -> int:
+    """Get the size limit of files read as review context (REVIEW_MAX_CONTEXT_FILE_BYTES)"""
+    return env_int('REVIEW_MAX_CONTEXT_FILE_BYTES', DEFAULT_MAX_CONTEXT_FILE_BYTES, minimum=1)
+
+
+def is_binary(content: bytes) -> bool:
+    """Check the head of a file for a NUL byte"""
+    return b'\0' in content[:BINARY_SNIFF_BYTES]
+
+
+def compile_glob(pattern: str) -> Pattern:
+    """
+    Translate a .gitattributes-style glob to a regular expression for repository-relative paths
+
+    Args:
+        pattern: Glob with *, ?, [...] and ** path wildcards; a trailing slash matches directories only
+
+    Returns:
+        Pattern: Expression to use with match()
+    """
+    directory_only = pattern.endswith('/')
+    pattern = pattern.rstrip('/')
+    anchored = '/' in pattern
+    pattern = pattern.lstrip('/')
+
+    regex = ''
+    index = 0
+    while index < len(pattern):
+        if pattern.startswith('**/', index):
+            regex += '(?:.*/)?'
+            index += 3
+        elif pattern.startswith('**', index):
+            regex += '.*'
+            index += 2
+        elif pattern[index] == '*':
+            regex += '[^/]*'
+            index += 1
+        elif pattern[index] == '?':
+            regex += '[^/]'
+            index += 1
+        elif pattern[index] == '[' and ']' in pattern[index + 2:]:
+            end = pattern.index(']', index + 2)
+            characters = pattern[index + 1:end]
+            if characters.startswith('!'):
+                characters = '^' + characters[1:]
+            regex += '[' + characters.replace('\\', '\\\\') + ']'
+            index = end + 1
+        else:
+            regex += re.escape(pattern[index])
+            index += 1
+
+    prefix = '' if anchored else '(?:.*/)?'
+    suffix = '/.*' if directory_only else '(?:/.*)?'
+    return re.compile(f"{prefix}{regex}{suffix}$")
+
+
+def parse_globs(value: str) -> List[Pattern]:
+    """Compile a comma separated list of globs"""
+    return [compile_glob(glob.strip()) for glob in value.split(',') if glob.strip()]
+
+
+def parse_attributes(text: str) -> List[AttributeRule]:
+    """
+    Parse the linguist-generated and linguist-vendored settings of .gitattributes lines
+
+    Args:
+        text: File content
+
+    Returns:
+        List[AttributeRule]: Pattern and attributes set (True), unset (False) or reset (None) per line
+    """
+    rules = []
+    for line in text.splitlines():
+        parts = line.split()
+        if len(parts) < 2 or parts[0].startswith('#'):
+            continue
+        attributes: Dict[str, Optional[bool]] = {}
+        for entry in parts[1:]:
+            name, _, value = entry.partition('=')
+            state: Optional[bool] = value.lower() not in ('false', '0') if value else True
+            if name[:1] in '-!':
+                state = False if name[0] == '-' else None
+                name = name[1:]
+            if name in (GENERATED_ATTRIBUTE, VENDORED_ATTRIBUTE):
+                attributes[name] = state
+        if attributes:
+            rules.append((compile_glob(parts[0]), attributes))
+    return rules
+
+
+class PathFilter:
+    """
+    Decides per changed file whether it goes into the prompt
+    """
+
+    def __init__(
+        self,
+        rules: List[AttributeRule],
+        include: Optional[List[Pattern]] = None,
+        exclude: Optional[List[Pattern]] = None,
+        max_line_length: int = DEFAULT_MAX_LINE_LENGTH
+    ):
+        self.rules = rules
+        self.include = include or []
+        self.exclude = exclude or []
+        self.max_line_length = max_line_length
+
+    def path_reason(self, path: str) -> Optional[str]:
+        """
+        Check the path rules
+
+        Args:
+            path: Repository-relative path
+
+        Returns:
+            Optional[str]: REASON_EXCLUDED, REASON_GENERATED or REASON_VENDORED, None if the path is kept
+        """
+        if any(pattern.match(path) for pattern in self.include):
+            return None
+        if any(pattern.match(path) for pattern in self.exclude):
+            return REASON_EXCLUDED
+        state: Dict[str, Optional[bool]] = {}
+        for pattern, attributes in self.rules:
+            if pattern.match(path):
+                state.update(attributes)
+        if state.get(GENERATED_ATTRIBUTE):
+            return REASON_GENERATED
+        if state.get(VENDORED_ATTRIBUTE):
+            return REASON_VENDORED
+        return None
+
+    def file_reason(self, file_diff: FileDiff) -> Optional[str]:
+        """
+        Check the path rules and whether the file is binary
+
+        Args:
+            file_diff: Changes of the file
+
+        Returns:
+            Optional[str]: One of the REASON_* constants, None if the file is kept
+        """
+        reason = self.path_reason(file_diff.path)
+        if reason is not None:
+            return reason
+        if file_diff.is_binary:
+            return REASON_BINARY
+        return None
+
+    def shorten_lines(self, file_diff: FileDiff) -> FileDiff:
+        """
+        Cut diff lines longer than max_line_length, so minified code cannot fill the prompt
+
+        Args:
+            file_diff: Changes of a kept file
+
+        Returns:
+            FileDiff: The same object if no line is too long, else a copy with shortened lines
+        """
+        limit = self.max_line_length
+        if not any(len(line) > limit for hunk in file_diff.hunks for line in hunk.lines):
+            return file_diff
+
+        shortened = FileDiff(file_diff.old_path, file_diff.new_path)
+        for name in ('status', 'is_binary', 'similarity', 'old_mode', 'new_mode'):
+            setattr(shortened, name, getattr(file_diff, name))
+        for hunk in file_diff.hunks:
+            copy = Hunk(hunk.old_start, hunk.old_count, hunk.new_start, hunk.new_count, hunk.section)
+            copy.lines = [
+                line if len(line) <= limit else f"{line[:limit]} [{len(line) - limit} characters cut]"
+                for line in hunk.lines
+            ]
+            shortened.hunks.append(copy)
+        return shortened
+
+    def filter_diff(self, diff: Diff) -> Tuple[Diff, Dict[str, str]]:
+        """
+        Split a diff into the files that are kept, with long lines shortened, and the reasons of the others
+
+        Args:
+            diff: Structured diff
+
+        Returns:
+            Tuple[Diff, Dict[str, str]]: Kept files, and a reason per left out path
+        """
+        reasons = {}
+        kept = []
+        for file_diff in diff:
+            reason = self.file_reason(file_diff)
+            if reason is None:
+                kept.append(self.shorten_lines(file_diff))
+            else:
+                reasons[file_diff.path] = reason
+        return Diff(kept), reasons
+
+
+_filters: 'OrderedDict[tuple, PathFilter]' = OrderedDict()
+_filters_lock = threading.Lock()
+
+
+def _read_attributes_file(path: str) -> str:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError as e:
+        logger.log(f"Could not read REVIEW_ATTRIBUTES_FILE {path}: {e}")
+        return ''
+
+
+def get_path_filter(repository: Repository, commit: str) -> PathFilter:
+    """
+    Get the filter for a commit, with the .gitattributes of that commit and the current settings
+
+    Args:
+        repository: Repository of the commit
+        commit: Commit SHA
+
+    Returns:
+        PathFilter: Shared among commits with the same .gitattributes and settings
+    """
+    blob = repository.read_file(commit, '.gitattributes', max_bytes=get_max_context_file_bytes())
+    attributes_file = os.getenv('REVIEW_ATTRIBUTES_FILE', '')
+    key = (
+        blob[0] if blob else None,
+        attributes_file,
+        os.getenv('REVIEW_INCLUDE_PATHS', ''),
+        os.getenv('REVIEW_EXCLUDE_PATHS', ''),
+        env_int('REVIEW_MAX_LINE_LENGTH', DEFAULT_MAX_LINE_LENGTH, minimum=1),
+    )
+    with _filters_lock:
+        path_filter = _filters.get(key)
+        if path_filter is not None:
+            _filters.move_to_end(key)
+            return path_filter
+
+    text = DEFAULT_ATTRIBUTES
+    if blob:
+        text += '\n' + blob[1].decode('utf-8', 'replace')
+    if attributes_file:
+        text += '\n' + _read_attributes_file(attributes_file)
+    path_filter = PathFilter(parse_attributes(text), parse_globs(key[2]), parse_globs(key[3]), key[4])
+    with _filters_lock:
+        _filters[key] = path_filter
+        while len(_filters) > FILTER_CACHE_SIZE:
+            _filters.popitem(last=False)
+    return path_filter
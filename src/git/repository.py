@@ -0,0 +1,425 @@
+"""
+Repository access layer that batches git work.
+
+One Repository object per repository path checks once that the path is a git
+repository, loads name-status, patch and metadata for any number of commits
+with a single `git log` process, and reads file contents through one
+long-lived `git cat-file --batch` process. Process startup dominates the cost
+of small git calls, especially on Windows.
+"""
+
+import io
+import os
+import re
+import subprocess
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.git.diff_model import Diff, parse_diff
+from src.git.git_subprocess import (StallWatchdog, get_command_timeout, is_git_repo, iter_git_lines,
+                                    kill_process_tree, process_group_options, run_git_command)
+from src.utils.logger import logger
+
+# Field and record separators for the commit header format
+FIELD_SEP = '\x1f'
+RECORD_SEP = '\x1e'
+
+COMMIT_FORMAT = RECORD_SEP + FIELD_SEP.join(['%H', '%P', '%an', '%ae', '%ad', '%s'])
+
+FULL_SHA_RE = re.compile(r'^[0-9a-f]{40}$')
+
+# Prints the commits whose SHAs are given on stdin, in that order; merges against their first parent
+COMMIT_LOG_COMMAND = [
+    "git", "log", "--stdin", "--no-walk=unsorted", "--first-parent", "-m",
+    "--patch-with-raw", "--unified=3", "--no-prefix", "--no-color",
+    f"--format={COMMIT_FORMAT}", "--date=iso-local"
+]
+
+# Piece size in which skipped objects are read off the cat-file pipe
+SKIP_CHUNK_BYTES = 64 * 1024
+
+# Number of loaded commits kept in memory per repository
+COMMIT_CACHE_SIZE = 256
+
+
+class CommitData:
+    """Metadata, changed files and patch of one commit"""
+
+    __slots__ = ('sha', 'parents', 'author', 'email', 'date', 'subject', 'files', 'patch', '_diff')
+
+    def __init__(self, sha: str, parents: List[str], author: str, email: str, date: str, subject: str,
+                 files: List[Tuple[str, str]], patch: str):
+        self.sha = sha
+        self.parents = parents
+        self.author = author
+        self.email = email
+        self.date = date
+        self.subject = subject
+        self.files = files
+        self.patch = patch
+        self._diff: Optional[Diff] = None
+
+    @property
+    def is_merge(self) -> bool:
+        return len(self.parents) > 1
+
+    @property
+    def file_paths(self) -> List[str]:
+        return [path for _, path in self.files]
+
+    @property
+    def diff(self) -> Diff:
+        """Structured diff, parsed from the patch on first use"""
+        if self._diff is None:
+            self._diff = parse_diff(self.patch)
+        return self._diff
+
+
+def parse_raw_line(line: str) -> Optional[Tuple[str, str]]:
+    """
+    Parse one line of `git log --raw` output
+
+    Args:
+        line: Line like ":100644 100644 abc123 def456 M\\tpath"
+
+    Returns:
+        Optional[Tuple[str, str]]: (status, path) with the new path for renames and copies
+    """
+    if not line.startswith(':'):
+        return None
+    parts = line.split('\t')
+    if len(parts) < 2:
+        return None
+    status = parts[0].split()[-1]
+    return status, parts[-1]
+
+
+def iter_log_commits(lines: Iterable[str]) -> Iterator[CommitData]:
+    """
+    Parse `git log --patch-with-raw` output produced with COMMIT_FORMAT as it streams in
+
+    Args:
+        lines: Output lines with their newlines
+
+    Yields:
+        CommitData: Each commit once its last line has been read
+    """
+    header = None
+    files: List[Tuple[str, str]] = []
+    patch: List[str] = []
+
+    def build() -> CommitData:
+        sha, parents, author, email, date, subject = header.split(FIELD_SEP, 5)
+        return CommitData(sha, parents.split(), author, email, date, subject, files, ''.join(patch))
+
+    for line in lines:
+        if line.startswith(RECORD_SEP):
+            if header is not None:
+                yield build()
+            header = line[1:].rstrip('\n')
+            files = []
+            patch = []
+        elif header is None:
+            continue
+        elif patch or line.startswith('diff --git '):
+            patch.append(line)
+        else:
+            parsed = parse_raw_line(line.rstrip('\n'))
+            if parsed:
+                files.append(parsed)
+
+    if header is not None:
+        yield build()
+
+
+def parse_log_output(output: str) -> List[CommitData]:
+    """
+    Parse complete `git log --patch-with-raw` output produced with COMMIT_FORMAT
+
+    Args:
+        output: Git log output
+
+    Returns:
+        List[CommitData]: Commits in output order
+    """
+    # str.splitlines() would also split at the field and record separators
+    return list(iter_log_commits(io.StringIO(output)))
+
+
+class BlobReader:
+    """
+    Reads objects through one long-lived `git cat-file --batch` process
+
+    A read that waits GIT_COMMAND_TIMEOUT_SECONDS for git kills the process;
+    the next read starts a new one.
+    """
+
+    def __init__(self, repo_path: str):
+        self.repo_path = repo_path
+        self._process: Optional[subprocess.Popen] = None
+        self._watchdog: Optional[StallWatchdog] = None
+        self._lock = threading.Lock()
+
+    def _start(self) -> subprocess.Popen:
+        if self._process is None or self._process.poll() is not None:
+            self.close()
+            self._process = subprocess.Popen(
+                ["git", "cat-file", "--batch"],
+                cwd=self.repo_path,
+                stdin=subprocess.PIPE,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                **process_group_options()
+            )
+            self._watchdog = StallWatchdog(self._process, get_command_timeout())
+        return self._process
+
+    def _read_exactly(self, process: subprocess.Popen, size: int) -> bytes:
+        data = process.stdout.read(size)
+        if len(data) < size:
+            raise OSError("git stopped responding" if self._watchdog.expired else "unexpected end of output")
+        return data
+
+    def read(self, object_name: str, max_size: Optional[int] = None) -> Optional[Tuple[str, bytes]]:
+        """
+        Read an object
+
+        Args:
+            object_name: Anything cat-file accepts, e.g. "<commit>:<path>" or a blob SHA
+            max_size: Larger objects are skipped without being held in memory
+
+        Returns:
+            Optional[Tuple[str, bytes]]: (object SHA, content), or None if it does not exist or is too large
+        """
+        with self._lock:
+            process = self._start()
+            try:
+                self._watchdog.waiting_since = time.monotonic()
+                process.stdin.write(object_name.encode('utf-8') + b'\n')
+                process.stdin.flush()
+                line = process.stdout.readline()
+                if not line:
+                    raise OSError("git stopped responding" if self._watchdog.expired
+                                  else "unexpected end of output")
+                header = line.decode('utf-8', 'replace').split()
+                if len(header) != 3:
+                    # "<name> missing" or "<name> ambiguous"
+                    return None
+                size = int(header[2])
+                if max_size is not None and size > max_size:
+                    # The object still has to be taken off the pipe
+                    while size > 0:
+                        size -= len(self._read_exactly(process, min(size, SKIP_CHUNK_BYTES)))
+                    self._read_exactly(process, 1)
+                    return None
+                content = self._read_exactly(process, size)
+                self._read_exactly(process, 1)  # Trailing newline
+            except (OSError, ValueError) as e:
+                logger.log(f"git cat-file failed for {object_name}: {e}")
+                self.close()
+                return None
+            finally:
+                if self._watchdog is not None:
+                    self._watchdog.waiting_since = None
+        return header[0], content
+
+    def close(self) -> None:
+        process, self._process = self._process, None
+        watchdog, self._watchdog = self._watchdog, None
+        if watchdog is not None:
+            watchdog.stop()
+        if process is not None and process.poll() is None:
+            try:
+                process.stdin.close()
+                process.wait(timeout=5)
+            except (OSError, subprocess.TimeoutExpired):
+                kill_process_tree(process)
+
+
+class Repository:
+    """
+    Batched, cached access to one git repository
+    """
+
+    def __init__(self, repo_path: str):
+        self.path = repo_path
+        self._is_valid = False
+        self._commits: 'OrderedDict[str, CommitData]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._blob_reader: Optional[BlobReader] = None
+
+    def is_valid(self) -> bool:
+        """Check that the path is a git repository; a positive answer is remembered"""
+        if not self._is_valid:
+            self._is_valid = is_git_repo(self.path)
+        return self._is_valid
+
+    def iter_commits(self, revisions: Iterable[str]) -> Iterator[Tuple[str, CommitData]]:
+        """
+        Stream metadata, changed files and patch of several commits from one git process
+
+        Cached commits are yielded first, the rest as soon as git has printed
+        them, so callers can start working before git finishes. Merge commits
+        are diffed against their first parent.
+
+        Args:
+            revisions: Commit hashes or other revisions
+
+        Yields:
+            Tuple[str, CommitData]: Requested revision and its commit
+        """
+        missing = []
+        with self._lock:
+            cached = []
+            for revision in dict.fromkeys(revisions):
+                commit = self._commits.get(revision)
+                if commit is None:
+                    missing.append(revision)
+                else:
+                    self._commits.move_to_end(revision)
+                    cached.append((revision, commit))
+        yield from cached
+
+        if not missing:
+            return
+
+        # Map output back to requested names by SHA; symbolic names are resolved first
+        if all(FULL_SHA_RE.match(revision) for revision in missing):
+            shas = missing
+        else:
+            shas = self.resolve_commits(missing)
+        revisions_by_sha: Dict[str, List[str]] = {}
+        for revision, sha in zip(missing, shas):
+            if sha:
+                revisions_by_sha.setdefault(sha, []).append(revision)
+        shas = [sha for sha in shas if sha]
+        if not shas:
+            return
+
+        lines = iter_git_lines(COMMIT_LOG_COMMAND, self.path, input='\n'.join(dict.fromkeys(shas)) + '\n')
+        for commit in iter_log_commits(lines):
+            self.remember(commit)
+            for revision in revisions_by_sha.get(commit.sha, []):
+                yield revision, commit
+
+    def resolve_commits(self, revisions: List[str]) -> List[Optional[str]]:
+        """
+        Resolve revisions to commit SHAs with one git process
+
+        Args:
+            revisions: Commit hashes, branch names or other revisions
+
+        Returns:
+            List[Optional[str]]: SHA for each revision, None where it does not name a commit
+        """
+        output = run_git_command(
+            ["git", "cat-file", "--batch-check=%(objectname) %(objecttype)"],
+            self.path,
+            input=''.join(f"{revision}^{{commit}}\n" for revision in revisions)
+        )
+        shas = []
+        for line in output.splitlines():
+            parts = line.split()
+            shas.append(parts[0] if len(parts) == 2 and parts[1] == 'commit' else None)
+        if len(shas) != len(revisions):
+            return [None] * len(revisions)
+        return shas
+
+    def cached_commit(self, sha: str) -> Optional[CommitData]:
+        """Get a loaded commit by full SHA without running git"""
+        with self._lock:
+            return self._commits.get(sha)
+
+    def remember(self, commit: CommitData) -> None:
+        """Keep a commit loaded elsewhere, e.g. by the async runner, in the cache"""
+        # Only immutable names are safe cache keys
+        with self._lock:
+            self._commits[commit.sha] = commit
+            self._commits.move_to_end(commit.sha)
+            while len(self._commits) > COMMIT_CACHE_SIZE:
+                self._commits.popitem(last=False)
+
+    def load_commits(self, revisions: Iterable[str]) -> Dict[str, CommitData]:
+        """
+        Load metadata, changed files and patch of several commits with one git process
+
+        Args:
+            revisions: Commit hashes or other revisions
+
+        Returns:
+            Dict[str, CommitData]: Loaded commits by the revision they were requested with
+        """
+        return dict(self.iter_commits(revisions))
+
+    def get_commit(self, revision: str = "HEAD") -> Optional[CommitData]:
+        """
+        Load one commit
+
+        Args:
+            revision: Commit hash or other revision (default: HEAD)
+
+        Returns:
+            Optional[CommitData]: The commit, or None if it could not be read
+        """
+        return self.load_commits([revision]).get(revision)
+
+    def read_file(
+        self, revision: str, path: str, max_bytes: Optional[int] = None
+    ) -> Optional[Tuple[str, bytes]]:
+        """
+        Read a file as of a revision through the shared cat-file process
+
+        Args:
+            revision: Commit hash or other revision
+            path: File path relative to the repository root
+            max_bytes: Files larger than this are not read
+
+        Returns:
+            Optional[Tuple[str, bytes]]: (blob SHA, content), or None if the file does not exist there
+                or is larger than max_bytes
+        """
+        with self._lock:
+            if self._blob_reader is None:
+                self._blob_reader = BlobReader(self.path)
+            reader = self._blob_reader
+        return reader.read(f"{revision}:{path}", max_bytes)
+
+    def close(self) -> None:
+        """Stop the cat-file process"""
+        with self._lock:
+            reader, self._blob_reader = self._blob_reader, None
+        if reader is not None:
+            reader.close()
+
+
+_repositories: Dict[str, Repository] = {}
+_repositories_lock = threading.Lock()
+
+
+def get_repository(repo_path: str) -> Repository:
+    """
+    Get the shared Repository for a path
+
+    Args:
+        repo_path: Path to git repository
+
+    Returns:
+        Repository: One instance per absolute path for the whole process
+    """
+    key = os.path.normcase(os.path.abspath(repo_path))
+    with _repositories_lock:
+        repository = _repositories.get(key)
+        if repository is None:
+            repository = Repository(repo_path)
+            _repositories[key] = repository
+        return repository
+
+
+def close_repositories() -> None:
+    """Stop the cat-file processes of all shared repositories"""
+    with _repositories_lock:
+        repositories = list(_repositories.values())
+    for repository in repositories:
+        repository.close()
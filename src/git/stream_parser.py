@@ -0,0 +1,48 @@
+"""
+Generator-based parsers for git output.
+
+Each parser consumes an iterable of lines (for example iter_git_lines) and
+yields structured records as soon as they are complete, so memory stays
+bounded and later stages can start before git has finished.
+"""
+
+from typing import Iterable, Iterator, Tuple
+
+# Field separator of the commit list format used by iter_commit_tuples
+COMMIT_FIELD_SEP = '\x1f'
+
+COMMIT_TUPLE_FORMAT = COMMIT_FIELD_SEP.join(['%ad', '%an', '%H', '%s'])
+
+
+def iter_name_status(lines: Iterable[str]) -> Iterator[Tuple[str, str]]:
+    """
+    Parse `--name-status` lines
+
+    Args:
+        lines: Lines like "M\\tpath" or "R100\\told\\tnew"; other lines are skipped
+
+    Yields:
+        Tuple[str, str]: (status, path) with the new path for renames and copies
+    """
+    for line in lines:
+        parts = line.rstrip('\n').split('\t')
+        if len(parts) >= 2 and parts[0].strip():
+            yield parts[0], parts[-1]
+
+
+def iter_commit_tuples(lines: Iterable[str]) -> Iterator[Tuple[str, str, str, str]]:
+    """
+    Parse `git log --format=COMMIT_TUPLE_FORMAT` lines
+
+    Args:
+        lines: Output lines
+
+    Yields:
+        Tuple[str, str, str, str]: (time, author, message, hash)
+    """
+    for line in lines:
+        line = line.rstrip('\n')
+        if not line.strip():
+            continue
+        time, author, commit_hash, message = line.split(COMMIT_FIELD_SEP, 3)
+        yield time, author, message, commit_hash
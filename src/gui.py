@@ -1,9 +1,33 @@
 import os
+import queue
+import sqlite3
+import time
 import tkinter as tk
+from typing import List, Optional
 from tkinter import ttk, messagebox
-from src.review_logic import run_code_review, setup_git_branch
+from src.review_logic import run_code_review, review_new_commits, setup_git_branch
+from src.review_archive import get_review_archive
+from src.commit_index import get_commit_index
+from src.html_writer import open_in_chrome
 from src.utils.logger import logger
-from src.git.diff import get_last_commits
+from src.git.commit_pager import CommitPager
+from src.git.repository import get_repository
+from src.utils.jobs import Job, JobEvent, JobExecutor
+
+# How often the UI drains log lines and job events, in milliseconds
+QUEUE_POLL_INTERVAL_MS = 100
+
+# Upper bound of log lines inserted per drain, keeps each redraw short
+MAX_LOG_LINES_PER_DRAIN = 500
+
+# Commits read per page while scrolling down the commits list
+COMMIT_PAGE_SIZE = 200
+
+# The next page is loaded once the bottom of the view passes this fraction of the list
+LOAD_MORE_AT = 0.9
+
+# Rows compared with the repository on refresh; rows below are loaded again while scrolling
+MAX_REFRESH_ROWS = 2000
 
 
 class App:
@@ -63,6 +87,11 @@ class App:
         self.checkout_button = ttk.Button(button_frame, text="Checkout", command=self.checkout_branch)
         self.checkout_button.pack(side=tk.LEFT, padx=5)
 
+        # Cancel button for the running job
+        self.cancel_button = ttk.Button(button_frame, text="Cancel", command=self.cancel_jobs)
+        self.cancel_button.pack(side=tk.LEFT, padx=5)
+        self.cancel_button.state(['disabled'])
+
         # Progress indicator
         self.progress = ttk.Label(button_frame, text="")
         self.progress.pack(side=tk.LEFT, padx=5)
@@ -80,12 +109,27 @@ class App:
         commits_header = ttk.Frame(right_frame)
         commits_header.pack(fill=tk.X, pady=5)
 
-        ttk.Label(commits_header, text="Recent Commits").pack(side=tk.LEFT)
+        self.commits_label = ttk.Label(commits_header, text="Recent Commits")
+        self.commits_label.pack(side=tk.LEFT)
 
         # Refresh button for commits
         self.refresh_button = ttk.Button(commits_header, text="Refresh", command=self.refresh_commits)
         self.refresh_button.pack(side=tk.RIGHT)
 
+        # Past reviews from the review archive
+        self.history_button = ttk.Button(commits_header, text="History", command=self.show_history)
+        self.history_button.pack(side=tk.RIGHT, padx=5)
+
+        # Filters search the commit index; without filters the history is paged in
+        commit_filters = ttk.Frame(right_frame)
+        commit_filters.pack(fill=tk.X, pady=(0, 5))
+        self.author_filter = self._add_commit_filter(commit_filters, "Author:", 14)
+        self.message_filter = self._add_commit_filter(commit_filters, "Message:", 18)
+        self.path_filter = self._add_commit_filter(commit_filters, "Path:", 18)
+        self.since_filter = self._add_commit_filter(commit_filters, "Since:", 10)
+        ttk.Button(commit_filters, text="Search", command=self.refresh_commits).pack(side=tk.LEFT)
+        ttk.Button(commit_filters, text="Clear", command=self.clear_commit_filters).pack(side=tk.LEFT, padx=5)
+
         # Create frame for tree and scrollbar
         tree_frame = ttk.Frame(right_frame)
         tree_frame.pack(fill=tk.BOTH, expand=True)
@@ -110,12 +154,12 @@ class App:
         self.commits_tree.column("hash", width=100)
 
         # Add scrollbar for commits tree
-        commits_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.commits_tree.yview)
-        self.commits_tree.configure(yscrollcommand=commits_scrollbar.set)
+        self.commits_scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.commits_tree.yview)
+        self.commits_tree.configure(yscrollcommand=self.on_commits_scrolled)
 
         # Pack the tree and scrollbar
         self.commits_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        commits_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.commits_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
 
         # Review button frame under commits
         review_frame = ttk.Frame(right_frame)
@@ -126,11 +170,37 @@ class App:
                                      bg='#4CAF50', fg='white', relief='raised', padx=10)
         self.review_button.pack(side=tk.RIGHT)
 
+        # Reviews only commits added since the last run on this branch
+        self.review_new_button = ttk.Button(review_frame, text="Review New", command=self.review_new)
+        self.review_new_button.pack(side=tk.RIGHT, padx=5)
+
         # Bind click event for checkbox handling
         self.commits_tree.bind('<ButtonRelease-1>', self.on_tree_click)
 
-        # Set up logger callback
-        logger.set_gui_callback(self.log_message)
+        # Git and review work runs in the background, one job at a time.
+        # Log lines from any thread are queued and shown by process_queues.
+        self.jobs = JobExecutor(max_workers=1)
+        # Commit pages load on their own worker, so scrolling works while a review runs
+        self.commit_loader = JobExecutor(max_workers=1)
+        self.commit_pager: Optional[CommitPager] = None
+        # Incremented on every refresh; pages of an older refresh are dropped
+        self.commit_generation = 0
+        self.commits_loading = False
+        self.log_queue = queue.Queue()
+        self.history_window: Optional[ReviewHistoryWindow] = None
+
+        # Set up logger callback; the logger thread delivers its messages in batches
+        logger.set_gui_callback(self.log_messages, batched=True)
+
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+        self.root.after(QUEUE_POLL_INTERVAL_MS, self.process_queues)
+
+    def _add_commit_filter(self, parent, label: str, width: int) -> ttk.Entry:
+        ttk.Label(parent, text=label).pack(side=tk.LEFT)
+        entry = ttk.Entry(parent, width=width)
+        entry.pack(side=tk.LEFT, padx=(2, 8))
+        entry.bind('<Return>', lambda event: self.refresh_commits())
+        return entry
 
     def on_tree_click(self, event):
         """Handle clicks on the tree view"""
@@ -145,58 +215,271 @@ class App:
                 values[0] = "☒" if values[0] == "☐" else "☐"
                 self.commits_tree.item(item, values=values)
 
+    def show_history(self):
+        """Open the list of saved reviews, or bring it to the front"""
+        if self.history_window is not None and self.history_window.winfo_exists():
+            self.history_window.lift()
+            self.history_window.search()
+            return
+        self.history_window = ReviewHistoryWindow(self.root)
+
     def log_message(self, message: str):
-        """Add a message to the output text area"""
-        self.output_text.insert(tk.END, message + "\n")
-        self.output_text.see(tk.END)
-        self.root.update()
+        """Queue a message for the output text area; safe to call from any thread"""
+        self.log_queue.put(message)
+
+    def log_messages(self, messages: List[str]):
+        """Queue a batch of logger messages for the output text area"""
+        for message in messages:
+            self.log_queue.put(message)
+
+    def process_queues(self):
+        """Drain queued log lines and job events on the Tk thread"""
+        lines = []
+        while len(lines) < MAX_LOG_LINES_PER_DRAIN:
+            try:
+                lines.append(self.log_queue.get_nowait())
+            except queue.Empty:
+                break
+        if lines:
+            # One insert per batch instead of one redraw per line
+            self.output_text.insert(tk.END, "\n".join(lines) + "\n")
+            self.output_text.see(tk.END)
+
+        while True:
+            try:
+                event = self.jobs.events.get_nowait()
+            except queue.Empty:
+                break
+            self.handle_job_event(event)
+
+        while True:
+            try:
+                event = self.commit_loader.events.get_nowait()
+            except queue.Empty:
+                break
+            self.handle_commit_loader_event(event)
+
+        self.root.after(QUEUE_POLL_INTERVAL_MS, self.process_queues)
+
+    def handle_job_event(self, event: JobEvent):
+        """Update the UI for a job state change"""
+        job = event.job
+        if event.kind == JobEvent.STARTED:
+            self.progress.config(text=f"{job.name}...")
+        elif event.kind == JobEvent.PROGRESS:
+            text = f"{job.name}: {job.done_steps}"
+            if job.total_steps:
+                text += f"/{job.total_steps}"
+            if event.message:
+                text += f" {event.message}"
+            self.progress.config(text=text)
+        elif event.kind == JobEvent.FINISHED:
+            if not self.jobs.active_jobs():
+                self.set_processing_state(False)
+            if job.status == Job.CANCELLED:
+                self.log_message(f"{job.name} cancelled")
+            elif job.status == Job.FAILED:
+                error_msg = f"An error occurred: {str(job.error)}"
+                self.log_message(f"ERROR: {error_msg}")
+                messagebox.showerror("Error", error_msg)
+            if job.on_done and job.status == Job.DONE:
+                job.on_done(job)
+
+    def start_job(self, name: str, fn, *args, on_done=None) -> Job:
+        """Run fn(job, *args) in the background with the UI in processing state"""
+        self.set_processing_state(True)
+        return self.jobs.submit(name, fn, *args, on_done=on_done)
+
+    def cancel_jobs(self):
+        """Cancel running and pending jobs"""
+        self.log_message("Cancelling...")
+        self.jobs.cancel_all()
+
+    def handle_commit_loader_event(self, event: JobEvent):
+        """Show a loaded page of commits; loading never puts the UI in processing state"""
+        job = event.job
+        if event.kind != JobEvent.FINISHED:
+            return
+        if job.status == Job.DONE:
+            job.on_done(job)
+            return
+        self.commits_loading = False
+        if job.status == Job.FAILED:
+            self.log_message(f"ERROR: Could not load commits: {job.error}")
+
+    def on_close(self):
+        """Stop background jobs and close the window"""
+        self.jobs.shutdown()
+        self.commit_loader.shutdown()
+        if self.commit_pager is not None:
+            self.commit_pager.close()
+        self.root.destroy()
 
     def set_processing_state(self, is_processing: bool):
         """Update UI elements based on processing state"""
         if is_processing:
             self.review_button.config(state='disabled')
+            self.review_new_button.state(['disabled'])
             self.checkout_button.state(['disabled'])
             self.refresh_button.state(['disabled'])
+            self.cancel_button.state(['!disabled'])
             self.progress.config(text="Processing...")
         else:
             self.review_button.config(state='normal')
+            self.review_new_button.state(['!disabled'])
             self.checkout_button.state(['!disabled'])
             self.refresh_button.state(['!disabled'])
+            self.cancel_button.state(['disabled'])
             self.progress.config(text="")
-        self.root.update()
+
+    def commit_filters(self) -> dict:
+        """Search arguments of the commit index entered in the filter fields"""
+        return {
+            'author': self.author_filter.get().strip(),
+            'message': self.message_filter.get().strip(),
+            'path': self.path_filter.get().strip(),
+            'since': self.since_filter.get().strip(),
+        }
+
+    def clear_commit_filters(self):
+        """Empty the filter fields and show the paged history again"""
+        for entry in (self.author_filter, self.message_filter, self.path_filter, self.since_filter):
+            entry.delete(0, tk.END)
+        self.refresh_commits()
 
     def refresh_commits(self):
-        """Refresh the commits list"""
+        """Refresh the commits list, keeping the rows and check marks of commits that are still there"""
         repo_path = self.repo_path.get().strip()
 
         if not repo_path:
             messagebox.showerror("Error", "Please enter repository path")
             return
 
-        self.set_processing_state(True)
-        try:
-            # Clear existing items
-            for item in self.commits_tree.get_children():
-                self.commits_tree.delete(item)
-
-            # Get and display commits
-            commits = get_last_commits(repo_path, count=20)  # Request 20 commits instead of default 10
-            for time, author, message, commit_hash in commits:
-                # Add checkbox (☐) as first column
-                self.commits_tree.insert("", "end", values=("☐", time, author, message, commit_hash))
-
-            # Automatically check the first commit
-            first_item = self.commits_tree.get_children()[0]
-            values = list(self.commits_tree.item(first_item)['values'])
+        self.commit_generation += 1
+        generation = self.commit_generation
+        old_pager, self.commit_pager = self.commit_pager, None
+        filters = self.commit_filters()
+        if any(filters.values()):
+            self.commits_loading = True
+            self.commit_loader.submit(
+                "Searching commits", self.search_commit_index, repo_path, old_pager, filters,
+                on_done=lambda job: self.show_found_commits(job, generation)
+            )
+            return
+
+        count = max(COMMIT_PAGE_SIZE, min(len(self.commits_tree.get_children()), MAX_REFRESH_ROWS))
+        self.commits_loading = True
+        self.commit_loader.submit(
+            "Loading commits", self.load_first_commits, repo_path, old_pager, count,
+            on_done=lambda job: self.show_commits(job, generation)
+        )
+
+    @staticmethod
+    def load_first_commits(job: Job, repo_path: str, old_pager: Optional[CommitPager], count: int):
+        """Stop the previous pager and read the first commits of a new one"""
+        if old_pager is not None:
+            old_pager.close()
+        pager = CommitPager(repo_path, page_size=COMMIT_PAGE_SIZE)
+        return pager, pager.next_page(count)
+
+    @staticmethod
+    def search_commit_index(job: Job, repo_path: str, old_pager: Optional[CommitPager], filters: dict):
+        """Stop the previous pager, bring the commit index up to HEAD and search it"""
+        if old_pager is not None:
+            old_pager.close()
+        if not get_repository(repo_path).is_valid():
+            raise ValueError(f"{repo_path} is not a git repository")
+        index = get_commit_index(repo_path)
+        index.update()
+        return [commit.as_tuple() for commit in index.search(**filters)]
+
+    def show_found_commits(self, job: Job, generation: int):
+        """Show the result of a commit index search"""
+        self.commits_loading = False
+        if generation != self.commit_generation:
+            return
+        self.update_commit_rows(job.result)
+        self.commits_label.config(text=f"Matching Commits ({len(job.result)})")
+
+    def show_commits(self, job: Job, generation: int):
+        """Update the commits list with the result of a refresh job"""
+        pager, commits = job.result
+        if generation != self.commit_generation:
+            pager.close()
+            return
+        self.commit_pager = pager
+        self.commits_loading = False
+        self.update_commit_rows(commits)
+
+        # Automatically check the first commit if nothing is checked
+        children = self.commits_tree.get_children()
+        if children and not self.get_selected_commits():
+            values = list(self.commits_tree.item(children[0])['values'])
             values[0] = "☒"  # Check the first commit
-            self.commits_tree.item(first_item, values=values)
+            self.commits_tree.item(children[0], values=values)
+        self.update_commits_label()
+
+    def update_commit_rows(self, commits):
+        """
+        Make the rows match commits, touching only rows that changed
+
+        Rows are keyed by commit hash. Rows of known commits are moved or updated
+        in place with their check mark, new commits are inserted and rows below
+        the given commits are removed.
+
+        Args:
+            commits: (time, author, message, hash) of the first commits, newest first
+        """
+        tree = self.commits_tree
+        for index, (date, author, message, commit_hash) in enumerate(commits):
+            if not tree.exists(commit_hash):
+                tree.insert("", index, iid=commit_hash, values=("☐", date, author, message, commit_hash))
+                continue
+            values = tree.item(commit_hash)['values']
+            # Tk returns numeric looking values as numbers
+            if [str(value) for value in values[1:]] != [date, author, message, commit_hash]:
+                tree.item(commit_hash, values=(values[0], date, author, message, commit_hash))
+            if tree.index(commit_hash) != index:
+                tree.move(commit_hash, "", index)
+
+        stale = tree.get_children()[len(commits):]
+        if stale:
+            tree.delete(*stale)
+
+    def on_commits_scrolled(self, first: str, last: str):
+        """Move the scrollbar and load the next page when the view nears the end of the list"""
+        self.commits_scrollbar.set(first, last)
+        if float(last) >= LOAD_MORE_AT:
+            self.load_more_commits()
+
+    def load_more_commits(self):
+        """Read the next page of commits in the background"""
+        pager = self.commit_pager
+        if pager is None or pager.exhausted or self.commits_loading:
+            return
+        self.commits_loading = True
+        generation = self.commit_generation
+        self.commit_loader.submit(
+            "Loading more commits", lambda job: pager.next_page(),
+            on_done=lambda job: self.append_commits(job, generation)
+        )
 
-        except Exception as e:
-            error_msg = f"Failed to get commits: {str(e)}"
-            self.log_message(f"ERROR: {error_msg}")
-            messagebox.showerror("Error", error_msg)
-        finally:
-            self.set_processing_state(False)
+    def append_commits(self, job: Job, generation: int):
+        """Add a loaded page below the rows already shown"""
+        self.commits_loading = False
+        if generation != self.commit_generation:
+            return
+        for date, author, message, commit_hash in job.result:
+            if not self.commits_tree.exists(commit_hash):
+                self.commits_tree.insert(
+                    "", "end", iid=commit_hash, values=("☐", date, author, message, commit_hash)
+                )
+        self.update_commits_label()
+
+    def update_commits_label(self):
+        count = len(self.commits_tree.get_children())
+        more = "" if self.commit_pager is None or self.commit_pager.exhausted else "+"
+        self.commits_label.config(text=f"Recent Commits ({count}{more})")
 
     def get_selected_commits(self):
         """Get list of selected commits"""
@@ -204,7 +487,8 @@ class App:
         for item in self.commits_tree.get_children():
             values = self.commits_tree.item(item)['values']
             if values[0] == "☒":  # Checked checkbox
-                selected.append((values[1], values[2], values[3], values[4]))  # (time, author, message, hash)
+                # The row ID is the hash; the hash column may come back as a number
+                selected.append((values[1], values[2], values[3], item))  # (time, author, message, hash)
         return selected
 
     def checkout_branch(self):
@@ -216,29 +500,32 @@ class App:
             messagebox.showerror("Error", "Please enter both repository path and branch name")
             return
 
-        # Clear previous output and set processing state
+        # Clear previous output
         self.output_text.delete("1.0", tk.END)
         self.log_message("Starting checkout process...")
         self.log_message(f"Repository: {repo_path}")
         self.log_message(f"Branch: {branch_name}")
-        self.set_processing_state(True)
 
-        try:
-            if setup_git_branch(repo_path, branch_name):
-                self.log_message("Checkout completed successfully!")
+        self.start_job(
+            "Checkout",
+            lambda job: setup_git_branch(repo_path, branch_name, job.cancel_event),
+            on_done=self.on_checkout_done
+        )
+
+    def on_checkout_done(self, job: Job):
+        """Report the checkout result and reload commits"""
+        if job.result:
+            self.log_message("Checkout completed successfully!")
+            if os.getenv('REVIEW_NEW_AFTER_CHECKOUT', '').lower() in ('1', 'true', 'yes'):
+                # Review what the pull brought in; the commits list is refreshed afterwards
+                self.review_new()
+            else:
                 # Refresh commits list after successful checkout
                 self.refresh_commits()
-            else:
-                error_msg = "Failed to setup git branch"
-                self.log_message(f"ERROR: {error_msg}")
-                messagebox.showerror("Error", error_msg)
-        except Exception as e:
-            error_msg = f"An error occurred: {str(e)}"
+        else:
+            error_msg = "Failed to setup git branch"
             self.log_message(f"ERROR: {error_msg}")
             messagebox.showerror("Error", error_msg)
-        finally:
-            # Always restore UI state
-            self.set_processing_state(False)
 
     def get_review(self):
         """Get review for selected commits"""
@@ -253,26 +540,152 @@ class App:
             messagebox.showerror("Error", "Please select at least one commit to review")
             return
 
-        # Set processing state
         self.log_message("Starting code review process...")
         self.log_message(f"Repository: {repo_path}")
         self.log_message(f"Selected commits: {len(selected_commits)}")
         self.log_message("Selected commit hashes:")
         for _, _, _, commit_hash in selected_commits:
             self.log_message(f"- {commit_hash}")
-        self.set_processing_state(True)
 
-        try:
-            # Get the review
-            run_code_review(repo_path)  # Pass None as branch_name to skip checkout
-            self.log_message("Review completed successfully!")
-            self.log_message("Results have been saved to file and opened in browser.")
-            # Refresh commits list after successful review
+        commit_hashes = [str(commit_hash) for _, _, _, commit_hash in selected_commits]
+        self.start_job("Reviewing", self.review_job, repo_path, commit_hashes, on_done=self.on_review_done)
+
+    @staticmethod
+    def review_job(job: Job, repo_path: str, commit_hashes):
+        """Background part of get_review"""
+        finished = []
+
+        def on_result(commit, review):
+            finished.append(commit)
+            job.set_progress(len(finished), len(commit_hashes), commit[:12])
+
+        job.set_progress(0, len(commit_hashes))
+        return run_code_review(repo_path, commit_hashes, on_result=on_result, cancel_event=job.cancel_event)
+
+    def on_review_done(self, job: Job):
+        """Report the review result and reload commits"""
+        if job.result.startswith("Error:"):
+            self.log_message(f"ERROR: {job.result}")
+            return
+
+        self.log_message("Review completed successfully!")
+        self.log_message("Results have been saved to file and opened in browser.")
+        # Refresh commits list after successful review
+        self.refresh_commits()
+
+    def review_new(self):
+        """Review the commits added since the last review of the current branch"""
+        repo_path = self.repo_path.get().strip()
+
+        if not repo_path:
+            messagebox.showerror("Error", "Please enter repository path")
+            return
+
+        self.log_message("Reviewing new commits...")
+        self.log_message(f"Repository: {repo_path}")
+        self.start_job(
+            "Reviewing new commits", self.review_new_job, repo_path, on_done=self.on_review_new_done
+        )
+
+    @staticmethod
+    def review_new_job(job: Job, repo_path: str):
+        """Background part of review_new"""
+        finished = []
+
+        def on_result(commit, review):
+            finished.append(commit)
+            job.set_progress(len(finished), 0, commit[:12])
+
+        return review_new_commits(repo_path, on_result=on_result, cancel_event=job.cancel_event)
+
+    def on_review_new_done(self, job: Job):
+        """Report the result of an incremental review"""
+        if not job.result:
+            self.log_message("No new commits to review.")
             self.refresh_commits()
-        except Exception as e:
-            error_msg = f"An error occurred: {str(e)}"
-            self.log_message(f"ERROR: {error_msg}")
-            messagebox.showerror("Error", error_msg)
-        finally:
-            # Always restore UI state
-            self.set_processing_state(False)
+            return
+        self.on_review_done(job)
+
+
+class ReviewHistoryWindow(tk.Toplevel):
+    """
+    Saved reviews from the review archive, filtered by commit, author and date
+
+    The archive is indexed, so searching runs directly on the Tk thread.
+    Double-clicking a review opens its HTML file.
+    """
+
+    def __init__(self, master):
+        super().__init__(master)
+        self.title("Review History")
+        self.geometry("1100x500")
+        self.paths = {}
+
+        filters = ttk.Frame(self, padding="10")
+        filters.pack(fill=tk.X)
+        self.commit_filter = self._add_filter(filters, "Commit:", 14)
+        self.author_filter = self._add_filter(filters, "Author:", 20)
+        self.since_filter = self._add_filter(filters, "Since (YYYY-MM-DD):", 12)
+        ttk.Button(filters, text="Search", command=self.search).pack(side=tk.LEFT, padx=5)
+        self.count_label = ttk.Label(filters, text="")
+        self.count_label.pack(side=tk.RIGHT)
+
+        tree_frame = ttk.Frame(self, padding=(10, 0, 10, 10))
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        columns = ("id", "saved", "commits", "authors", "subject", "model", "status", "seconds")
+        self.tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+        widths = (50, 140, 180, 150, 300, 150, 60, 60)
+        for column, width in zip(columns, widths):
+            self.tree.heading(column, text=column.capitalize())
+            self.tree.column(column, width=width, anchor="e" if column in ("id", "seconds") else "w")
+        scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=scrollbar.set)
+        self.tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.tree.bind('<Double-1>', self.open_selected)
+
+        self.search()
+
+    def _add_filter(self, parent, label: str, width: int) -> ttk.Entry:
+        ttk.Label(parent, text=label).pack(side=tk.LEFT)
+        entry = ttk.Entry(parent, width=width)
+        entry.pack(side=tk.LEFT, padx=(2, 10))
+        entry.bind('<Return>', lambda event: self.search())
+        return entry
+
+    def search(self):
+        """Show the archived reviews matching the filters, newest first"""
+        try:
+            reviews = get_review_archive().find(
+                commit=self.commit_filter.get(),
+                author=self.author_filter.get(),
+                since=self.since_filter.get()
+            )
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"Could not read the review archive: {e}", parent=self)
+            return
+
+        self.tree.delete(*self.tree.get_children())
+        self.paths = {}
+        for review in reviews:
+            if len(review.commits) == 1:
+                subject = review.commits[0].subject
+            else:
+                subject = f"{len(review.commits)} commits"
+            item = self.tree.insert("", tk.END, values=(
+                review.id,
+                time.strftime('%Y-%m-%d %H:%M', time.localtime(review.created)),
+                ' '.join(commit.sha[:8] for commit in review.commits),
+                ', '.join(review.authors),
+                subject or '',
+                review.model or '',
+                review.status,
+                f"{review.seconds:.1f}" if review.seconds is not None else '',
+            ))
+            self.paths[item] = review.path
+        self.count_label.config(text=f"{len(reviews)} reviews")
+
+    def open_selected(self, event=None):
+        """Open the HTML file of the selected review"""
+        for item in self.tree.selection():
+            open_in_chrome(self.paths[item])
@@ -1,16 +1,30 @@
 import os
-import glob
+import html
 import webbrowser
+from typing import List, Optional, Tuple
+from src.review_archive import get_review_archive
 from src.utils.logger import logger
+from src.utils.metrics import metrics
 
-def get_next_file_number(results_dir: str) -> int:
-    """Get the next available file number in the results directory"""
-    existing_files = glob.glob(os.path.join(results_dir, '*.html'))
-    if not existing_files:
-        return 1
+def combine_reviews(reviews: List[Tuple[str, str]]) -> str:
+    """
+    Combine reviews of several commits into one report
+
+    Args:
+        reviews: (commit, review) pairs; reviews are HTML, errors are plain text
+
+    Returns:
+        str: HTML content with one section per commit
+    """
+    sections = []
+    for commit, review in reviews:
+        if review.startswith("Error:"):
+            body = f"<p><b>{html.escape(review)}</b></p>"
+        else:
+            body = review
+        sections.append(f"<h2>Commit {html.escape(commit[:12])}</h2>\n{body}")
 
-    numbers = [int(os.path.splitext(os.path.basename(f))[0]) for f in existing_files]
-    return max(numbers) + 1 if numbers else 1
+    return "\n<hr>\n".join(sections)
 
 def save_review_to_html(review: str, results_dir: str = 'results') -> str:
     """
@@ -23,26 +37,109 @@ def save_review_to_html(review: str, results_dir: str = 'results') -> str:
     Returns:
         str: Path to the saved file
     """
-    # Create results directory if it doesn't exist
-    os.makedirs(results_dir, exist_ok=True)
+    # The review archive hands out the file number and creates the directory
+    _, output_file = get_review_archive(results_dir).allocate()
+
+    return write_review_file(review, output_file)
+
+def write_review_file(review: str, output_file: str) -> str:
+    """
+    Write review content wrapped in the HTML template to the given file
+
+    Args:
+        review: Review content to save
+        output_file: Path of the HTML file; its directory must exist
+
+    Returns:
+        str: Path to the saved file
+    """
+    with metrics.span('review_stage_seconds', stage='render'):
+        # Read the HTML template
+        template = load_template()
+
+        # Replace content placeholder with actual review
+        html_content = template.replace('{content}', review)
 
-    # Get next available number and create file path
-    next_number = get_next_file_number(results_dir)
-    output_file = os.path.join(results_dir, f"{next_number}.html")
+        # Save the review with HTML wrapper
+        with open(output_file, 'w', encoding='utf-8') as f:
+            f.write(html_content)
 
-    # Read the HTML template
+    return output_file
+
+def load_template() -> str:
+    """Read the HTML template used for review files"""
     template_path = os.path.join(os.path.dirname(__file__), 'static/template.html')
     with open(template_path, 'r', encoding='utf-8') as f:
-        template = f.read()
+        return f.read()
 
-    # Replace content placeholder with actual review
-    html_content = template.replace('{content}', review)
+class StreamingHtmlWriter:
+    """
+    Writes a review HTML file incrementally while the review is being generated
 
-    # Save the review with HTML wrapper
-    with open(output_file, 'w', encoding='utf-8') as f:
-        f.write(html_content)
+    The file is usable as soon as it is opened: while streaming it carries a
+    refresh tag so the browser keeps reloading it, and close() rewrites it as
+    the final document without the tag.
+    """
 
-    return output_file
+    def __init__(self, results_dir: str = 'results', refresh_seconds: int = 2):
+        self.results_dir = results_dir
+        self.refresh_seconds = refresh_seconds
+        self.review_id: Optional[int] = None
+        self.output_file: Optional[str] = None
+        self._file = None
+        self._parts: List[str] = []
+        self._template = load_template()
+
+    def open(self) -> str:
+        """
+        Create the output file and write the document head
+
+        Returns:
+            str: Path to the file being written
+        """
+        self.review_id, self.output_file = get_review_archive(self.results_dir).allocate()
+
+        head = self._template.split('{content}', 1)[0]
+        refresh_tag = f'<meta http-equiv="refresh" content="{self.refresh_seconds}">'
+        head = head.replace('<head>', f'<head>\n    {refresh_tag}', 1)
+
+        self._file = open(self.output_file, 'w', encoding='utf-8')
+        self._file.write(head)
+        self._file.flush()
+        return self.output_file
+
+    @property
+    def is_open(self) -> bool:
+        return self._file is not None
+
+    def write(self, text: str) -> None:
+        """Append a piece of the review and flush it to disk"""
+        if self._file is None:
+            self.open()
+        self._parts.append(text)
+        self._file.write(text)
+        self._file.flush()
+
+    def close(self, review: Optional[str] = None) -> str:
+        """
+        Finish the file as a normal review document
+
+        Args:
+            review: Final review content (default: everything written so far)
+
+        Returns:
+            str: Path to the saved file
+        """
+        if self._file is None:
+            self.open()
+        self._file.close()
+        self._file = None
+
+        content = review if review is not None else ''.join(self._parts)
+        with metrics.span('review_stage_seconds', stage='render'):
+            with open(self.output_file, 'w', encoding='utf-8') as f:
+                f.write(self._template.replace('{content}', content))
+        return self.output_file
 
 def open_in_chrome(file_path: str) -> None:
     """
@@ -0,0 +1,281 @@
+"""
+Indexed archive of saved reviews.
+
+Every review saved to the results directory gets a row in a SQLite database
+next to the HTML files. The row ID is the file number, so numbering a new file
+is one INSERT instead of a scan of the directory, and it stays unique when
+several threads or processes save at the same time. The archive also keeps
+the model, stage timings and the reviewed commits with their author and date,
+so past reviews can be listed and found without reading the HTML files.
+Lookups by SHA prefix and date use indexes; the author filter matches a
+substring and scans the commits the other filters leave.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from src.utils.logger import logger
+
+ARCHIVE_FILE_NAME = 'reviews.sqlite3'
+
+STATUS_SAVED = 'saved'
+STATUS_OK = 'ok'
+STATUS_PARTIAL = 'partial'
+
+DEFAULT_LIST_LIMIT = 200
+
+NUMBERED_FILE_RE = re.compile(r'^(\d+)\.html$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS reviews (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created REAL NOT NULL,
+    path TEXT NOT NULL,
+    repo TEXT,
+    model TEXT,
+    status TEXT NOT NULL,
+    seconds REAL,
+    timings TEXT
+);
+CREATE TABLE IF NOT EXISTS review_commits (
+    review_id INTEGER NOT NULL REFERENCES reviews(id) ON DELETE CASCADE,
+    sha TEXT NOT NULL,
+    author TEXT,
+    date TEXT,
+    subject TEXT,
+    status TEXT
+);
+CREATE INDEX IF NOT EXISTS reviews_created ON reviews(created);
+CREATE INDEX IF NOT EXISTS review_commits_sha ON review_commits(sha);
+CREATE INDEX IF NOT EXISTS review_commits_date ON review_commits(date);
+CREATE INDEX IF NOT EXISTS review_commits_review ON review_commits(review_id);
+"""
+
+
+class ArchivedCommit:
+    """A commit covered by an archived review"""
+
+    __slots__ = ('sha', 'author', 'date', 'subject', 'status')
+
+    def __init__(self, sha: str, author: Optional[str] = None, date: Optional[str] = None,
+                 subject: Optional[str] = None, status: Optional[str] = None):
+        self.sha = sha
+        self.author = author
+        self.date = date
+        self.subject = subject
+        self.status = status
+
+
+class ArchivedReview:
+    """One saved review file and what it covers"""
+
+    __slots__ = ('id', 'created', 'path', 'repo', 'model', 'status', 'seconds', 'timings', 'commits')
+
+    def __init__(self, id: int, created: float, path: str, repo: Optional[str], model: Optional[str],
+                 status: str, seconds: Optional[float], timings: Dict[str, float],
+                 commits: List[ArchivedCommit]):
+        self.id = id
+        self.created = created
+        self.path = path
+        self.repo = repo
+        self.model = model
+        self.status = status
+        self.seconds = seconds
+        self.timings = timings
+        self.commits = commits
+
+    @property
+    def authors(self) -> List[str]:
+        return list(dict.fromkeys(commit.author for commit in self.commits if commit.author))
+
+
+class ReviewArchive:
+    """
+    SQLite index of the review files of one results directory
+    """
+
+    def __init__(self, results_dir: str = 'results'):
+        self.results_dir = results_dir
+        self.path = os.path.join(results_dir, ARCHIVE_FILE_NAME)
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database on first use; called with the lock held"""
+        if self._connection is None:
+            os.makedirs(self.results_dir, exist_ok=True)
+            is_new = not os.path.exists(self.path)
+            # Waits for other processes that are writing instead of failing
+            connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA foreign_keys=ON")
+            connection.executescript(SCHEMA)
+            if is_new:
+                self._continue_numbering(connection)
+            self._connection = connection
+        return self._connection
+
+    def _continue_numbering(self, connection: sqlite3.Connection) -> None:
+        """Start IDs after the numbered files saved before the archive existed"""
+        matches = (NUMBERED_FILE_RE.match(name) for name in os.listdir(self.results_dir))
+        numbers = [int(match.group(1)) for match in matches if match]
+        if not numbers:
+            return
+        with connection:
+            connection.execute(
+                "INSERT INTO sqlite_sequence (name, seq) VALUES ('reviews', ?)", (max(numbers),)
+            )
+        logger.log(f"Review archive created in {self.results_dir}, numbering continues after {max(numbers)}")
+
+    def allocate(self) -> Tuple[int, str]:
+        """
+        Reserve the next review ID and its file path
+
+        Returns:
+            Tuple[int, str]: Review ID and the path of its HTML file
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                cursor = connection.execute(
+                    "INSERT INTO reviews (created, path, status) VALUES (?, '', ?)",
+                    (time.time(), STATUS_SAVED)
+                )
+                review_id = cursor.lastrowid
+                path = os.path.join(self.results_dir, f"{review_id}.html")
+                connection.execute("UPDATE reviews SET path = ? WHERE id = ?", (path, review_id))
+        return review_id, path
+
+    def record(
+        self,
+        review_id: int,
+        repo: str,
+        model: Optional[str],
+        status: str,
+        commits: List[ArchivedCommit],
+        seconds: Optional[float] = None,
+        timings: Optional[Dict[str, float]] = None
+    ) -> None:
+        """
+        Store what a saved review covers
+
+        Args:
+            review_id: ID from allocate
+            repo: Repository path
+            model: Model that wrote the review, or comma-separated models if commits differ
+            status: STATUS_OK, or STATUS_PARTIAL if some commit reviews failed
+            commits: Reviewed commits
+            seconds: Wall time of the whole review
+            timings: Seconds per pipeline stage
+        """
+        with self._lock:
+            connection = self._connect()
+            with connection:
+                connection.execute(
+                    "UPDATE reviews SET repo = ?, model = ?, status = ?, seconds = ?, timings = ? "
+                    "WHERE id = ?",
+                    (os.path.abspath(repo), model, status, seconds, json.dumps(timings or {}), review_id)
+                )
+                connection.execute("DELETE FROM review_commits WHERE review_id = ?", (review_id,))
+                connection.executemany(
+                    "INSERT INTO review_commits (review_id, sha, author, date, subject, status) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    [(review_id, commit.sha, commit.author, commit.date, commit.subject, commit.status)
+                     for commit in commits]
+                )
+
+    def find(
+        self,
+        commit: Optional[str] = None,
+        author: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = DEFAULT_LIST_LIMIT
+    ) -> List[ArchivedReview]:
+        """
+        List archived reviews, newest first
+
+        Args:
+            commit: Only reviews of commits whose SHA starts with this
+            author: Only reviews of commits whose author name contains this (case-insensitive)
+            since: Only commits dated on or after this day or time (YYYY-MM-DD[ HH:MM:SS])
+            until: Only commits dated before the end of this day or time
+            limit: Maximum number of reviews
+
+        Returns:
+            List[ArchivedReview]: Matching reviews with all their commits
+        """
+        conditions = []
+        parameters: List[object] = []
+        if commit:
+            conditions.append("sha GLOB ?")
+            parameters.append(commit.strip().lower() + '*')
+        if author:
+            conditions.append("author LIKE ?")
+            parameters.append(f"%{author.strip()}%")
+        if since:
+            conditions.append("date >= ?")
+            parameters.append(since.strip())
+        if until:
+            # A date without time covers the whole day
+            conditions.append("date <= ?")
+            parameters.append(until.strip() + '\uffff')
+
+        where = ''
+        if conditions:
+            where = ("WHERE id IN (SELECT review_id FROM review_commits WHERE "
+                     + " AND ".join(conditions) + ")")
+        return self._load(where, parameters, limit)
+
+    def get(self, review_id: int) -> Optional[ArchivedReview]:
+        """Get one archived review by ID, None if it does not exist"""
+        reviews = self._load("WHERE id = ?", [review_id], 1)
+        return reviews[0] if reviews else None
+
+    def _load(self, where: str, parameters: List[object], limit: int) -> List[ArchivedReview]:
+        """Read reviews matching a WHERE clause and their commits"""
+        with self._lock:
+            connection = self._connect()
+            rows = connection.execute(
+                "SELECT id, created, path, repo, model, status, seconds, timings FROM reviews "
+                f"{where} ORDER BY id DESC LIMIT ?", parameters + [limit]
+            ).fetchall()
+            commits: Dict[int, List[ArchivedCommit]] = {row[0]: [] for row in rows}
+            if rows:
+                placeholders = ','.join('?' * len(rows))
+                for review_id, sha, author, date, subject, status in connection.execute(
+                    "SELECT review_id, sha, author, date, subject, status FROM review_commits "
+                    f"WHERE review_id IN ({placeholders}) ORDER BY rowid", list(commits)
+                ):
+                    commits[review_id].append(ArchivedCommit(sha, author, date, subject, status))
+
+        return [
+            ArchivedReview(review_id, created, path, repo, model, status, seconds,
+                           json.loads(timings) if timings else {}, commits[review_id])
+            for review_id, created, path, repo, model, status, seconds, timings in rows
+        ]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+_archives: Dict[str, ReviewArchive] = {}
+_archives_lock = threading.Lock()
+
+
+def get_review_archive(results_dir: str = 'results') -> ReviewArchive:
+    """Get the shared archive of a results directory"""
+    key = os.path.normcase(os.path.abspath(results_dir))
+    with _archives_lock:
+        archive = _archives.get(key)
+        if archive is None:
+            archive = _archives[key] = ReviewArchive(results_dir)
+        return archive
@@ -0,0 +1,252 @@
+"""
+Persistent on-disk cache of AI reviews.
+
+Entries are content-addressed: the key is a hash of the normalized diff, the
+prompt template, the review language and the model name, so the same change
+reviewed again (after a rebase, or by another person sharing the cache
+directory) is answered from disk instead of the API.
+"""
+
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from typing import Optional, Tuple
+
+from src.utils.logger import logger
+from src.utils.settings import env_float
+
+ANSI_ESCAPE_RE = re.compile(r'\x1b\[[0-9;]*[A-Za-z]')
+HUNK_HEADER_RE = re.compile(r'^@@ -\d+(?:,\d+)? \+\d+(?:,\d+)? @@')
+INDEX_LINE_RE = re.compile(r'^index [0-9a-f]+\.\.[0-9a-f]+')
+
+DEFAULT_CACHE_DIR = '.review_cache'
+DEFAULT_MAX_SIZE_MB = 200
+DEFAULT_MAX_AGE_DAYS = 30
+
+# Eviction scans the whole directory, so it runs only after this share of the size limit was written
+EVICT_AFTER_WRITTEN_SHARE = 0.05
+# or when the last scan is this old, so expired entries still go when little is written
+EVICT_INTERVAL_SECONDS = 3600
+
+
+def normalize_diff(diff: str) -> str:
+    """
+    Normalize a diff so that cosmetic differences do not change the cache key
+
+    Color codes, line endings, trailing whitespace, blob index lines and hunk
+    line numbers are removed. Line numbers shift when a commit is rebased on
+    top of unrelated changes, while the change itself stays the same.
+
+    Args:
+        diff: Raw git diff output
+
+    Returns:
+        str: Normalized diff text
+    """
+    lines = []
+    for line in ANSI_ESCAPE_RE.sub('', diff).replace('\r\n', '\n').split('\n'):
+        line = line.rstrip()
+        if INDEX_LINE_RE.match(line):
+            continue
+        lines.append(HUNK_HEADER_RE.sub('@@', line))
+    return '\n'.join(lines).strip()
+
+
+def make_cache_key(diff: str, prompt_template: str, language: Optional[str], model: str) -> str:
+    """
+    Build a content-addressed cache key for a review request
+
+    Args:
+        diff: Git diff that is being reviewed
+        prompt_template: Prompt template the diff is inserted into
+        language: Review language
+        model: Model name
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    for part in (normalize_diff(diff), prompt_template, language or '', model):
+        encoded = part.encode('utf-8')
+        # Length prefix keeps the parts unambiguous
+        digest.update(str(len(encoded)).encode('ascii') + b':' + encoded)
+    return digest.hexdigest()
+
+
+class ReviewCache:
+    """
+    Directory of JSON files, one per review, evicted by age and total size
+    """
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_size_bytes: int = DEFAULT_MAX_SIZE_MB * 1024 * 1024,
+                 max_age_seconds: float = DEFAULT_MAX_AGE_DAYS * 24 * 3600,
+                 enabled: bool = True):
+        self.cache_dir = cache_dir
+        self.max_size_bytes = max_size_bytes
+        self.max_age_seconds = max_age_seconds
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # Bytes written and time of the last eviction; 0 evicts on the first write
+        self._written_since_evict = 0
+        self._last_evict = 0.0
+
+    @classmethod
+    def from_env(cls) -> 'ReviewCache':
+        """Create a cache configured from REVIEW_CACHE_* environment variables"""
+        disabled = os.getenv('REVIEW_CACHE_DISABLED', '').lower() in ('1', 'true', 'yes')
+        return cls(
+            cache_dir=os.getenv('REVIEW_CACHE_DIR', DEFAULT_CACHE_DIR),
+            max_size_bytes=int(env_float('REVIEW_CACHE_MAX_MB', DEFAULT_MAX_SIZE_MB) * 1024 * 1024),
+            max_age_seconds=env_float('REVIEW_CACHE_MAX_AGE_DAYS', DEFAULT_MAX_AGE_DAYS) * 24 * 3600,
+            enabled=not disabled,
+        )
+
+    def _entry_path(self, key: str) -> str:
+        # Two-level fan-out keeps directories small
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[Tuple[str, Optional[str]]]:
+        """
+        Get a cached review
+
+        Args:
+            key: Cache key from make_cache_key
+
+        Returns:
+            Optional[Tuple[str, Optional[str]]]: Cached review and the model that wrote it, or None
+                on a miss
+        """
+        if not self.enabled:
+            return None
+
+        path = self._entry_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age_seconds:
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+            # Touch the entry so size eviction drops least recently used first
+            os.utime(path, None)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.log(f"Ignoring unreadable cache entry {path}: {e}")
+            return None
+
+        review = entry.get('review')
+        return (review, entry.get('model')) if review is not None else None
+
+    def put(self, key: str, review: str, model: str) -> None:
+        """
+        Store a review and evict old entries from time to time
+
+        A cache that cannot be written is logged and otherwise ignored, so the
+        review itself is never lost.
+
+        Args:
+            key: Cache key from make_cache_key
+            review: Review text
+            model: Model that produced the review
+        """
+        if not self.enabled:
+            return
+
+        path = self._entry_path(key)
+        # Write to a temporary file first so readers never see partial entries
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'key': key, 'model': model, 'created': time.time(), 'review': review}, f,
+                          ensure_ascii=False)
+            os.replace(tmp_path, path)
+            size = os.path.getsize(path)
+        except OSError as e:
+            logger.log(f"Could not write cache entry {path}: {e}")
+            if os.path.exists(tmp_path):
+                self._remove(tmp_path)
+            return
+
+        with self._lock:
+            self._written_since_evict += size
+            due = (self._written_since_evict >= self.max_size_bytes * EVICT_AFTER_WRITTEN_SHARE
+                   or time.time() - self._last_evict >= EVICT_INTERVAL_SECONDS)
+        if due:
+            self.evict()
+
+    def evict(self) -> None:
+        """Remove expired entries, then least recently used ones until under the size limit"""
+        if not os.path.isdir(self.cache_dir):
+            return
+
+        with self._lock:
+            now = time.time()
+            self._written_since_evict = 0
+            self._last_evict = now
+            entries = []
+            total_size = 0
+            try:
+                for shard in os.scandir(self.cache_dir):
+                    if not shard.is_dir():
+                        continue
+                    for entry in os.scandir(shard.path):
+                        # Skip temporary files of writes still in progress
+                        if not entry.name.endswith('.json'):
+                            continue
+                        try:
+                            stat = entry.stat()
+                        except FileNotFoundError:
+                            continue
+                        if now - stat.st_mtime > self.max_age_seconds:
+                            self._remove(entry.path)
+                            continue
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total_size += stat.st_size
+            except OSError as e:
+                logger.log(f"Could not scan review cache {self.cache_dir}: {e}")
+                return
+
+            if total_size <= self.max_size_bytes:
+                return
+
+            for _, size, path in sorted(entries):
+                self._remove(path)
+                total_size -= size
+                if total_size <= self.max_size_bytes:
+                    break
+
+    def clear(self) -> None:
+        """Remove all cached reviews"""
+        saved_limit = self.max_size_bytes
+        self.max_size_bytes = 0
+        try:
+            self.evict()
+        finally:
+            self.max_size_bytes = saved_limit
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.log(f"Could not remove cache entry {path}: {e}")
+
+
+_review_cache: Optional[ReviewCache] = None
+_review_cache_lock = threading.Lock()
+
+
+def get_review_cache() -> ReviewCache:
+    """Get the process-wide review cache"""
+    global _review_cache
+    with _review_cache_lock:
+        if _review_cache is None:
+            _review_cache = ReviewCache.from_env()
+        return _review_cache
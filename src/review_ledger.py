@@ -0,0 +1,141 @@
+"""
+Persistent record of which commits have already been reviewed.
+
+There is one JSON file per repository. For each branch it keeps the SHAs
+whose review was saved and the branch head at the last incremental run, so
+the next run only reviews commits added since then.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from src.utils.logger import logger
+
+DEFAULT_LEDGER_DIR = '.review_ledger'
+
+# Reviewed SHAs kept per branch; the oldest are dropped first
+MAX_SHAS_PER_BRANCH = 5000
+
+
+class ReviewLedger:
+    """
+    Reviewed commits of one repository, grouped by branch
+    """
+
+    def __init__(self, repo_path: str, ledger_dir: str = DEFAULT_LEDGER_DIR):
+        self.repo_path = os.path.abspath(repo_path)
+        repo_key = hashlib.sha256(os.path.normcase(self.repo_path).encode('utf-8')).hexdigest()[:16]
+        self.path = os.path.join(ledger_dir, f"{repo_key}.json")
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {'repo': self.repo_path, 'branches': {}}
+        except (OSError, ValueError) as e:
+            logger.log(f"Ignoring unreadable review ledger {self.path}: {e}")
+            return {'repo': self.repo_path, 'branches': {}}
+        data.setdefault('branches', {})
+        return data
+
+    def _save(self, data: dict) -> None:
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        # Write to a temporary file first so an interrupted run never leaves a broken ledger
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+    def _branch(self, branch: str) -> dict:
+        return self._load()['branches'].get(branch, {})
+
+    def reviewed(self, branch: str) -> Set[str]:
+        """
+        Get the SHAs reviewed on a branch
+
+        Args:
+            branch: Branch name
+
+        Returns:
+            Set[str]: Full commit SHAs
+        """
+        with self._lock:
+            return set(self._branch(branch).get('reviewed', []))
+
+    def last_head(self, branch: str) -> Optional[str]:
+        """
+        Get the branch head recorded by the last incremental review
+
+        Args:
+            branch: Branch name
+
+        Returns:
+            Optional[str]: Commit SHA, or None if the branch was never reviewed incrementally
+        """
+        with self._lock:
+            return self._branch(branch).get('last_head')
+
+    def record(self, branch: str, shas: Iterable[str], head: Optional[str] = None) -> None:
+        """
+        Mark commits as reviewed
+
+        Args:
+            branch: Branch name
+            shas: Full SHAs of the reviewed commits
+            head: New branch head for the next incremental review; unchanged if None
+        """
+        with self._lock:
+            data = self._load()
+            entry = data['branches'].setdefault(branch, {})
+            reviewed: Dict[str, None] = dict.fromkeys(entry.get('reviewed', []))
+            for sha in shas:
+                # Re-reviewed commits move to the end so they are dropped last
+                reviewed.pop(sha, None)
+                reviewed[sha] = None
+            entry['reviewed'] = list(reviewed)[-MAX_SHAS_PER_BRANCH:]
+            if head is not None:
+                entry['last_head'] = head
+            entry['updated'] = time.time()
+            self._save(data)
+
+    def forget(self, branch: str) -> None:
+        """Remove everything recorded for a branch"""
+        with self._lock:
+            data = self._load()
+            if data['branches'].pop(branch, None) is not None:
+                self._save(data)
+
+    def branches(self) -> List[str]:
+        """Get the branches with recorded reviews"""
+        with self._lock:
+            return list(self._load()['branches'])
+
+
+_ledgers: Dict[Tuple[str, str], ReviewLedger] = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_review_ledger(repo_path: str) -> ReviewLedger:
+    """
+    Get the shared ledger of a repository (directory: REVIEW_LEDGER_DIR)
+
+    Args:
+        repo_path: Path to git repository
+
+    Returns:
+        ReviewLedger: One instance per repository, so concurrent updates do not overwrite each other
+    """
+    ledger_dir = os.getenv('REVIEW_LEDGER_DIR', DEFAULT_LEDGER_DIR)
+    key = (ledger_dir, os.path.normcase(os.path.abspath(repo_path)))
+    with _ledgers_lock:
+        ledger = _ledgers.get(key)
+        if ledger is None:
+            ledger = ReviewLedger(repo_path, ledger_dir)
+            _ledgers[key] = ledger
+        return ledger
@@ -1,99 +1,807 @@
+import asyncio
+import html
 import os
-from src.git.diff import get_commit_changes, is_git_repo, get_changed_files_list
-from src.ai.ai_chat import ask_openai_router
-from src.html_writer import save_review_to_html, open_in_chrome
-from src.ai.gpt_prompts import REVIEW_PROMPT
-from src.git.git_subprocess import checkout_branch, pull_branch
+import sqlite3
+import threading
+import time
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from src.git.diff import load_commit, load_commit_async, list_commits
+from src.git.repository import CommitData, get_repository
+from src.ai.ai_chat import ask_openai_router, DEFAULT_MODEL_NAME
+from src.ai.scheduler import RequestCancelled, RequestFailure
+from src.ai.context_builder import build_review_context
+from src.ai.triage import DECISION_SKIP, SKIPPED_REVIEW_PREFIX, skipped_review, triage_commit
+from src.ai.tokens import estimate_tokens, plan_prompt_budget, truncate_to_tokens
+from src.html_writer import write_review_file, open_in_chrome, combine_reviews, StreamingHtmlWriter
+from src.ai.gpt_prompts import REVIEW_PROMPT, CHUNK_REVIEW_PROMPT, MERGE_REVIEW_PROMPT
+from src.git.chunker import chunk_diff
+from src.git.git_subprocess import checkout_branch, pull_branch, get_current_branch
+from src.review_archive import ArchivedCommit, STATUS_OK, STATUS_PARTIAL, get_review_archive
+from src.review_cache import get_review_cache, make_cache_key
+from src.review_ledger import get_review_ledger
 from src.utils.logger import logger
+from src.utils.metrics import metrics, MetricsSnapshot
+from src.utils.settings import env_int
 
-def setup_git_branch(repo_path: str, branch_name: str) -> bool:
+DEFAULT_REVIEW_CONCURRENCY = 4
+
+# Diffs larger than this many tokens are reviewed in chunks and then merged
+DEFAULT_CHUNK_TOKENS = 12000
+
+# Upper bound of commits reviewed by one incremental run
+DEFAULT_NEW_COMMITS_LIMIT = 50
+
+# Ledger key used when HEAD is detached
+DETACHED_HEAD_BRANCH = "HEAD"
+
+# Chunk and merge requests of all commits share one pool, so parallel reviews of large
+# commits never run more than REVIEW_CONCURRENCY of them at once
+_chunk_pool: Optional[ThreadPoolExecutor] = None
+_chunk_pool_lock = threading.Lock()
+
+def setup_git_branch(
+    repo_path: str, branch_name: str, cancel_event: Optional[threading.Event] = None
+) -> bool:
     """
     Setup git branch by pulling latest changes, checking out, and pulling again
+
+    Every step has a deadline (GIT_NETWORK_TIMEOUT_SECONDS for pulls) and
+    stops when cancel_event is set.
     """
     if not branch_name:
         logger.log("Error: Branch name is not specified")
         return False
 
-    if not pull_branch(repo_path):
+    if not pull_branch(repo_path, cancel_event):
         return False
 
-    if not checkout_branch(repo_path, branch_name):
+    if not checkout_branch(repo_path, branch_name, cancel_event):
         return False
 
-    if not pull_branch(repo_path):
+    if not pull_branch(repo_path, cancel_event):
         return False
 
     return True
 
-def review_last_commit(repo_path: str) -> str:
+def review_commit(
+    repo_path: str,
+    commit: str = "HEAD",
+    use_cache: bool = True,
+    on_token: Optional[Callable[[str], None]] = None,
+    commit_data: Optional[CommitData] = None,
+    cancel_event: Optional[threading.Event] = None,
+    on_model: Optional[Callable[[str], None]] = None
+) -> str:
     """
-    Get changes from the last commit and send them for AI code review
+    Get changes from a commit and send them for AI code review
+
+    A review of identical changes with the same prompt, language and model is
+    served from the review cache unless use_cache is False. If on_token is
+    given the review is streamed to it while it is generated. The time of
+    each stage is recorded in metrics, labelled with the commit. commit_data
+    is the commit if the caller has loaded it already. Once cancel_event is
+    set no request is sent and a running stream stops. on_model is called
+    with the model that wrote the review, which fallbacks and triage can make
+    differ from MODEL_NAME; it is not called for skipped or failed reviews.
     """
-    logger.log(f"Starting review of last commit in repository: {repo_path}")
+    started = time.perf_counter()
+    with metrics.context(commit=commit[:12]):
+        review = _review_commit(repo_path, commit, use_cache, on_token, commit_data, cancel_event, on_model)
+        metrics.observe('review_seconds', time.perf_counter() - started, outcome=review_outcome(review))
+    return review
+
+def review_outcome(review: str) -> str:
+    """Classify a review returned by review_commit: 'ok', 'empty', 'skipped' or 'error'"""
+    if review.startswith("Error:"):
+        return 'error'
+    if review.startswith("No changes found"):
+        return 'empty'
+    if review.startswith(SKIPPED_REVIEW_PREFIX):
+        return 'skipped'
+    return 'ok'
+
+def _review_commit(
+    repo_path: str,
+    commit: str,
+    use_cache: bool,
+    on_token: Optional[Callable[[str], None]],
+    commit_data: Optional[CommitData],
+    cancel_event: Optional[threading.Event],
+    on_model: Optional[Callable[[str], None]]
+) -> str:
+    """Body of review_commit"""
+    logger.log(f"Starting review of commit {commit} in repository: {repo_path}")
 
     if not os.path.exists(repo_path):
         error_msg = f"Error: Path {repo_path} does not exist"
         logger.log(error_msg)
         return error_msg
 
-    if not is_git_repo(repo_path):
+    if not get_repository(repo_path).is_valid():
         error_msg = f"Error: {repo_path} is not a git repository"
         logger.log(error_msg)
         return error_msg
 
-    logger.log("Getting commit changes...")
-    changes = get_commit_changes(repo_path)
+    logger.log(f"Getting changes of commit {commit}...")
+    with metrics.span('review_stage_seconds', stage='git'):
+        if commit_data is None:
+            commit_data = load_commit(repo_path, commit)
+        diff = commit_data.diff
+        changes = diff.render()
 
     if not changes.strip():
-        msg = "No changes found in the last commit"
+        msg = f"No changes found in commit {commit}"
         logger.log(msg)
         return msg
 
-    logger.log("Preparing review prompt...")
-    prompt = REVIEW_PROMPT.format(
-        changes=changes,
-        language=os.getenv('REVIEW_LANGUAGE')
-    )
+    # Trivial changes are not sent at all, small ones go to the fast model
+    with metrics.span('review_stage_seconds', stage='triage'):
+        triage = triage_commit(get_repository(repo_path), commit_data, diff)
+    metrics.increment('review_triage_total', decision=triage.decision)
+    if triage.decision == DECISION_SKIP:
+        logger.log(f"Skipping review of commit {commit}: {triage.describe()}")
+        review = skipped_review(commit, triage)
+        if on_token:
+            on_token(review)
+        return review
+    logger.log(f"Triage of commit {commit}: {triage.describe()}, reviewing with {triage.model}")
+    # Only the files triage kept, with overlong lines shortened
+    diff = triage.diff
+    changes = diff.render()
+
+    language = os.getenv('REVIEW_LANGUAGE')
+    cache = get_review_cache()
+    model = triage.model
+    cache_key = make_cache_key(changes, REVIEW_PROMPT, language, model)
+    if use_cache:
+        cached = cache.get(cache_key)
+        if cached is not None:
+            cached_review, cached_model = cached
+            logger.log(f"Using cached review ({cache_key[:12]}) for commit {commit}")
+            metrics.increment('review_cache_hits_total')
+            if on_token:
+                on_token(cached_review)
+            if on_model:
+                on_model(cached_model or model)
+            return cached_review
 
-    file_path = None
-    files_list = get_changed_files_list(repo_path)
-    if files_list:
-        for file in files_list:
-            file_path = repo_path + '/' + file
-            logger.log(f"Changed file: {file_path}")
-        file_path = repo_path + '/' + files_list[0]
-        logger.log(f"Using file context from: {file_path}")
-
-    logger.log("Requesting AI review...")
-    review = ask_openai_router(prompt, file_path)
+    if cancel_event is not None and cancel_event.is_set():
+        error_msg = f"Error: Review of commit {commit} was cancelled"
+        logger.log(error_msg)
+        return error_msg
+
+    for file in commit_data.file_paths:
+        logger.log(f"Changed file: {repo_path + '/' + file}")
+
+    # The model that answers, which may be a fallback of the requested one
+    answered_by: List[str] = []
+
+    logger.log("Preparing review prompt...")
+    with metrics.span('review_stage_seconds', stage='prompt'):
+        prompt = REVIEW_PROMPT.format(
+            changes=changes,
+            language=language
+        )
+        budget = plan_prompt_budget(
+            model,
+            REVIEW_PROMPT.format(changes='', language=language),
+            changes,
+            max_diff_tokens=get_chunk_token_budget()
+        )
+        chunks = chunk_diff(diff, budget.diff_budget) if not budget.diff_fits else [changes]
+    try:
+        if len(chunks) > 1:
+            logger.log(
+                f"Prompt budget ({model}, window {budget.context_window}): "
+                f"diff {budget.diff_tokens}/{budget.diff_budget} tokens"
+            )
+            logger.log(f"Commit {commit} is too large for one request, reviewing {len(chunks)} chunks...")
+            with metrics.span('review_stage_seconds', stage='llm'):
+                review = review_chunks(chunks, language, on_token, model, cancel_event, answered_by.append)
+        else:
+            with metrics.span('review_stage_seconds', stage='context'):
+                context = build_review_context(
+                    get_repository(repo_path), commit_data.sha, diff, budget.context_budget
+                )
+            logger.log(
+                f"Prompt budget ({model}, window {budget.context_window}): "
+                f"instructions {budget.instructions_tokens}, diff {budget.diff_tokens}/{budget.diff_budget}, "
+                f"context {estimate_tokens(context)}/{budget.context_budget} tokens"
+            )
+            logger.log(f"Requesting AI review of commit {commit}...")
+            with metrics.span('review_stage_seconds', stage='llm'):
+                review = ask_openai_router(prompt, on_token=on_token, context=context, model=model,
+                                           cancel_event=cancel_event, on_model=answered_by.append)
+    except RequestCancelled:
+        error_msg = f"Error: Review of commit {commit} was cancelled"
+        logger.log(error_msg)
+        return error_msg
+    except RequestFailure as failure:
+        # Failures are returned as errors, so they are never cached or saved as a review
+        error_msg = f"Error: Review of commit {commit} failed: {failure}"
+        logger.log(error_msg)
+        return error_msg
     if review is None:
         error_msg = "Error: Could not get AI review response"
         logger.log(error_msg)
         return error_msg
 
-    logger.log("Successfully received AI review")
+    logger.log(f"Successfully received AI review of commit {commit}")
+    answered_model = answered_by[-1] if answered_by else model
+    cache.put(cache_key, review, answered_model)
+    if on_model:
+        on_model(answered_model)
     return review
 
-def run_code_review(repo_path: str) -> str:
+def get_chunk_token_budget() -> int:
+    """Get the token budget of a single review request (REVIEW_CHUNK_TOKENS)"""
+    return env_int('REVIEW_CHUNK_TOKENS', DEFAULT_CHUNK_TOKENS, minimum=1000)
+
+def review_chunks(
+    chunks: List[str],
+    language: Optional[str],
+    on_token: Optional[Callable[[str], None]] = None,
+    model: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None,
+    on_model: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    Review diff chunks in parallel, then merge the partial reviews into one report
+
+    Args:
+        chunks: Diff chunks from chunk_diff
+        language: Review language
+        on_token: Receives the streamed text of the final merge pass
+        model: Model of all requests (default: MODEL_NAME)
+        cancel_event: Stops the requests when set
+        on_model: Called with the model that wrote the merged review
+
+    Returns:
+        str: Merged review
+
+    Raises:
+        RequestFailure: A chunk review or the merge request failed
+        RequestCancelled: cancel_event was set
+    """
+    prompts = [
+        CHUNK_REVIEW_PROMPT.format(index=index, total=len(chunks), changes=chunk, language=language)
+        for index, chunk in enumerate(chunks, 1)
+    ]
+
+    # The first failed chunk raises its RequestFailure here
+    partial_reviews = list(get_chunk_pool().map(
+        partial(ask_openai_router, model=model, cancel_event=cancel_event), prompts
+    ))
+
+    logger.log(f"Reviewed {len(chunks)} chunks, merging partial reviews...")
+    return merge_partial_reviews(partial_reviews, language, on_token, model, cancel_event, on_model)
+
+def get_chunk_pool() -> ThreadPoolExecutor:
+    """Get the pool shared by the chunk and merge requests of all reviews"""
+    global _chunk_pool
+    with _chunk_pool_lock:
+        if _chunk_pool is None:
+            _chunk_pool = ThreadPoolExecutor(max_workers=get_review_concurrency(), thread_name_prefix="chunk")
+        return _chunk_pool
+
+def format_partial_reviews(partial_reviews: List[str]) -> str:
+    """Join partial reviews into the input of the merge prompt"""
+    return "\n\n".join(
+        f"--- Часть {index} из {len(partial_reviews)} ---\n{partial_review}"
+        for index, partial_review in enumerate(partial_reviews, 1)
+    )
+
+def merge_partial_reviews(
+    partial_reviews: List[str],
+    language: Optional[str],
+    on_token: Optional[Callable[[str], None]] = None,
+    model: Optional[str] = None,
+    cancel_event: Optional[threading.Event] = None,
+    on_model: Optional[Callable[[str], None]] = None
+) -> str:
+    """
+    Merge partial reviews into one report, in several rounds if they do not fit into one request
+
+    Each round merges groups of partial reviews that fit the prompt budget, so
+    the number of reviews at least halves until one merge request takes them all.
+
+    Args:
+        partial_reviews: Reviews of the chunks in diff order
+        language: Review language
+        on_token: Receives the streamed text of the final merge pass
+        model: Model of all requests (default: MODEL_NAME)
+        cancel_event: Stops the requests when set
+        on_model: Called with the model that wrote the merged review
+
+    Returns:
+        str: Merged review
+
+    Raises:
+        RequestFailure: A merge request failed
+        RequestCancelled: cancel_event was set
+    """
+    instructions = MERGE_REVIEW_PROMPT.format(reviews='', language=language)
+    while True:
+        budget = plan_prompt_budget(model or os.getenv('MODEL_NAME', DEFAULT_MODEL_NAME), instructions,
+                                    format_partial_reviews(partial_reviews))
+        if budget.diff_fits or len(partial_reviews) == 1:
+            reviews = format_partial_reviews(partial_reviews)
+            if not budget.diff_fits:
+                logger.log(f"Merged review input has {budget.diff_tokens} tokens, "
+                           f"truncating to {budget.diff_budget}")
+                reviews = truncate_to_tokens(reviews, budget.diff_budget)
+            return get_chunk_pool().submit(
+                ask_openai_router, MERGE_REVIEW_PROMPT.format(reviews=reviews, language=language),
+                on_token=on_token, model=model, cancel_event=cancel_event, on_model=on_model
+            ).result()
+
+        # Every group holds at least two reviews, so each round makes progress
+        share = max(budget.diff_budget // 2, 1)
+        groups: List[List[str]] = [[]]
+        group_tokens = 0
+        for partial_review in partial_reviews:
+            partial_review = truncate_to_tokens(partial_review, share)
+            tokens = estimate_tokens(partial_review)
+            if groups[-1] and group_tokens + tokens > budget.diff_budget:
+                groups.append([])
+                group_tokens = 0
+            groups[-1].append(partial_review)
+            group_tokens += tokens
+        logger.log(f"{len(partial_reviews)} partial reviews exceed the merge budget, "
+                   f"merging them in {len(groups)} groups first...")
+        prompts = [
+            MERGE_REVIEW_PROMPT.format(reviews=format_partial_reviews(group), language=language)
+            for group in groups
+        ]
+        partial_reviews = list(get_chunk_pool().map(
+            partial(ask_openai_router, model=model, cancel_event=cancel_event), prompts
+        ))
+
+def review_last_commit(repo_path: str, use_cache: bool = True) -> str:
+    """
+    Get changes from the last commit and send them for AI code review
+    """
+    return review_commit(repo_path, "HEAD", use_cache)
+
+def get_review_concurrency() -> int:
+    """Get the maximum number of commits reviewed in parallel (REVIEW_CONCURRENCY)"""
+    return env_int('REVIEW_CONCURRENCY', DEFAULT_REVIEW_CONCURRENCY, minimum=1)
+
+def review_commits(
+    repo_path: str,
+    commits: List[str],
+    max_workers: Optional[int] = None,
+    use_cache: bool = True,
+    on_result: Optional[Callable[[str, str], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    loaded: Optional[Dict[str, CommitData]] = None,
+    on_model: Optional[Callable[[str, str], None]] = None
+) -> List[Tuple[str, str]]:
+    """
+    Review several commits concurrently through a bounded worker pool
+
+    Runs an event loop in the calling thread: commits are loaded through the
+    async git runner (GIT_MAX_CONCURRENCY git commands at once) while the
+    reviews of commits loaded earlier are already waiting for the LLM, and
+    each review starts as soon as its commit is read.
+
+    Args:
+        repo_path: Path to git repository
+        commits: Commit hashes to review
+        max_workers: Concurrency limit (default: REVIEW_CONCURRENCY)
+        use_cache: Whether to use the review cache
+        on_result: Called in the calling thread with (commit, review) as each review finishes
+        cancel_event: When set, commits whose review has not started yet are skipped and running
+            reviews stop
+        loaded: Commits already loaded by the caller, by the revision in commits
+        on_model: Called from the worker threads with (commit, model) for each commit reviewed
+
+    Returns:
+        List[Tuple[str, str]]: (commit, review) pairs in the order of commits
+    """
+    if max_workers is None:
+        max_workers = get_review_concurrency()
+    max_workers = max(1, min(max_workers, len(commits)))
+
+    # Reviews get their own threads, so git commands never wait behind LLM requests
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="review") as pool:
+        results = asyncio.run(_review_commits_async(
+            repo_path, commits, use_cache, on_result, cancel_event, loaded or {}, on_model, pool
+        ))
+    return [(commit, results[commit]) for commit in commits]
+
+async def _review_commits_async(
+    repo_path: str,
+    commits: List[str],
+    use_cache: bool,
+    on_result: Optional[Callable[[str, str], None]],
+    cancel_event: Optional[threading.Event],
+    loaded: Dict[str, CommitData],
+    on_model: Optional[Callable[[str, str], None]],
+    pool: ThreadPoolExecutor
+) -> Dict[str, str]:
+    """Body of review_commits; returns the review of each commit"""
+    loop = asyncio.get_running_loop()
+
+    def cancelled() -> bool:
+        return cancel_event is not None and cancel_event.is_set()
+
+    def review_loaded(commit: str, commit_data: Optional[CommitData]) -> str:
+        if cancelled():
+            return f"Error: Review of commit {commit} was cancelled"
+        return review_commit(repo_path, commit, use_cache, None, commit_data, cancel_event,
+                             partial(on_model, commit) if on_model else None)
+
+    async def load_and_review(commit: str) -> str:
+        commit_data = loaded.get(commit)
+        if commit_data is None and not cancelled():
+            try:
+                commit_data = await load_commit_async(repo_path, commit)
+            except ValueError:
+                # Commits git could not load are reported by review_commit itself
+                pass
+        return await loop.run_in_executor(pool, review_loaded, commit, commit_data)
+
+    tasks = {asyncio.ensure_future(load_and_review(commit)): commit for commit in dict.fromkeys(commits)}
+    results = {}
+    pending = set(tasks)
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            commit = tasks[task]
+            try:
+                review = task.result()
+            except Exception as e:
+                review = f"Error: Review of commit {commit} failed: {str(e)}"
+                logger.log(review)
+            results[commit] = review
+            if on_result:
+                on_result(commit, review)
+    return results
+
+def is_streaming_enabled() -> bool:
+    """Check whether single-commit reviews are streamed (REVIEW_STREAM)"""
+    return os.getenv('REVIEW_STREAM', '1').lower() in ('1', 'true', 'yes')
+
+class StreamingReviewOutput:
+    """
+    Receives streamed review text: writes it to an HTML file that is opened in
+    the browser on the first token, and logs it line by line
+    """
+
+    def __init__(self):
+        self.writer = StreamingHtmlWriter()
+        self._line = ''
+
+    def on_token(self, text: str) -> None:
+        first_token = not self.writer.is_open
+        self.writer.write(text)
+        if first_token:
+            logger.log(f"Streaming review to: {self.writer.output_file}")
+            open_in_chrome(self.writer.output_file)
+
+        self._line += text
+        *lines, self._line = self._line.split('\n')
+        for line in lines:
+            logger.log(line)
+
+    def flush_log(self) -> None:
+        """Log the last, unterminated line"""
+        if self._line:
+            logger.log(self._line)
+            self._line = ''
+
+    def close(self, review: str) -> str:
+        """Log the remaining text and finish the HTML file"""
+        self.flush_log()
+        return self.writer.close(review)
+
+def run_code_review(
+    repo_path: str,
+    commits: Optional[List[str]] = None,
+    on_result: Optional[Callable[[str, str], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    stream: Optional[bool] = None
+) -> str:
     """
     Main function to run the code review process
+
+    Reviews the given commits (default: HEAD) and saves them as one report.
+    Nothing is saved if cancel_event is set while the reviews are running.
+    A single commit review is streamed into its HTML file as it is generated
+    unless stream is False (default: REVIEW_STREAM). The saved review is
+    recorded in the review archive, and a summary of the run's metrics is
+    logged at the end.
+    """
+    started = time.perf_counter()
+    commits = commits or ["HEAD"]
+    # Model that answered, by commit
+    models: Dict[str, str] = {}
+    with metrics.collect() as run_metrics:
+        # Loaded once for the reviews and the archive record
+        repository = get_repository(repo_path)
+        loaded = repository.load_commits(commits) if repository.is_valid() else {}
+        review, review_id, reviews = _run_code_review(
+            repo_path, commits, on_result, cancel_event, stream, loaded, models.__setitem__
+        )
+    if review_id is not None:
+        archive_review(repo_path, review_id, reviews, loaded, models, time.perf_counter() - started,
+                       run_metrics)
+    log_metrics_summary(run_metrics)
+    return review
+
+def archive_review(
+    repo_path: str,
+    review_id: int,
+    reviews: List[Tuple[str, str]],
+    loaded: Dict[str, CommitData],
+    models: Dict[str, str],
+    seconds: float,
+    snapshot: MetricsSnapshot
+) -> None:
+    """
+    Record a saved review with its commits, model and stage timings in the review archive
+
+    Args:
+        repo_path: Path to git repository
+        review_id: Archive ID the review file was saved under
+        reviews: (commit, review) pairs the file contains
+        loaded: The reviewed commits as loaded for the review, by revision
+        models: Model that answered, by commit
+        seconds: Wall time of the run
+        snapshot: Metrics collected during the run
+    """
+    archived_commits = []
+    for commit, review in reviews:
+        data = loaded.get(commit)
+        archived_commits.append(ArchivedCommit(
+            data.sha if data else commit,
+            data.author if data else None,
+            data.date if data else None,
+            data.subject if data else None,
+            review_outcome(review)
+        ))
+    failed = any(commit.status == 'error' for commit in archived_commits)
+    # Fallbacks and triage can answer commits of one review with different models
+    model = ', '.join(dict.fromkeys(models[commit] for commit, _ in reviews if commit in models))
+    timings: Dict[str, float] = {}
+    for (name, labels), summary in snapshot.summaries.items():
+        if name == 'review_stage_seconds':
+            stage = dict(labels).get('stage', '')
+            timings[stage] = timings.get(stage, 0.0) + summary.total
+    try:
+        get_review_archive().record(
+            review_id, repo_path, model or None,
+            STATUS_PARTIAL if failed else STATUS_OK, archived_commits, seconds, timings
+        )
+    except sqlite3.Error as e:
+        logger.log(f"Could not record review {review_id} in the archive: {e}")
+
+def log_metrics_summary(snapshot: MetricsSnapshot) -> None:
+    """
+    Log the metrics of a run and update the Prometheus metrics file
+
+    Args:
+        snapshot: Metrics collected during the run
+    """
+    summary = snapshot.summary()
+    if summary:
+        logger.log("Review metrics (seconds, tokens):")
+        for line in summary.splitlines():
+            logger.log(f"  {line}")
+    metrics.write_prometheus()
+
+def _run_code_review(
+    repo_path: str,
+    commits: List[str],
+    on_result: Optional[Callable[[str, str], None]],
+    cancel_event: Optional[threading.Event],
+    stream: Optional[bool],
+    loaded: Dict[str, CommitData],
+    on_model: Callable[[str, str], None]
+) -> Tuple[str, Optional[int], List[Tuple[str, str]]]:
+    """
+    Body of run_code_review
+
+    Returns:
+        Tuple[str, Optional[int], List[Tuple[str, str]]]: The review, its archive ID
+            (None if nothing was saved) and the (commit, review) pairs it contains
     """
     logger.log(f"Starting code review process for repository: {repo_path}")
+    if stream is None:
+        stream = is_streaming_enabled()
 
-    logger.log("Getting review from last commit...")
-    review = review_last_commit(repo_path)
-    if review.startswith("Error:"):
-        logger.log(f"Error during review: {review}")
-        return review
-    logger.log("Successfully received review from last commit")
+    reviewed = []
+    user_on_result = on_result
+
+    def on_result(commit, review):
+        if not review.startswith("Error:"):
+            reviewed.append(commit)
+        if user_on_result:
+            user_on_result(commit, review)
+
+    streaming_output = None
+    if len(commits) == 1:
+        logger.log(f"Getting review of commit {commits[0]}...")
+        if stream:
+            streaming_output = StreamingReviewOutput()
+        review = review_commit(
+            repo_path, commits[0], on_token=streaming_output.on_token if streaming_output else None,
+            commit_data=loaded.get(commits[0]), cancel_event=cancel_event,
+            on_model=partial(on_model, commits[0])
+        )
+        if streaming_output:
+            streaming_output.flush_log()
+        if on_result:
+            on_result(commits[0], review)
+        if review.startswith("Error:"):
+            logger.log(f"Error during review: {review}")
+            if streaming_output and streaming_output.writer.is_open:
+                streaming_output.close(html.escape(review))
+            return review, None, []
+        reviews = [(commits[0], review)]
+    else:
+        logger.log(f"Reviewing {len(commits)} commits...")
+        reviews = review_commits(
+            repo_path, commits, on_result=on_result, cancel_event=cancel_event, loaded=loaded,
+            on_model=on_model
+        )
+        failed = [commit for commit, review in reviews if review.startswith("Error:")]
+        if len(failed) == len(reviews):
+            error_msg = f"Error: All {len(reviews)} commit reviews failed"
+            logger.log(error_msg)
+            return error_msg, None, []
+        if failed:
+            logger.log(f"Reviews failed for {len(failed)} of {len(reviews)} commits")
+        review = combine_reviews(reviews)
+
+    if cancel_event is not None and cancel_event.is_set():
+        error_msg = "Error: Review was cancelled"
+        logger.log(error_msg)
+        if streaming_output and streaming_output.writer.is_open:
+            streaming_output.close(review)
+        return error_msg, None, []
+    logger.log("Successfully received review")
+
+    if streaming_output and streaming_output.writer.is_open:
+        # Already open in the browser, only the final version is left to write
+        output_file = streaming_output.close(review)
+        logger.log(f"Review saved to: {output_file}")
+        record_reviewed(repo_path, reviewed)
+        logger.log("Code review process completed successfully")
+        return review, streaming_output.writer.review_id, reviews
 
     logger.log("Saving review to HTML file...")
-    output_file = save_review_to_html(review)
+    review_id, output_file = get_review_archive().allocate()
+    write_review_file(review, output_file)
     logger.log(f"Review saved to: {output_file}")
 
     logger.log("Opening review in Chrome browser...")
     open_in_chrome(output_file)
     logger.log("Review opened in Chrome browser")
 
+    record_reviewed(repo_path, reviewed)
     logger.log("Code review process completed successfully")
+    return review, review_id, reviews
+
+def get_ledger_branch(repo_path: str) -> str:
+    """Get the branch reviews are recorded under; detached HEADs share one entry"""
+    return get_current_branch(repo_path) or DETACHED_HEAD_BRANCH
+
+def record_reviewed(repo_path: str, commits: List[str]) -> None:
+    """
+    Record saved reviews in the review ledger of the current branch
+
+    Args:
+        repo_path: Path to git repository
+        commits: Reviewed commits; symbolic names are resolved to SHAs
+    """
+    if not commits:
+        return
+    shas = [sha for sha in get_repository(repo_path).resolve_commits(commits) if sha]
+    get_review_ledger(repo_path).record(get_ledger_branch(repo_path), shas)
+
+def get_new_commits_limit() -> int:
+    """Get the maximum number of commits of one incremental review (REVIEW_NEW_MAX_COMMITS)"""
+    return env_int('REVIEW_NEW_MAX_COMMITS', DEFAULT_NEW_COMMITS_LIMIT, minimum=1)
+
+def find_new_commits(repo_path: str) -> Tuple[str, Optional[str], List[str]]:
+    """
+    Find the commits of the current branch that have not been reviewed yet
+
+    Without a previous incremental run on the branch, or when the recorded
+    head no longer exists, only HEAD is considered new. When there are more
+    than REVIEW_NEW_MAX_COMMITS unreviewed commits, the oldest of them are
+    returned and the recorded head is kept, so the next run continues with the
+    commits after them.
+
+    Args:
+        repo_path: Path to git repository
+
+    Returns:
+        Tuple[str, Optional[str], List[str]]: (branch, head SHA to record once the commits are
+            reviewed or None if HEAD could not be resolved, unreviewed commit SHAs oldest first)
+    """
+    branch = get_ledger_branch(repo_path)
+    ledger = get_review_ledger(repo_path)
+    repository = get_repository(repo_path)
+
+    last_head = ledger.last_head(branch)
+    head, last_head_sha = repository.resolve_commits(["HEAD", last_head or "HEAD"])
+    if head is None:
+        return branch, None, []
+
+    if last_head is None:
+        logger.log(f"No previous review on branch {branch}, starting from HEAD")
+        candidates = [head]
+    elif last_head_sha is None:
+        logger.log(
+            f"Last reviewed head {last_head[:12]} of branch {branch} no longer exists, starting from HEAD"
+        )
+        candidates = [head]
+    else:
+        limit = get_new_commits_limit()
+        # Parents before children, so a run never reviews a commit before the ones it builds on
+        candidates = list_commits(repo_path, ["--topo-order", head, "--not", last_head_sha])
+        reviewed = ledger.reviewed(branch)
+        candidates = [sha for sha in candidates if sha not in reviewed]
+        if len(candidates) > limit:
+            logger.log(
+                f"{len(candidates)} new commits on branch {branch}, reviewing the oldest {limit}; "
+                "the next run continues after them"
+            )
+            candidates = candidates[:limit]
+            # Any newer head would let the skipped commits drop out of the next range
+            head = last_head_sha
+
+    reviewed = ledger.reviewed(branch)
+    return branch, head, [sha for sha in candidates if sha not in reviewed]
+
+def review_new_commits(
+    repo_path: str,
+    on_result: Optional[Callable[[str, str], None]] = None,
+    cancel_event: Optional[threading.Event] = None,
+    stream: Optional[bool] = None
+) -> str:
+    """
+    Review only the commits added to the current branch since the last incremental review
+
+    The branch head is remembered once every new commit has a saved review;
+    commits whose review failed are retried by the next run.
+
+    Args:
+        repo_path: Path to git repository
+        on_result: Called with (commit, review) as each review finishes
+        cancel_event: Stops the review when set
+        stream: Stream a single commit review (default: REVIEW_STREAM)
+
+    Returns:
+        str: Review as returned by run_code_review, an "Error: ..." message, or an empty
+            string if there was nothing new to review
+    """
+    if not get_repository(repo_path).is_valid():
+        error_msg = f"Error: {repo_path} is not a git repository"
+        logger.log(error_msg)
+        return error_msg
+
+    branch, head, new_commits = find_new_commits(repo_path)
+    if head is None:
+        error_msg = f"Error: Could not resolve HEAD in {repo_path}"
+        logger.log(error_msg)
+        return error_msg
+
+    ledger = get_review_ledger(repo_path)
+    if not new_commits:
+        logger.log(f"No new commits on branch {branch} since the last review")
+        ledger.record(branch, [], head=head)
+        return ""
+
+    logger.log(f"Found {len(new_commits)} new commits on branch {branch}")
+    review = run_code_review(
+        repo_path, new_commits, on_result=on_result, cancel_event=cancel_event, stream=stream
+    )
+    if not review.startswith("Error:") and set(new_commits) <= ledger.reviewed(branch):
+        ledger.record(branch, [], head=head)
     return review
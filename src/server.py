@@ -0,0 +1,393 @@
+"""
+Local HTTP review service.
+
+One warm process serves many developers or CI jobs. They share its pooled API
+client, repository layer and review cache. Requests are queued for a bounded
+worker pool, and a request for a commit that is already queued or running is
+attached to the existing job instead of starting a second review.
+
+    POST   /reviews              {"repo": PATH, "commit": REV, "use_cache": true} -> 202 job
+    GET    /reviews              recent jobs
+    GET    /reviews/<id>         job status
+    GET    /reviews/<id>/result  review as JSON, or as HTML with ?format=html
+    DELETE /reviews/<id>         cancel a queued job
+    GET    /health               worker and queue counters
+    GET    /metrics              review pipeline metrics in the Prometheus text format
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from src.git.repository import get_repository
+from src.html_writer import combine_reviews, load_template
+from src.review_logic import review_commit, record_reviewed, get_review_concurrency
+from src.utils.jobs import Job, JobEvent, JobExecutor
+from src.utils.logger import logger
+from src.utils.metrics import metrics
+from src.utils.settings import env_int
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_MAX_QUEUED = 100
+DEFAULT_HISTORY_SIZE = 1000
+
+# Largest accepted request body
+MAX_BODY_BYTES = 64 * 1024
+
+
+class ServiceError(Exception):
+    """A request the service rejects; carries the HTTP status to answer with"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class ReviewRequest:
+    """A review job and what the service knows about it"""
+
+    def __init__(self, job: Job, repo_path: str, revision: str, commit: str, use_cache: bool):
+        self.job = job
+        self.repo_path = repo_path
+        self.revision = revision
+        self.commit = commit
+        self.use_cache = use_cache
+        self.submitted_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        # Requests that were answered with this job instead of a new one
+        self.duplicates = 0
+
+    @property
+    def key(self) -> Tuple[str, str, bool]:
+        return self.repo_path, self.commit, self.use_cache
+
+    @property
+    def status(self) -> str:
+        """Job status; a finished review whose text is an error counts as failed"""
+        if self.job.status == Job.DONE and self.error:
+            return Job.FAILED
+        return self.job.status
+
+    @property
+    def error(self) -> Optional[str]:
+        if self.job.error is not None:
+            return f"Error: {str(self.job.error)}"
+        review = self.job.result
+        if isinstance(review, str) and (review.startswith("Error:")):
+            return review
+        return None
+
+    def to_dict(self) -> dict:
+        return {
+            'id': self.job.id,
+            'repo': self.repo_path,
+            'revision': self.revision,
+            'commit': self.commit,
+            'status': self.status,
+            'error': self.error,
+            'duplicates': self.duplicates,
+            'submitted_at': self.submitted_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+        }
+
+
+class ReviewService:
+    """
+    Queue of review jobs run by a worker pool, with in-flight deduplication
+    """
+
+    def __init__(self, workers: int, max_queued: int = DEFAULT_MAX_QUEUED,
+                 history_size: int = DEFAULT_HISTORY_SIZE, allowed_repos: Optional[List[str]] = None):
+        self.workers = workers
+        self.max_queued = max_queued
+        self.history_size = history_size
+        self.allowed_repos = [os.path.normcase(os.path.abspath(path)) for path in allowed_repos or []]
+        self.executor = JobExecutor(max_workers=workers)
+        self._requests: 'OrderedDict[int, ReviewRequest]' = OrderedDict()
+        self._in_flight: Dict[Tuple[str, str, bool], ReviewRequest] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._event_thread = threading.Thread(target=self._process_events, name="review-events", daemon=True)
+        self._event_thread.start()
+
+    def submit(self, repo_path: str, revision: str = "HEAD",
+               use_cache: bool = True) -> Tuple[ReviewRequest, bool]:
+        """
+        Queue a commit review unless the same review is already queued or running
+
+        Args:
+            repo_path: Path to git repository
+            revision: Commit to review
+            use_cache: Whether to use the review cache
+
+        Returns:
+            Tuple[ReviewRequest, bool]: The job and whether it was an existing one
+
+        Raises:
+            ServiceError: For unknown repositories or revisions and a full queue
+        """
+        repo_path = os.path.normcase(os.path.abspath(repo_path))
+        if self.allowed_repos and repo_path not in self.allowed_repos:
+            raise ServiceError(403, f"Repository {repo_path} is not served")
+        repository = get_repository(repo_path)
+        if not os.path.isdir(repo_path) or not repository.is_valid():
+            raise ServiceError(400, f"{repo_path} is not a git repository")
+        commit = repository.resolve_commits([revision])[0]
+        if commit is None:
+            raise ServiceError(400, f"{revision} is not a commit in {repo_path}")
+
+        with self._lock:
+            existing = self._in_flight.get((repo_path, commit, use_cache))
+            if existing is not None and not existing.job.is_cancelled():
+                existing.duplicates += 1
+                return existing, True
+            if len(self._in_flight) >= self.max_queued:
+                raise ServiceError(503, f"Review queue is full ({self.max_queued} jobs)")
+
+            job = self.executor.submit(f"Review {commit[:12]}", self._review, repo_path, commit, use_cache)
+            request = ReviewRequest(job, repo_path, revision, commit, use_cache)
+            self._requests[job.id] = request
+            self._in_flight[request.key] = request
+            self._trim_history()
+        logger.log(f"Queued review {job.id} of commit {commit[:12]} in {repo_path}")
+        return request, False
+
+    @staticmethod
+    def _review(job: Job, repo_path: str, commit: str, use_cache: bool) -> str:
+        review = review_commit(repo_path, commit, use_cache)
+        if not review.startswith("Error:"):
+            record_reviewed(repo_path, [commit])
+        metrics.write_prometheus()
+        return review
+
+    def _process_events(self) -> None:
+        """Track job start and end times and release finished jobs for deduplication"""
+        while not self._stopped.is_set():
+            event = self.executor.events.get()
+            if event is None:
+                break
+            with self._lock:
+                request = self._requests.get(event.job.id)
+                if request is None:
+                    continue
+                if event.kind == JobEvent.STARTED:
+                    request.started_at = time.time()
+                elif event.kind == JobEvent.FINISHED:
+                    request.finished_at = time.time()
+                    if self._in_flight.get(request.key) is request:
+                        del self._in_flight[request.key]
+            if event.kind == JobEvent.FINISHED:
+                logger.log(f"Review {event.job.id} of commit {request.commit[:12]} {request.status}")
+
+    def _trim_history(self) -> None:
+        # Called with the lock held; only finished jobs are forgotten
+        excess = len(self._requests) - self.history_size
+        for job_id in list(self._requests):
+            if excess <= 0:
+                break
+            if self._requests[job_id].job.finished:
+                del self._requests[job_id]
+                excess -= 1
+
+    def get(self, job_id: int) -> Optional[ReviewRequest]:
+        with self._lock:
+            return self._requests.get(job_id)
+
+    def list(self, limit: int = 100) -> List[ReviewRequest]:
+        """Most recent jobs first"""
+        with self._lock:
+            return list(reversed(self._requests.values()))[:limit]
+
+    def cancel(self, job_id: int) -> Optional[ReviewRequest]:
+        """Cancel a job; a review that is already running still finishes"""
+        request = self.get(job_id)
+        if request is not None:
+            request.job.cancel()
+        return request
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [request.job.status for request in self._requests.values()]
+        return {
+            'workers': self.workers,
+            'queued': statuses.count(Job.PENDING),
+            'running': statuses.count(Job.RUNNING),
+            'finished': sum(1 for status in statuses if status in (Job.DONE, Job.FAILED, Job.CANCELLED)),
+        }
+
+    def shutdown(self) -> None:
+        """Cancel queued jobs and stop the event thread"""
+        self._stopped.set()
+        self.executor.shutdown()
+        self.executor.events.put(None)
+
+
+class ReviewRequestHandler(BaseHTTPRequestHandler):
+    """HTTP front end of a ReviewService (available as self.server.service)"""
+
+    server_version = 'ReviewServer/1.0'
+
+    @property
+    def service(self) -> ReviewService:
+        return self.server.service
+
+    def log_message(self, format, *args) -> None:
+        logger.log(f"{self.address_string()} {format % args}")
+
+    def send_json(self, status: int, payload) -> None:
+        self.send_text(status, json.dumps(payload, ensure_ascii=False), 'application/json; charset=utf-8')
+
+    def send_text(self, status: int, text: str, content_type: str) -> None:
+        body = text.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def send_error_json(self, status: int, message: str) -> None:
+        self.send_json(status, {'error': message})
+
+    def _route(self) -> Tuple[List[str], dict]:
+        url = urlparse(self.path)
+        return [part for part in url.path.split('/') if part], parse_qs(url.query)
+
+    def _find(self, parts: List[str]) -> Optional[ReviewRequest]:
+        try:
+            request = self.service.get(int(parts[1]))
+        except ValueError:
+            request = None
+        if request is None:
+            self.send_error_json(404, f"Unknown review {parts[1]}")
+        return request
+
+    def do_GET(self) -> None:
+        parts, query = self._route()
+        if parts == ['health']:
+            self.send_json(200, dict(self.service.stats(), status='ok'))
+        elif parts == ['metrics']:
+            self.send_text(200, metrics.prometheus_text(), 'text/plain; version=0.0.4; charset=utf-8')
+        elif parts == ['reviews']:
+            self.send_json(200, [request.to_dict() for request in self.service.list()])
+        elif len(parts) == 2 and parts[0] == 'reviews':
+            request = self._find(parts)
+            if request is not None:
+                self.send_json(200, request.to_dict())
+        elif len(parts) == 3 and parts[0] == 'reviews' and parts[2] == 'result':
+            request = self._find(parts)
+            if request is not None:
+                self.send_result(request, query.get('format', ['json'])[0])
+        else:
+            self.send_error_json(404, f"Unknown path {self.path}")
+
+    def send_result(self, request: ReviewRequest, output_format: str) -> None:
+        if not request.job.finished:
+            self.send_json(202, request.to_dict())
+            return
+        if request.job.status == Job.CANCELLED:
+            self.send_error_json(410, f"Review {request.job.id} was cancelled")
+            return
+        review = request.error or request.job.result
+        if output_format == 'html':
+            content = combine_reviews([(request.commit, review)])
+            self.send_text(200, load_template().replace('{content}', content), 'text/html; charset=utf-8')
+        else:
+            self.send_json(200, dict(request.to_dict(), review=review))
+
+    def do_POST(self) -> None:
+        parts, _ = self._route()
+        if parts != ['reviews']:
+            self.send_error_json(404, f"Unknown path {self.path}")
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+        except ValueError:
+            length = -1
+        if length < 0:
+            self.send_error_json(400, "Invalid Content-Length")
+            return
+        if length > MAX_BODY_BYTES:
+            self.send_error_json(413, "Request body is too large")
+            return
+        try:
+            payload = json.loads(self.rfile.read(length) or b'{}')
+        except ValueError as e:
+            self.send_error_json(400, f"Invalid JSON: {e}")
+            return
+        if not isinstance(payload, dict):
+            self.send_error_json(400, "Request body must be a JSON object")
+            return
+        try:
+            repo_path = payload.get('repo') or os.getenv('REPO_PATH')
+            if not repo_path:
+                raise ServiceError(400, "Field 'repo' is required")
+            request, existing = self.service.submit(
+                str(repo_path), str(payload.get('commit') or "HEAD"), bool(payload.get('use_cache', True))
+            )
+        except ServiceError as e:
+            self.send_error_json(e.status, str(e))
+            return
+        self.send_json(200 if existing else 202, dict(request.to_dict(), deduplicated=existing))
+
+    def do_DELETE(self) -> None:
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != 'reviews':
+            self.send_error_json(404, f"Unknown path {self.path}")
+            return
+        request = self._find(parts)
+        if request is not None:
+            self.service.cancel(request.job.id)
+            self.send_json(200, request.to_dict())
+
+
+def create_server(host: Optional[str] = None, port: Optional[int] = None,
+                  workers: Optional[int] = None) -> ThreadingHTTPServer:
+    """
+    Create the review server configured from REVIEW_SERVER_* environment variables
+
+    Args:
+        host: Interface to listen on (default: REVIEW_SERVER_HOST or 127.0.0.1)
+        port: Port to listen on, 0 for any free port (default: REVIEW_SERVER_PORT or 8765)
+        workers: Reviews run in parallel (default: REVIEW_SERVER_WORKERS or REVIEW_CONCURRENCY)
+
+    Returns:
+        ThreadingHTTPServer: Server with its ReviewService as .service; call serve_forever()
+    """
+    host = host or os.getenv('REVIEW_SERVER_HOST', DEFAULT_HOST)
+    port = env_int('REVIEW_SERVER_PORT', DEFAULT_PORT) if port is None else port
+    workers = workers or env_int('REVIEW_SERVER_WORKERS', get_review_concurrency())
+    allowed_repos = [path for path in os.getenv('REVIEW_SERVER_REPOS', '').split(os.pathsep) if path]
+
+    server = ThreadingHTTPServer((host, port), ReviewRequestHandler)
+    server.daemon_threads = True
+    server.service = ReviewService(
+        max(1, workers),
+        max_queued=env_int('REVIEW_SERVER_MAX_QUEUE', DEFAULT_MAX_QUEUED),
+        allowed_repos=allowed_repos
+    )
+    return server
+
+
+def serve(host: Optional[str] = None, port: Optional[int] = None, workers: Optional[int] = None) -> None:
+    """Run the review server until interrupted"""
+    server = create_server(host, port, workers)
+    address, bound_port = server.server_address[:2]
+    logger.log(
+        f"Review server listening on http://{address}:{bound_port} with {server.service.workers} workers"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logger.log("Stopping review server...")
+    finally:
+        server.server_close()
+        server.service.shutdown()
@@ -0,0 +1,145 @@
+"""
+Background job execution for long-running git and review work.
+
+Jobs run on worker threads and report progress through a thread-safe event
+queue. The GUI drains that queue from its own thread, so no Tk call is ever
+made outside the main loop.
+"""
+
+import itertools
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from src.utils.logger import logger
+
+
+class JobCancelled(Exception):
+    """Raised inside a job when it notices that it has been cancelled"""
+
+
+class Job:
+    """
+    A unit of background work with progress reporting and cooperative cancellation
+    """
+
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, job_id: int, name: str, events: 'queue.Queue[JobEvent]',
+                 on_done: Optional[Callable[['Job'], None]] = None):
+        self.id = job_id
+        self.name = name
+        self.status = Job.PENDING
+        self.done_steps = 0
+        self.total_steps = 0
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.on_done = on_done
+        self.cancel_event = threading.Event()
+        self._events = events
+
+    def cancel(self) -> None:
+        """Ask the job to stop; the job checks this between steps"""
+        self.cancel_event.set()
+
+    def is_cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancel_event.is_set():
+            raise JobCancelled(self.name)
+
+    def set_progress(self, done_steps: int, total_steps: int, message: str = '') -> None:
+        """Report progress to whoever is draining the event queue"""
+        self.done_steps = done_steps
+        self.total_steps = total_steps
+        self._events.put(JobEvent(JobEvent.PROGRESS, self, message))
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (Job.DONE, Job.FAILED, Job.CANCELLED)
+
+
+class JobEvent:
+    """Notification about a job state change"""
+
+    STARTED = 'started'
+    PROGRESS = 'progress'
+    FINISHED = 'finished'
+
+    __slots__ = ('kind', 'job', 'message')
+
+    def __init__(self, kind: str, job: Job, message: str = ''):
+        self.kind = kind
+        self.job = job
+        self.message = message
+
+
+class JobExecutor:
+    """
+    Runs jobs on a small thread pool and publishes their events to a queue
+    """
+
+    def __init__(self, max_workers: int = 1):
+        self.events: 'queue.Queue[JobEvent]' = queue.Queue()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, name: str, fn: Callable[..., Any], *args,
+               on_done: Optional[Callable[[Job], None]] = None, **kwargs) -> Job:
+        """
+        Schedule fn(job, *args, **kwargs) on a worker thread
+
+        Args:
+            name: Human readable job name
+            fn: Function to run; receives the Job as its first argument
+            on_done: Callback for the event consumer, invoked with the finished job
+
+        Returns:
+            Job: Handle for progress and cancellation
+        """
+        job = Job(next(self._ids), name, self.events, on_done)
+        with self._lock:
+            self._jobs[job.id] = job
+        self._pool.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn: Callable[..., Any], args, kwargs) -> None:
+        if job.is_cancelled():
+            job.status = Job.CANCELLED
+        else:
+            job.status = Job.RUNNING
+            self.events.put(JobEvent(JobEvent.STARTED, job))
+            try:
+                job.result = fn(job, *args, **kwargs)
+                job.status = Job.CANCELLED if job.is_cancelled() else Job.DONE
+            except JobCancelled:
+                job.status = Job.CANCELLED
+            except Exception as e:
+                job.error = e
+                job.status = Job.FAILED
+                logger.log(f"Job '{job.name}' failed: {str(e)}")
+
+        with self._lock:
+            self._jobs.pop(job.id, None)
+        self.events.put(JobEvent(JobEvent.FINISHED, job))
+
+    def active_jobs(self):
+        """Jobs that are pending or running"""
+        with self._lock:
+            return list(self._jobs.values())
+
+    def cancel_all(self) -> None:
+        for job in self.active_jobs():
+            job.cancel()
+
+    def shutdown(self, wait: bool = False) -> None:
+        self.cancel_all()
+        self._pool.shutdown(wait=wait, cancel_futures=True)
@@ -1,8 +1,128 @@
-from typing import Callable, Optional
+"""
+Application log with levels, structured fields and a background writer.
+
+logger.log() only puts a record on a queue and returns, so review workers
+never wait for the GUI, the console or the disk. One writer thread takes the
+records off the queue in batches and hands each batch to the outputs:
+
+- the GUI callback, or stdout when no callback is set
+- LOG_FILE, rotated at LOG_MAX_BYTES with LOG_BACKUP_COUNT old files kept,
+  as text or as JSON lines (LOG_FORMAT=json)
+
+    logger.log("Reviewed commit")                   # INFO, or ERROR for "Error: ..." messages
+    logger.warning("Slow answer", model=model, seconds=12.5)
+
+Records below LOG_LEVEL are dropped before they are queued.
+"""
+
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from typing import Callable, List, Optional, TextIO
+
+from src.utils.settings import env_int
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: 'DEBUG', INFO: 'INFO', WARNING: 'WARNING', ERROR: 'ERROR'}
+
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+# Records handed to the outputs in one go
+MAX_BATCH_SIZE = 500
+
+
+def parse_level(name: Optional[str], default: int = INFO) -> int:
+    """Level from a name such as "debug" or a number; default if it is not recognized"""
+    if not name:
+        return default
+    name = name.strip().upper()
+    if name.isdigit():
+        return int(name)
+    for level, level_name in LEVEL_NAMES.items():
+        if level_name == name:
+            return level
+    return default
+
+
+class LogRecord:
+    """One log message with its level, time, thread and structured fields"""
+
+    __slots__ = ('level', 'message', 'fields', 'created', 'thread')
+
+    def __init__(self, level: int, message: str, fields: dict):
+        self.level = level
+        self.message = message
+        self.fields = fields
+        self.created = time.time()
+        self.thread = threading.current_thread().name
+
+    def text(self) -> str:
+        """Message followed by its fields as key=value"""
+        if not self.fields:
+            return self.message
+        return self.message + ' ' + ' '.join(f"{key}={value}" for key, value in self.fields.items())
+
+    def file_line(self, json_format: bool) -> str:
+        timestamp = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(self.created))
+        timestamp += f".{int(self.created % 1 * 1000):03d}"
+        level = LEVEL_NAMES.get(self.level, str(self.level))
+        if json_format:
+            return json.dumps({
+                'time': timestamp, 'level': level, 'thread': self.thread,
+                'message': self.message, **self.fields
+            }, ensure_ascii=False, default=str)
+        return f"{timestamp} {level:<7} [{self.thread}] {self.text()}"
+
+
+class RotatingLogFile:
+    """Log file that is renamed to .1, .2, ... before it would grow past max_bytes"""
+
+    def __init__(self, path: str, max_bytes: int, backup_count: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file: TextIO = open(path, 'a', encoding='utf-8')
+
+    def write_lines(self, lines: List[str]) -> None:
+        text = '\n'.join(lines) + '\n'
+        if self.max_bytes and self._file.tell() and self._file.tell() + len(text) > self.max_bytes:
+            self._rotate()
+        self._file.write(text)
+        self._file.flush()
+
+    def _rotate(self) -> None:
+        self._file.close()
+        if self.backup_count:
+            for index in range(self.backup_count - 1, 0, -1):
+                source = f"{self.path}.{index}"
+                if os.path.exists(source):
+                    os.replace(source, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+            self._file = open(self.path, 'a', encoding='utf-8')
+        else:
+            self._file = open(self.path, 'w', encoding='utf-8')
+
+    def close(self) -> None:
+        self._file.close()
+
 
 class Logger:
     _instance: Optional['Logger'] = None
     _gui_callback: Optional[Callable[[str], None]] = None
+    # Receives a list of messages per batch instead of one call per message
+    _gui_batch_callback: Optional[Callable[[List[str]], None]] = None
 
     @classmethod
     def get_instance(cls) -> 'Logger':
@@ -11,15 +131,154 @@ class Logger:
         return cls._instance
 
     @classmethod
-    def set_gui_callback(cls, callback: Callable[[str], None]) -> None:
-        cls._gui_callback = callback
+    def set_gui_callback(cls, callback: Callable, batched: bool = False) -> None:
+        """
+        Send log messages to callback instead of stdout
 
-    def log(self, message: str) -> None:
-        """Log a message to the GUI if callback is set, otherwise print to console"""
-        if self._gui_callback and callable(self._gui_callback):
-            self._gui_callback(message)
+        The callback runs on the logger's writer thread.
+
+        Args:
+            callback: Called with each message, or with a list of messages if batched
+            batched: Deliver all messages of a batch in one call
+        """
+        if batched:
+            cls._gui_batch_callback, cls._gui_callback = callback, None
         else:
-            print(message)
+            cls._gui_callback, cls._gui_batch_callback = callback, None
+
+    def __init__(self):
+        self._queue: 'queue.SimpleQueue[object]' = queue.SimpleQueue()
+        self._thread: Optional[threading.Thread] = None
+        self._start_lock = threading.Lock()
+        self._file: Optional[RotatingLogFile] = None
+        self.configure()
+
+    def configure(self) -> None:
+        """Read LOG_LEVEL, LOG_FILE, LOG_FORMAT, LOG_MAX_BYTES and LOG_BACKUP_COUNT again"""
+        self.level = parse_level(os.getenv('LOG_LEVEL'))
+        self.json_format = os.getenv('LOG_FORMAT', 'text').lower() == 'json'
+        # The writer thread opens the new file with its next batch
+        self._queue.put((
+            os.getenv('LOG_FILE') or None,
+            env_int('LOG_MAX_BYTES', DEFAULT_MAX_BYTES),
+            env_int('LOG_BACKUP_COUNT', DEFAULT_BACKUP_COUNT),
+        ))
+
+    def is_enabled_for(self, level: int) -> bool:
+        return level >= self.level
+
+    def log(self, message: str, level: Optional[int] = None, **fields) -> None:
+        """
+        Queue a message for the GUI (or the console) and the log file
+
+        Args:
+            message: Message text
+            level: Level of the message (default: ERROR for "Error: ..." messages, else INFO)
+            **fields: Structured fields, appended as key=value or written as JSON keys
+        """
+        if level is None:
+            level = ERROR if message[:6].lower() == 'error:' else INFO
+        if level < self.level:
+            return
+        self._ensure_writer()
+        self._queue.put(LogRecord(level, message, fields))
+
+    def debug(self, message: str, **fields) -> None:
+        self.log(message, DEBUG, **fields)
+
+    def info(self, message: str, **fields) -> None:
+        self.log(message, INFO, **fields)
+
+    def warning(self, message: str, **fields) -> None:
+        self.log(message, WARNING, **fields)
+
+    def error(self, message: str, **fields) -> None:
+        self.log(message, ERROR, **fields)
+
+    def flush(self, timeout: float = 5.0) -> bool:
+        """
+        Wait until every message queued so far has been written
+
+        Args:
+            timeout: Maximum wait in seconds
+
+        Returns:
+            bool: True if everything was written in time
+        """
+        if self._thread is None:
+            return True
+        written = threading.Event()
+        self._queue.put(written)
+        return written.wait(timeout)
+
+    def _ensure_writer(self) -> None:
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, name="logger", daemon=True)
+                self._thread.start()
+                # Messages logged just before the interpreter exits are still written
+                atexit.register(self.flush)
+
+    def _write_loop(self) -> None:
+        while True:
+            items = [self._queue.get()]
+            while len(items) < MAX_BATCH_SIZE:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            records: List[LogRecord] = []
+            for item in items:
+                if isinstance(item, LogRecord):
+                    records.append(item)
+                    continue
+                # Settings and flush markers take effect after the records queued before them
+                self._write(records)
+                records = []
+                if isinstance(item, threading.Event):
+                    item.set()
+                else:
+                    self._open_file(*item)
+            self._write(records)
+
+    def _open_file(self, path: Optional[str], max_bytes: int, backup_count: int) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if path:
+            try:
+                self._file = RotatingLogFile(path, max_bytes, backup_count)
+            except OSError as e:
+                print(f"Could not open log file {path}: {e}", file=sys.stderr)
+
+    def _write(self, records: List[LogRecord]) -> None:
+        """Hand a batch to the outputs; a failing output never stops the writer thread"""
+        if not records:
+            return
+        messages = [record.text() for record in records]
+        try:
+            # Read through the class so a plain function is not bound to the instance
+            batch_callback = type(self)._gui_batch_callback
+            callback = type(self)._gui_callback
+            if batch_callback is not None:
+                batch_callback(messages)
+            elif callback is not None:
+                for message in messages:
+                    callback(message)
+            else:
+                print('\n'.join(messages), flush=True)
+        except Exception as e:
+            print(f"Log output failed: {e}", file=sys.stderr)
+
+        if self._file is not None:
+            try:
+                self._file.write_lines([record.file_line(self.json_format) for record in records])
+            except OSError as e:
+                print(f"Could not write log file {self._file.path}: {e}", file=sys.stderr)
+                self._file = None
 
 # Create a global logger instance
 logger = Logger.get_instance()
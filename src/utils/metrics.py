@@ -0,0 +1,260 @@
+"""
+Structured timings and counters of the review pipeline.
+
+Code measures a step with a span or records a value directly:
+
+    with metrics.span('review_stage_seconds', stage='git'):
+        ...
+    metrics.increment('api_tokens_total', usage.prompt_tokens, model=model, kind='prompt')
+
+Every observation is kept as a per-label summary (count, sum, max and recent
+samples for percentiles). It is also appended to the JSON lines file
+METRICS_JSONL_FILE together with the labels of the current context, for
+example the commit being reviewed. write_prometheus() writes all summaries as
+a Prometheus text file to METRICS_PROMETHEUS_FILE, which node_exporter's
+textfile collector can pick up.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Deque, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from src.utils.logger import logger
+
+# Recent values kept per metric and label set for percentiles
+SAMPLE_WINDOW = 500
+SUMMARY_QUANTILES = (0.5, 0.95, 0.99)
+
+LabelSet = Tuple[Tuple[str, str], ...]
+MetricKey = Tuple[str, LabelSet]
+
+
+def _label_set(labels: Dict[str, object]) -> LabelSet:
+    return tuple(sorted((name, str(value)) for name, value in labels.items() if value is not None))
+
+
+def format_labels(labels: LabelSet) -> str:
+    """Labels in Prometheus notation, e.g. {model="gpt",kind="prompt"}; empty without labels"""
+    if not labels:
+        return ''
+    escaped = (value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, value in labels)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(labels, escaped)) + '}'
+
+
+class MetricSummary:
+    """Count, sum, maximum and recent values of one observed metric"""
+
+    __slots__ = ('count', 'total', 'maximum', 'samples')
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.maximum = 0.0
+        self.samples: Deque[float] = deque(maxlen=SAMPLE_WINDOW)
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.maximum = max(self.maximum, value)
+        self.samples.append(value)
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, fraction: float) -> float:
+        """Quantile of the recent values"""
+        samples = sorted(self.samples)
+        if not samples:
+            return 0.0
+        return samples[min(len(samples) - 1, int(len(samples) * fraction))]
+
+
+class MetricsSnapshot:
+    """Observations and counters, either since start or while a collect() block ran"""
+
+    def __init__(self):
+        self.summaries: Dict[MetricKey, MetricSummary] = {}
+        self.counters: Dict[MetricKey, float] = {}
+
+    def _observe(self, key: MetricKey, value: float) -> None:
+        summary = self.summaries.get(key)
+        if summary is None:
+            summary = self.summaries[key] = MetricSummary()
+        summary.add(value)
+
+    def _increment(self, key: MetricKey, value: float) -> None:
+        self.counters[key] = self.counters.get(key, 0.0) + value
+
+    def summary(self) -> str:
+        """
+        Human readable table of all metrics
+
+        Returns:
+            str: One line per metric and label set, empty if nothing was recorded
+        """
+        lines = []
+        for (name, labels), summary in sorted(self.summaries.items()):
+            lines.append(
+                f"{name}{format_labels(labels)}: {summary.count}x, mean {summary.mean:.3f}, "
+                f"p95 {summary.quantile(0.95):.3f}, max {summary.maximum:.3f}"
+            )
+        for (name, labels), value in sorted(self.counters.items()):
+            lines.append(f"{name}{format_labels(labels)}: {value:g}")
+        return '\n'.join(lines)
+
+
+class MetricsRecorder(MetricsSnapshot):
+    """
+    Thread-safe metrics registry with JSON lines and Prometheus export
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._collectors: List[MetricsSnapshot] = []
+        self._jsonl_path: Optional[str] = None
+        self._jsonl_file: Optional[TextIO] = None
+
+    def summary(self) -> str:
+        with self._lock:
+            return super().summary()
+
+    def _context_labels(self) -> Dict[str, object]:
+        return getattr(self._local, 'labels', {})
+
+    @contextmanager
+    def context(self, **labels) -> Iterator[None]:
+        """Add labels to the JSON lines events recorded by this thread inside the block"""
+        previous = self._context_labels()
+        self._local.labels = dict(previous, **labels)
+        try:
+            yield
+        finally:
+            self._local.labels = previous
+
+    @contextmanager
+    def collect(self) -> Iterator[MetricsSnapshot]:
+        """Collect everything recorded inside the block, from any thread, into a separate snapshot"""
+        snapshot = MetricsSnapshot()
+        with self._lock:
+            self._collectors.append(snapshot)
+        try:
+            yield snapshot
+        finally:
+            with self._lock:
+                self._collectors.remove(snapshot)
+
+    def _record(self, kind: str, name: str, value: float, labels: Dict[str, object]) -> None:
+        key = (name, _label_set(labels))
+        with self._lock:
+            for snapshot in [self] + self._collectors:
+                if kind == 'counter':
+                    snapshot._increment(key, value)
+                else:
+                    snapshot._observe(key, value)
+            self._write_event(kind, name, value, labels)
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        """Record one value of a metric, such as a duration in seconds"""
+        self._record('observation', name, value, labels)
+
+    def increment(self, name: str, value: float = 1, **labels) -> None:
+        """Add to a counter, such as a token total"""
+        if value:
+            self._record('counter', name, value, labels)
+
+    @contextmanager
+    def span(self, name: str, **labels) -> Iterator[None]:
+        """Observe the duration of the block in seconds, also when it raises"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def _write_event(self, kind: str, name: str, value: float, labels: Dict[str, object]) -> None:
+        """Append an event to METRICS_JSONL_FILE; called with the lock held"""
+        path = os.getenv('METRICS_JSONL_FILE')
+        if path != self._jsonl_path:
+            if self._jsonl_file is not None:
+                self._jsonl_file.close()
+            self._jsonl_file = None
+            self._jsonl_path = path
+            if path:
+                try:
+                    directory = os.path.dirname(path)
+                    if directory:
+                        os.makedirs(directory, exist_ok=True)
+                    self._jsonl_file = open(path, 'a', encoding='utf-8')
+                except OSError as e:
+                    logger.log(f"Could not open metrics file {path}: {e}")
+        if self._jsonl_file is None:
+            return
+        event = {
+            'time': round(time.time(), 3),
+            'type': kind,
+            'metric': name,
+            'value': value,
+            'labels': {**self._context_labels(), **labels},
+        }
+        self._jsonl_file.write(json.dumps(event, ensure_ascii=False, default=str) + '\n')
+        self._jsonl_file.flush()
+
+    def prometheus_text(self) -> str:
+        """All metrics in the Prometheus text exposition format"""
+        lines = []
+        typed = set()
+        with self._lock:
+            # Sorted by name, so all label sets of a metric follow its TYPE line
+            for (name, labels), summary in sorted(self.summaries.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} summary")
+                for fraction in SUMMARY_QUANTILES:
+                    quantile_labels = labels + (('quantile', str(fraction)),)
+                    lines.append(f"{name}{format_labels(quantile_labels)} {summary.quantile(fraction):.6f}")
+                lines.append(f"{name}_sum{format_labels(labels)} {summary.total:.6f}")
+                lines.append(f"{name}_count{format_labels(labels)} {summary.count}")
+            for (name, labels), value in sorted(self.counters.items()):
+                if name not in typed:
+                    typed.add(name)
+                    lines.append(f"# TYPE {name} counter")
+                lines.append(f"{name}{format_labels(labels)} {value:g}")
+        return '\n'.join(lines) + '\n' if lines else ''
+
+    def write_prometheus(self, path: Optional[str] = None) -> Optional[str]:
+        """
+        Write all metrics as a Prometheus text file
+
+        The file is replaced atomically, so a scraper never reads half of it.
+
+        Args:
+            path: Target file (default: METRICS_PROMETHEUS_FILE)
+
+        Returns:
+            Optional[str]: Path of the written file, None if no file is configured or writing failed
+        """
+        path = path or os.getenv('METRICS_PROMETHEUS_FILE')
+        if not path:
+            return None
+        temporary_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(temporary_path, 'w', encoding='utf-8') as f:
+                f.write(self.prometheus_text())
+            os.replace(temporary_path, path)
+        except OSError as e:
+            logger.log(f"Could not write metrics file {path}: {e}")
+            return None
+        return path
+
+
+metrics = MetricsRecorder()
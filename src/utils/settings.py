@@ -0,0 +1,47 @@
+"""
+Numeric settings read from the environment.
+
+A value that is not a number falls back to the default, so a typo in .env
+never stops a review.
+"""
+
+import os
+from typing import Optional
+
+
+def env_int(name: str, default: int, minimum: Optional[int] = None) -> int:
+    """
+    Read an integer setting
+
+    Args:
+        name: Environment variable
+        default: Used when the variable is missing, empty or not an integer
+        minimum: Smaller values are raised to this
+
+    Returns:
+        int: Setting value
+    """
+    try:
+        value = int(os.getenv(name, default))
+    except ValueError:
+        return default
+    return value if minimum is None else max(minimum, value)
+
+
+def env_float(name: str, default: float, minimum: Optional[float] = None) -> float:
+    """
+    Read a number setting
+
+    Args:
+        name: Environment variable
+        default: Used when the variable is missing, empty or not a number
+        minimum: Smaller values are raised to this
+
+    Returns:
+        float: Setting value
+    """
+    try:
+        value = float(os.getenv(name, default))
+    except ValueError:
+        return default
+    return value if minimum is None else max(minimum, value)